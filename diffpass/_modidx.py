@@ -6,12 +6,21 @@ d = { 'settings': { 'branch': 'main',
                 'git_url': 'https://github.com/Bitbol-Lab/DiffPaSS',
                 'lib_path': 'diffpass'},
   'syms': { 'diffpass.base': { 'diffpass.base.DiffPaSSModel': ('base.html#diffpassmodel', 'diffpass/base.py'),
+                               'diffpass.base.DiffPaSSModel._checkpointed': ('base.html#diffpassmodel._checkpointed', 'diffpass/base.py'),
+                               'diffpass.base.DiffPaSSModel._checkpointing': ('base.html#diffpassmodel._checkpointing', 'diffpass/base.py'),
                                'diffpass.base.DiffPaSSModel._fit': ('base.html#diffpassmodel._fit', 'diffpass/base.py'),
                                'diffpass.base.DiffPaSSModel._hard_pass': ('base.html#diffpassmodel._hard_pass', 'diffpass/base.py'),
+                               'diffpass.base.DiffPaSSModel._hard_pass_replica': ( 'base.html#diffpassmodel._hard_pass_replica',
+                                                                                   'diffpass/base.py'),
                                'diffpass.base.DiffPaSSModel._init_results': ('base.html#diffpassmodel._init_results', 'diffpass/base.py'),
+                               'diffpass.base.DiffPaSSModel._is_converged': ('base.html#diffpassmodel._is_converged', 'diffpass/base.py'),
                                'diffpass.base.DiffPaSSModel._record_current_log_alphas': ( 'base.html#diffpassmodel._record_current_log_alphas',
                                                                                            'diffpass/base.py'),
+                               'diffpass.base.DiffPaSSModel._refine_lowest_loss_hard_perms': ( 'base.html#diffpassmodel._refine_lowest_loss_hard_perms',
+                                                                                               'diffpass/base.py'),
                                'diffpass.base.DiffPaSSModel._soft_pass': ('base.html#diffpassmodel._soft_pass', 'diffpass/base.py'),
+                               'diffpass.base.DiffPaSSModel._workspace_buffer': ( 'base.html#diffpassmodel._workspace_buffer',
+                                                                                  'diffpass/base.py'),
                                'diffpass.base.DiffPaSSModel.check_can_optimize': ( 'base.html#diffpassmodel.check_can_optimize',
                                                                                    'diffpass/base.py'),
                                'diffpass.base.DiffPaSSModel.create_optimizer': ( 'base.html#diffpassmodel.create_optimizer',
@@ -28,6 +37,8 @@ d = { 'settings': { 'branch': 'main',
                                                                                        'diffpass/base.py'),
                                'diffpass.base.DiffPaSSModel.reduce_num_tokens': ( 'base.html#diffpassmodel.reduce_num_tokens',
                                                                                   'diffpass/base.py'),
+                               'diffpass.base.DiffPaSSModel.refine_hard_perms': ( 'base.html#diffpassmodel.refine_hard_perms',
+                                                                                  'diffpass/base.py'),
                                'diffpass.base.DiffPaSSModel.soft_': ('base.html#diffpassmodel.soft_', 'diffpass/base.py'),
                                'diffpass.base.DiffPaSSModel.validate_best_hits_cfg': ( 'base.html#diffpassmodel.validate_best_hits_cfg',
                                                                                        'diffpass/base.py'),
@@ -42,12 +53,39 @@ d = { 'settings': { 'branch': 'main',
                                'diffpass.base.DiffPaSSModel.validate_similarity_kind': ( 'base.html#diffpassmodel.validate_similarity_kind',
                                                                                          'diffpass/base.py'),
                                'diffpass.base.DiffPaSSResults': ('base.html#diffpassresults', 'diffpass/base.py'),
+                               'diffpass.base.GeometricSchedule': ('base.html#geometricschedule', 'diffpass/base.py'),
+                               'diffpass.base.GeometricSchedule.__call__': ('base.html#geometricschedule.__call__', 'diffpass/base.py'),
+                               'diffpass.base.GeometricSchedule.__init__': ('base.html#geometricschedule.__init__', 'diffpass/base.py'),
+                               'diffpass.base.LinearSchedule': ('base.html#linearschedule', 'diffpass/base.py'),
+                               'diffpass.base.LinearSchedule.__call__': ('base.html#linearschedule.__call__', 'diffpass/base.py'),
+                               'diffpass.base.LinearSchedule.__init__': ('base.html#linearschedule.__init__', 'diffpass/base.py'),
+                               'diffpass.base.LossAdaptiveSchedule': ('base.html#lossadaptiveschedule', 'diffpass/base.py'),
+                               'diffpass.base.LossAdaptiveSchedule.__call__': ( 'base.html#lossadaptiveschedule.__call__',
+                                                                                'diffpass/base.py'),
+                               'diffpass.base.LossAdaptiveSchedule.__init__': ( 'base.html#lossadaptiveschedule.__init__',
+                                                                                'diffpass/base.py'),
+                               'diffpass.base.LossAdaptiveSchedule.reset': ('base.html#lossadaptiveschedule.reset', 'diffpass/base.py'),
+                               'diffpass.base.ParameterSchedule': ('base.html#parameterschedule', 'diffpass/base.py'),
+                               'diffpass.base.ParameterSchedule.__call__': ('base.html#parameterschedule.__call__', 'diffpass/base.py'),
+                               'diffpass.base.ParameterSchedule.reset': ('base.html#parameterschedule.reset', 'diffpass/base.py'),
+                               'diffpass.base.Workspace': ('base.html#workspace', 'diffpass/base.py'),
+                               'diffpass.base.Workspace.__init__': ('base.html#workspace.__init__', 'diffpass/base.py'),
+                               'diffpass.base.Workspace.get': ('base.html#workspace.get', 'diffpass/base.py'),
+                               'diffpass.base._compiled_forward': ('base.html#_compiled_forward', 'diffpass/base.py'),
                                'diffpass.base.dccn': ('base.html#dccn', 'diffpass/base.py'),
                                'diffpass.base.make_pbar': ('base.html#make_pbar', 'diffpass/base.py')},
             'diffpass.constants': { 'diffpass.constants.SubstitutionMatrix': ('constants.html#substitutionmatrix', 'diffpass/constants.py'),
+                                    'diffpass.constants.SubstitutionMatrix.frame': ( 'constants.html#substitutionmatrix.frame',
+                                                                                     'diffpass/constants.py'),
                                     'diffpass.constants.TokenizedSubstitutionMatrix': ( 'constants.html#tokenizedsubstitutionmatrix',
                                                                                         'diffpass/constants.py'),
-                                    'diffpass.constants.get_blosum62_data': ('constants.html#get_blosum62_data', 'diffpass/constants.py')},
+                                    'diffpass.constants._parse_substitution_matrix': ( 'constants.html#_parse_substitution_matrix',
+                                                                                       'diffpass/constants.py'),
+                                    'diffpass.constants._tokenized_substitution_matrix': ( 'constants.html#_tokenized_substitution_matrix',
+                                                                                           'diffpass/constants.py'),
+                                    'diffpass.constants.get_blosum62_data': ('constants.html#get_blosum62_data', 'diffpass/constants.py'),
+                                    'diffpass.constants.get_substitution_matrix_data': ( 'constants.html#get_substitution_matrix_data',
+                                                                                         'diffpass/constants.py')},
             'diffpass.data_utils': { 'diffpass.data_utils.compute_comparable_group_idxs': ( 'data_utils.html#compute_comparable_group_idxs',
                                                                                             'diffpass/data_utils.py'),
                                      'diffpass.data_utils.compute_num_correct_pairings': ( 'data_utils.html#compute_num_correct_pairings',
@@ -68,7 +106,21 @@ d = { 'settings': { 'branch': 'main',
                                                                                              'diffpass/entropy_ops.py'),
                                       'diffpass.entropy_ops.smooth_mean_two_body_entropy': ( 'entropy_ops.html#smooth_mean_two_body_entropy',
                                                                                              'diffpass/entropy_ops.py')},
-            'diffpass.gumbel_sinkhorn_ops': { 'diffpass.gumbel_sinkhorn_ops.gumbel_matching': ( 'gumbel_sinkhorn_ops.html#gumbel_matching',
+            'diffpass.gumbel_sinkhorn_ops': { 'diffpass.gumbel_sinkhorn_ops._all_permutations': ( 'gumbel_sinkhorn_ops.html#_all_permutations',
+                                                                                                  'diffpass/gumbel_sinkhorn_ops.py'),
+                                              'diffpass.gumbel_sinkhorn_ops._certify_matching': ( 'gumbel_sinkhorn_ops.html#_certify_matching',
+                                                                                                  'diffpass/gumbel_sinkhorn_ops.py'),
+                                              'diffpass.gumbel_sinkhorn_ops._log_sinkhorn_iters': ( 'gumbel_sinkhorn_ops.html#_log_sinkhorn_iters',
+                                                                                                    'diffpass/gumbel_sinkhorn_ops.py'),
+                                              'diffpass.gumbel_sinkhorn_ops._np_matching_cols': ( 'gumbel_sinkhorn_ops.html#_np_matching_cols',
+                                                                                                  'diffpass/gumbel_sinkhorn_ops.py'),
+                                              'diffpass.gumbel_sinkhorn_ops._one_hot_like': ( 'gumbel_sinkhorn_ops.html#_one_hot_like',
+                                                                                              'diffpass/gumbel_sinkhorn_ops.py'),
+                                              'diffpass.gumbel_sinkhorn_ops._unbiased_matching_cols': ( 'gumbel_sinkhorn_ops.html#_unbiased_matching_cols',
+                                                                                                        'diffpass/gumbel_sinkhorn_ops.py'),
+                                              'diffpass.gumbel_sinkhorn_ops.exhaustive_matching': ( 'gumbel_sinkhorn_ops.html#exhaustive_matching',
+                                                                                                    'diffpass/gumbel_sinkhorn_ops.py'),
+                                              'diffpass.gumbel_sinkhorn_ops.gumbel_matching': ( 'gumbel_sinkhorn_ops.html#gumbel_matching',
                                                                                                 'diffpass/gumbel_sinkhorn_ops.py'),
                                               'diffpass.gumbel_sinkhorn_ops.gumbel_noise_like': ( 'gumbel_sinkhorn_ops.html#gumbel_noise_like',
                                                                                                   'diffpass/gumbel_sinkhorn_ops.py'),
@@ -87,7 +139,11 @@ d = { 'settings': { 'branch': 'main',
                                               'diffpass.gumbel_sinkhorn_ops.sinkhorn_norm': ( 'gumbel_sinkhorn_ops.html#sinkhorn_norm',
                                                                                               'diffpass/gumbel_sinkhorn_ops.py'),
                                               'diffpass.gumbel_sinkhorn_ops.unbias_by_randperms': ( 'gumbel_sinkhorn_ops.html#unbias_by_randperms',
-                                                                                                    'diffpass/gumbel_sinkhorn_ops.py')},
+                                                                                                    'diffpass/gumbel_sinkhorn_ops.py'),
+                                              'diffpass.gumbel_sinkhorn_ops.unbiased_matching': ( 'gumbel_sinkhorn_ops.html#unbiased_matching',
+                                                                                                  'diffpass/gumbel_sinkhorn_ops.py'),
+                                              'diffpass.gumbel_sinkhorn_ops.warm_started_matching': ( 'gumbel_sinkhorn_ops.html#warm_started_matching',
+                                                                                                      'diffpass/gumbel_sinkhorn_ops.py')},
             'diffpass.ipa_utils': {'diffpass.ipa_utils.get_robust_pairs': ('ipa_utils.html#get_robust_pairs', 'diffpass/ipa_utils.py')},
             'diffpass.model': { 'diffpass.model.BestHits': ('model.html#besthits', 'diffpass/model.py'),
                                 'diffpass.model.BestHits.__init__': ('model.html#besthits.__init__', 'diffpass/model.py'),
@@ -95,34 +151,64 @@ d = { 'settings': { 'branch': 'main',
                                 'diffpass.model.BestHits._soft_bh_fn': ('model.html#besthits._soft_bh_fn', 'diffpass/model.py'),
                                 'diffpass.model.BestHits.forward': ('model.html#besthits.forward', 'diffpass/model.py'),
                                 'diffpass.model.BestHits.hard_': ('model.html#besthits.hard_', 'diffpass/model.py'),
+                                'diffpass.model.BestHits.hard_sparse': ('model.html#besthits.hard_sparse', 'diffpass/model.py'),
                                 'diffpass.model.BestHits.mode': ('model.html#besthits.mode', 'diffpass/model.py'),
                                 'diffpass.model.BestHits.soft_': ('model.html#besthits.soft_', 'diffpass/model.py'),
+                                'diffpass.model.BestHits.streaming': ('model.html#besthits.streaming', 'diffpass/model.py'),
                                 'diffpass.model.Blosum62Similarities': ('model.html#blosum62similarities', 'diffpass/model.py'),
                                 'diffpass.model.Blosum62Similarities.__init__': ( 'model.html#blosum62similarities.__init__',
                                                                                   'diffpass/model.py'),
                                 'diffpass.model.Blosum62Similarities.forward': ( 'model.html#blosum62similarities.forward',
                                                                                  'diffpass/model.py'),
+                                'diffpass.model.Blosum62Similarities.pairwise': ( 'model.html#blosum62similarities.pairwise',
+                                                                                  'diffpass/model.py'),
                                 'diffpass.model.GeneralizedPermutation': ('model.html#generalizedpermutation', 'diffpass/model.py'),
                                 'diffpass.model.GeneralizedPermutation.__init__': ( 'model.html#generalizedpermutation.__init__',
                                                                                     'diffpass/model.py'),
+                                'diffpass.model.GeneralizedPermutation._batch_shape': ( 'model.html#generalizedpermutation._batch_shape',
+                                                                                        'diffpass/model.py'),
+                                'diffpass.model.GeneralizedPermutation._bucketed_mats': ( 'model.html#generalizedpermutation._bucketed_mats',
+                                                                                          'diffpass/model.py'),
+                                'diffpass.model.GeneralizedPermutation._free_entries_full_idxs': ( 'model.html#generalizedpermutation._free_entries_full_idxs',
+                                                                                                   'diffpass/model.py'),
                                 'diffpass.model.GeneralizedPermutation._hard_mats': ( 'model.html#generalizedpermutation._hard_mats',
                                                                                       'diffpass/model.py'),
                                 'diffpass.model.GeneralizedPermutation._impl_fixed_pairings': ( 'model.html#generalizedpermutation._impl_fixed_pairings',
                                                                                                 'diffpass/model.py'),
-                                'diffpass.model.GeneralizedPermutation._not_fixed_masks': ( 'model.html#generalizedpermutation._not_fixed_masks',
+                                'diffpass.model.GeneralizedPermutation._init_effective_fixed_pairings': ( 'model.html#generalizedpermutation._init_effective_fixed_pairings',
+                                                                                                          'diffpass/model.py'),
+                                'diffpass.model.GeneralizedPermutation._init_fixed_mats': ( 'model.html#generalizedpermutation._init_fixed_mats',
                                                                                             'diffpass/model.py'),
+                                'diffpass.model.GeneralizedPermutation._init_log_alphas_layout': ( 'model.html#generalizedpermutation._init_log_alphas_layout',
+                                                                                                   'diffpass/model.py'),
                                 'diffpass.model.GeneralizedPermutation._soft_mats': ( 'model.html#generalizedpermutation._soft_mats',
                                                                                       'diffpass/model.py'),
+                                'diffpass.model.GeneralizedPermutation._stacked_log_alphas': ( 'model.html#generalizedpermutation._stacked_log_alphas',
+                                                                                               'diffpass/model.py'),
+                                'diffpass.model.GeneralizedPermutation._static_mats': ( 'model.html#generalizedpermutation._static_mats',
+                                                                                        'diffpass/model.py'),
+                                'diffpass.model.GeneralizedPermutation._unflatten_mats': ( 'model.html#generalizedpermutation._unflatten_mats',
+                                                                                           'diffpass/model.py'),
                                 'diffpass.model.GeneralizedPermutation._validate_fixed_pairings': ( 'model.html#generalizedpermutation._validate_fixed_pairings',
                                                                                                     'diffpass/model.py'),
+                                'diffpass.model.GeneralizedPermutation.fixed_pairings': ( 'model.html#generalizedpermutation.fixed_pairings',
+                                                                                          'diffpass/model.py'),
                                 'diffpass.model.GeneralizedPermutation.forward': ( 'model.html#generalizedpermutation.forward',
                                                                                    'diffpass/model.py'),
+                                'diffpass.model.GeneralizedPermutation.frozen_hard_perms': ( 'model.html#generalizedpermutation.frozen_hard_perms',
+                                                                                             'diffpass/model.py'),
+                                'diffpass.model.GeneralizedPermutation.full_log_alphas_flat': ( 'model.html#generalizedpermutation.full_log_alphas_flat',
+                                                                                                'diffpass/model.py'),
                                 'diffpass.model.GeneralizedPermutation.hard_': ( 'model.html#generalizedpermutation.hard_',
                                                                                  'diffpass/model.py'),
                                 'diffpass.model.GeneralizedPermutation.init_fixed_pairings_and_log_alphas': ( 'model.html#generalizedpermutation.init_fixed_pairings_and_log_alphas',
                                                                                                               'diffpass/model.py'),
+                                'diffpass.model.GeneralizedPermutation.log_alphas': ( 'model.html#generalizedpermutation.log_alphas',
+                                                                                      'diffpass/model.py'),
                                 'diffpass.model.GeneralizedPermutation.mode': ( 'model.html#generalizedpermutation.mode',
                                                                                 'diffpass/model.py'),
+                                'diffpass.model.GeneralizedPermutation.restore_frozen_log_alphas': ( 'model.html#generalizedpermutation.restore_frozen_log_alphas',
+                                                                                                     'diffpass/model.py'),
                                 'diffpass.model.GeneralizedPermutation.soft_': ( 'model.html#generalizedpermutation.soft_',
                                                                                  'diffpass/model.py'),
                                 'diffpass.model.HammingSimilarities': ('model.html#hammingsimilarities', 'diffpass/model.py'),
@@ -130,33 +216,77 @@ d = { 'settings': { 'branch': 'main',
                                                                                  'diffpass/model.py'),
                                 'diffpass.model.HammingSimilarities.forward': ( 'model.html#hammingsimilarities.forward',
                                                                                 'diffpass/model.py'),
+                                'diffpass.model.HammingSimilarities.pairwise': ( 'model.html#hammingsimilarities.pairwise',
+                                                                                 'diffpass/model.py'),
                                 'diffpass.model.InterGroupSimilarityLoss': ('model.html#intergroupsimilarityloss', 'diffpass/model.py'),
                                 'diffpass.model.InterGroupSimilarityLoss.__init__': ( 'model.html#intergroupsimilarityloss.__init__',
                                                                                       'diffpass/model.py'),
+                                'diffpass.model.InterGroupSimilarityLoss._is_included': ( 'model.html#intergroupsimilarityloss._is_included',
+                                                                                          'diffpass/model.py'),
                                 'diffpass.model.InterGroupSimilarityLoss.forward': ( 'model.html#intergroupsimilarityloss.forward',
                                                                                      'diffpass/model.py'),
                                 'diffpass.model.IntraGroupSimilarityLoss': ('model.html#intragroupsimilarityloss', 'diffpass/model.py'),
                                 'diffpass.model.IntraGroupSimilarityLoss.__init__': ( 'model.html#intragroupsimilarityloss.__init__',
                                                                                       'diffpass/model.py'),
+                                'diffpass.model.IntraGroupSimilarityLoss._dot_score': ( 'model.html#intragroupsimilarityloss._dot_score',
+                                                                                        'diffpass/model.py'),
+                                'diffpass.model.IntraGroupSimilarityLoss._is_included': ( 'model.html#intragroupsimilarityloss._is_included',
+                                                                                          'diffpass/model.py'),
+                                'diffpass.model.IntraGroupSimilarityLoss._packed_score': ( 'model.html#intragroupsimilarityloss._packed_score',
+                                                                                           'diffpass/model.py'),
+                                'diffpass.model.IntraGroupSimilarityLoss._upper_mask': ( 'model.html#intragroupsimilarityloss._upper_mask',
+                                                                                         'diffpass/model.py'),
                                 'diffpass.model.IntraGroupSimilarityLoss.forward': ( 'model.html#intragroupsimilarityloss.forward',
                                                                                      'diffpass/model.py'),
                                 'diffpass.model.MILoss': ('model.html#miloss', 'diffpass/model.py'),
                                 'diffpass.model.MILoss.__init__': ('model.html#miloss.__init__', 'diffpass/model.py'),
+                                'diffpass.model.MILoss._loss': ('model.html#miloss._loss', 'diffpass/model.py'),
                                 'diffpass.model.MILoss.forward': ('model.html#miloss.forward', 'diffpass/model.py'),
                                 'diffpass.model.MatrixApply': ('model.html#matrixapply', 'diffpass/model.py'),
                                 'diffpass.model.MatrixApply.__init__': ('model.html#matrixapply.__init__', 'diffpass/model.py'),
+                                'diffpass.model.MatrixApply._apply_bucket': ('model.html#matrixapply._apply_bucket', 'diffpass/model.py'),
                                 'diffpass.model.MatrixApply.forward': ('model.html#matrixapply.forward', 'diffpass/model.py'),
                                 'diffpass.model.PermutationConjugate': ('model.html#permutationconjugate', 'diffpass/model.py'),
                                 'diffpass.model.PermutationConjugate.__init__': ( 'model.html#permutationconjugate.__init__',
                                                                                   'diffpass/model.py'),
+                                'diffpass.model.PermutationConjugate._conjugate_blocks': ( 'model.html#permutationconjugate._conjugate_blocks',
+                                                                                           'diffpass/model.py'),
+                                'diffpass.model.PermutationConjugate._conjugate_row_bucket': ( 'model.html#permutationconjugate._conjugate_row_bucket',
+                                                                                               'diffpass/model.py'),
+                                'diffpass.model.PermutationConjugate._flat_mats': ( 'model.html#permutationconjugate._flat_mats',
+                                                                                    'diffpass/model.py'),
+                                'diffpass.model.PermutationConjugate.conjugate_packed': ( 'model.html#permutationconjugate.conjugate_packed',
+                                                                                          'diffpass/model.py'),
+                                'diffpass.model.PermutationConjugate.conjugate_sparse': ( 'model.html#permutationconjugate.conjugate_sparse',
+                                                                                          'diffpass/model.py'),
+                                'diffpass.model.PermutationConjugate.conjugate_sparse_dot': ( 'model.html#permutationconjugate.conjugate_sparse_dot',
+                                                                                              'diffpass/model.py'),
                                 'diffpass.model.PermutationConjugate.forward': ( 'model.html#permutationconjugate.forward',
                                                                                  'diffpass/model.py'),
                                 'diffpass.model.TwoBodyEntropyLoss': ('model.html#twobodyentropyloss', 'diffpass/model.py'),
                                 'diffpass.model.TwoBodyEntropyLoss.__init__': ( 'model.html#twobodyentropyloss.__init__',
                                                                                 'diffpass/model.py'),
                                 'diffpass.model.TwoBodyEntropyLoss.forward': ('model.html#twobodyentropyloss.forward', 'diffpass/model.py'),
+                                'diffpass.model._block_diag_flat_idxs': ('model.html#_block_diag_flat_idxs', 'diffpass/model.py'),
+                                'diffpass.model._checkpointed_mean_over_column_segments': ( 'model.html#_checkpointed_mean_over_column_segments',
+                                                                                            'diffpass/model.py'),
+                                'diffpass.model._coalesced_coo': ('model.html#_coalesced_coo', 'diffpass/model.py'),
                                 'diffpass.model._consecutive_slices_from_sizes': ( 'model.html#_consecutive_slices_from_sizes',
                                                                                    'diffpass/model.py'),
+                                'diffpass.model._diag_blocks_idxs': ('model.html#_diag_blocks_idxs', 'diffpass/model.py'),
+                                'diffpass.model._diag_blocks_upper_dot': ('model.html#_diag_blocks_upper_dot', 'diffpass/model.py'),
+                                'diffpass.model._group_idxs_by_size': ('model.html#_group_idxs_by_size', 'diffpass/model.py'),
+                                'diffpass.model._group_row_tiles': ('model.html#_group_row_tiles', 'diffpass/model.py'),
+                                'diffpass.model._is_sparse': ('model.html#_is_sparse', 'diffpass/model.py'),
+                                'diffpass.model._register_bucket_order': ('model.html#_register_bucket_order', 'diffpass/model.py'),
+                                'diffpass.model._register_diag_blocks_idxs': ('model.html#_register_diag_blocks_idxs', 'diffpass/model.py'),
+                                'diffpass.model._register_group_layout': ('model.html#_register_group_layout', 'diffpass/model.py'),
+                                'diffpass.model._registered_diag_blocks_idxs': ( 'model.html#_registered_diag_blocks_idxs',
+                                                                                 'diffpass/model.py'),
+                                'diffpass.model._requires_grad': ('model.html#_requires_grad', 'diffpass/model.py'),
+                                'diffpass.model._sparse_dot': ('model.html#_sparse_dot', 'diffpass/model.py'),
+                                'diffpass.model._square_blocks_entries': ('model.html#_square_blocks_entries', 'diffpass/model.py'),
+                                'diffpass.model._upper_tiles_dot': ('model.html#_upper_tiles_dot', 'diffpass/model.py'),
                                 'diffpass.model.apply_hard_permutation_batch_to_similarity': ( 'model.html#apply_hard_permutation_batch_to_similarity',
                                                                                                'diffpass/model.py'),
                                 'diffpass.model.global_argmax_from_group_argmaxes': ( 'model.html#global_argmax_from_group_argmaxes',
@@ -167,8 +297,12 @@ d = { 'settings': { 'branch': 'main',
                                                                                   'diffpass/msa_parsing.py')},
             'diffpass.sequence_similarity_ops': { 'diffpass.sequence_similarity_ops._reciprocate_best_hits': ( 'sequence_similarity_ops.html#_reciprocate_best_hits',
                                                                                                                'diffpass/sequence_similarity_ops.py'),
+                                                  'diffpass.sequence_similarity_ops._reciprocate_sparse_best_hits': ( 'sequence_similarity_ops.html#_reciprocate_sparse_best_hits',
+                                                                                                                      'diffpass/sequence_similarity_ops.py'),
                                                   'diffpass.sequence_similarity_ops.hard_best_hits': ( 'sequence_similarity_ops.html#hard_best_hits',
                                                                                                        'diffpass/sequence_similarity_ops.py'),
+                                                  'diffpass.sequence_similarity_ops.hard_best_hits_sparse': ( 'sequence_similarity_ops.html#hard_best_hits_sparse',
+                                                                                                              'diffpass/sequence_similarity_ops.py'),
                                                   'diffpass.sequence_similarity_ops.smooth_hamming_similarities_cdist': ( 'sequence_similarity_ops.html#smooth_hamming_similarities_cdist',
                                                                                                                           'diffpass/sequence_similarity_ops.py'),
                                                   'diffpass.sequence_similarity_ops.smooth_hamming_similarities_dot': ( 'sequence_similarity_ops.html#smooth_hamming_similarities_dot',
@@ -178,13 +312,45 @@ d = { 'settings': { 'branch': 'main',
                                                   'diffpass.sequence_similarity_ops.smooth_substitution_matrix_similarities_dot': ( 'sequence_similarity_ops.html#smooth_substitution_matrix_similarities_dot',
                                                                                                                                     'diffpass/sequence_similarity_ops.py'),
                                                   'diffpass.sequence_similarity_ops.soft_best_hits': ( 'sequence_similarity_ops.html#soft_best_hits',
-                                                                                                       'diffpass/sequence_similarity_ops.py')},
+                                                                                                       'diffpass/sequence_similarity_ops.py'),
+                                                  'diffpass.sequence_similarity_ops.streaming_best_hits': ( 'sequence_similarity_ops.html#streaming_best_hits',
+                                                                                                            'diffpass/sequence_similarity_ops.py')},
+            'diffpass.symmetric_ops': { 'diffpass.symmetric_ops._upper_mask': ( 'symmetric_ops.html#_upper_mask',
+                                                                                'diffpass/symmetric_ops.py'),
+                                        'diffpass.symmetric_ops.pack_symmetric': ( 'symmetric_ops.html#pack_symmetric',
+                                                                                   'diffpass/symmetric_ops.py'),
+                                        'diffpass.symmetric_ops.pack_symmetric_rows': ( 'symmetric_ops.html#pack_symmetric_rows',
+                                                                                        'diffpass/symmetric_ops.py'),
+                                        'diffpass.symmetric_ops.packed_diag_blocks_idxs': ( 'symmetric_ops.html#packed_diag_blocks_idxs',
+                                                                                            'diffpass/symmetric_ops.py'),
+                                        'diffpass.symmetric_ops.packed_diagonal_idxs': ( 'symmetric_ops.html#packed_diagonal_idxs',
+                                                                                         'diffpass/symmetric_ops.py'),
+                                        'diffpass.symmetric_ops.packed_n_samples': ( 'symmetric_ops.html#packed_n_samples',
+                                                                                     'diffpass/symmetric_ops.py'),
+                                        'diffpass.symmetric_ops.packed_size': ( 'symmetric_ops.html#packed_size',
+                                                                                'diffpass/symmetric_ops.py'),
+                                        'diffpass.symmetric_ops.packed_symmetric_dot': ( 'symmetric_ops.html#packed_symmetric_dot',
+                                                                                         'diffpass/symmetric_ops.py'),
+                                        'diffpass.symmetric_ops.packed_symmetric_from_pairwise': ( 'symmetric_ops.html#packed_symmetric_from_pairwise',
+                                                                                                   'diffpass/symmetric_ops.py'),
+                                        'diffpass.symmetric_ops.packed_symmetric_idxs': ( 'symmetric_ops.html#packed_symmetric_idxs',
+                                                                                          'diffpass/symmetric_ops.py'),
+                                        'diffpass.symmetric_ops.permute_packed_symmetric': ( 'symmetric_ops.html#permute_packed_symmetric',
+                                                                                             'diffpass/symmetric_ops.py'),
+                                        'diffpass.symmetric_ops.unpack_symmetric': ( 'symmetric_ops.html#unpack_symmetric',
+                                                                                     'diffpass/symmetric_ops.py')},
             'diffpass.train': { 'diffpass.train.BestHitsPairing': ('train.html#besthitspairing', 'diffpass/train.py'),
                                 'diffpass.train.BestHitsPairing.__init__': ('train.html#besthitspairing.__init__', 'diffpass/train.py'),
                                 'diffpass.train.BestHitsPairing._bh_y_for_soft_x': ( 'train.html#besthitspairing._bh_y_for_soft_x',
                                                                                      'diffpass/train.py'),
                                 'diffpass.train.BestHitsPairing._precompute_bh': ( 'train.html#besthitspairing._precompute_bh',
                                                                                    'diffpass/train.py'),
+                                'diffpass.train.BestHitsPairing._similarities_comparison_loss': ( 'train.html#besthitspairing._similarities_comparison_loss',
+                                                                                                  'diffpass/train.py'),
+                                'diffpass.train.BestHitsPairing._soft_bh': ('train.html#besthitspairing._soft_bh', 'diffpass/train.py'),
+                                'diffpass.train.BestHitsPairing._soft_loss': ('train.html#besthitspairing._soft_loss', 'diffpass/train.py'),
+                                'diffpass.train.BestHitsPairing._streaming_bh': ( 'train.html#besthitspairing._streaming_bh',
+                                                                                  'diffpass/train.py'),
                                 'diffpass.train.BestHitsPairing.compute_losses_identity_perm': ( 'train.html#besthitspairing.compute_losses_identity_perm',
                                                                                                  'diffpass/train.py'),
                                 'diffpass.train.BestHitsPairing.forward': ('train.html#besthitspairing.forward', 'diffpass/train.py'),
@@ -192,24 +358,42 @@ d = { 'settings': { 'branch': 'main',
                                                                                 'diffpass/train.py'),
                                 'diffpass.train.GraphAlignment': ('train.html#graphalignment', 'diffpass/train.py'),
                                 'diffpass.train.GraphAlignment.__init__': ('train.html#graphalignment.__init__', 'diffpass/train.py'),
+                                'diffpass.train.GraphAlignment._adjacency_rows': ( 'train.html#graphalignment._adjacency_rows',
+                                                                                   'diffpass/train.py'),
+                                'diffpass.train.GraphAlignment._swap_gains': ('train.html#graphalignment._swap_gains', 'diffpass/train.py'),
                                 'diffpass.train.GraphAlignment.compute_losses_identity_perm': ( 'train.html#graphalignment.compute_losses_identity_perm',
                                                                                                 'diffpass/train.py'),
                                 'diffpass.train.GraphAlignment.forward': ('train.html#graphalignment.forward', 'diffpass/train.py'),
                                 'diffpass.train.GraphAlignment.prepare_fit': ('train.html#graphalignment.prepare_fit', 'diffpass/train.py'),
+                                'diffpass.train.GraphAlignment.refine_hard_perms': ( 'train.html#graphalignment.refine_hard_perms',
+                                                                                     'diffpass/train.py'),
                                 'diffpass.train.InformationPairing': ('train.html#informationpairing', 'diffpass/train.py'),
                                 'diffpass.train.InformationPairing.__init__': ( 'train.html#informationpairing.__init__',
                                                                                 'diffpass/train.py'),
+                                'diffpass.train.InformationPairing._two_body_counts_idxs': ( 'train.html#informationpairing._two_body_counts_idxs',
+                                                                                             'diffpass/train.py'),
                                 'diffpass.train.InformationPairing.compute_losses_identity_perm': ( 'train.html#informationpairing.compute_losses_identity_perm',
                                                                                                     'diffpass/train.py'),
                                 'diffpass.train.InformationPairing.forward': ('train.html#informationpairing.forward', 'diffpass/train.py'),
                                 'diffpass.train.InformationPairing.prepare_fit': ( 'train.html#informationpairing.prepare_fit',
                                                                                    'diffpass/train.py'),
+                                'diffpass.train.InformationPairing.refine_hard_perms': ( 'train.html#informationpairing.refine_hard_perms',
+                                                                                         'diffpass/train.py'),
                                 'diffpass.train.MirrortreePairing': ('train.html#mirrortreepairing', 'diffpass/train.py'),
                                 'diffpass.train.MirrortreePairing.__init__': ('train.html#mirrortreepairing.__init__', 'diffpass/train.py'),
                                 'diffpass.train.MirrortreePairing._precompute_similarities': ( 'train.html#mirrortreepairing._precompute_similarities',
                                                                                                'diffpass/train.py'),
+                                'diffpass.train.MirrortreePairing._similarities': ( 'train.html#mirrortreepairing._similarities',
+                                                                                    'diffpass/train.py'),
+                                'diffpass.train.MirrortreePairing._soft_loss': ( 'train.html#mirrortreepairing._soft_loss',
+                                                                                 'diffpass/train.py'),
                                 'diffpass.train.MirrortreePairing.compute_losses_identity_perm': ( 'train.html#mirrortreepairing.compute_losses_identity_perm',
                                                                                                    'diffpass/train.py'),
                                 'diffpass.train.MirrortreePairing.forward': ('train.html#mirrortreepairing.forward', 'diffpass/train.py'),
                                 'diffpass.train.MirrortreePairing.prepare_fit': ( 'train.html#mirrortreepairing.prepare_fit',
-                                                                                  'diffpass/train.py')}}}
+                                                                                  'diffpass/train.py'),
+                                'diffpass.train._fixed_positions_mask': ('train.html#_fixed_positions_mask', 'diffpass/train.py'),
+                                'diffpass.train._global_perm': ('train.html#_global_perm', 'diffpass/train.py'),
+                                'diffpass.train._group_perms': ('train.html#_group_perms', 'diffpass/train.py'),
+                                'diffpass.train._mutual_best_swaps': ('train.html#_mutual_best_swaps', 'diffpass/train.py'),
+                                'diffpass.train._swap_buckets': ('train.html#_swap_buckets', 'diffpass/train.py')}}}
@@ -2,11 +2,13 @@
 
 # %% auto 0
 __all__ = ['INGROUP_IDX_DTYPE', 'BootstrapList', 'GradientDescentList', 'GroupByGroupList', 'IndexPair', 'IndexPairsInGroup',
-           'IndexPairsInGroups', 'dccn', 'make_pbar', 'DiffPaSSResults', 'DiffPaSSModel']
+           'IndexPairsInGroups', 'ParameterSchedule', 'LinearSchedule', 'GeometricSchedule', 'LossAdaptiveSchedule',
+           'dccn', 'make_pbar', 'DiffPaSSResults', 'Workspace', 'DiffPaSSModel']
 
 # %% ../nbs/base.ipynb 4
 # Stdlib imports
-from copy import deepcopy
+from copy import copy, deepcopy
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, Any, Sequence, Union
 from dataclasses import fields, dataclass, replace
 
@@ -18,6 +20,7 @@ import numpy as np
 
 # PyTorch
 import torch
+import torch.utils.checkpoint
 from torch.nn import Module
 
 # DiffPaSS imports
@@ -27,6 +30,7 @@ from diffpass.model import (
     HammingSimilarities,
     BestHits,
 )
+from .symmetric_ops import packed_n_samples
 
 # Constants
 INGROUP_IDX_DTYPE = np.int16
@@ -41,6 +45,97 @@ IndexPairsInGroup = list[IndexPair]  # Pairs of indices in a group of sequences
 IndexPairsInGroups = list[IndexPairsInGroup]  # Pairs of indices in groups of sequences
 
 # %% ../nbs/base.ipynb 6
+class ParameterSchedule:
+    """Base class for schedules of hyperparameters of `GeneralizedPermutation` (`tau`,
+    `noise_factor` or `n_iter`) during a gradient descent run. Calling a schedule with
+    the current iteration, the total number of iterations and the latest soft loss
+    (``None`` if not available) returns the value of the hyperparameter."""
+
+    # Whether the schedule uses the soft loss
+    requires_loss: bool = False
+
+    def reset(self) -> None:
+        """Reset the state of the schedule at the start of a gradient descent run."""
+        pass
+
+    def __call__(self, epoch: int, epochs: int, loss: Optional[float] = None) -> float:
+        raise NotImplementedError
+
+
+class LinearSchedule(ParameterSchedule):
+    """Linear interpolation between `start`, at the first iteration, and `end`, at the
+    last iteration."""
+
+    def __init__(self, start: float, end: float) -> None:
+        self.start = start
+        self.end = end
+
+    def __call__(self, epoch: int, epochs: int, loss: Optional[float] = None) -> float:
+        return self.start + (self.end - self.start) * epoch / max(epochs, 1)
+
+
+class GeometricSchedule(ParameterSchedule):
+    """Geometric interpolation between `start`, at the first iteration, and `end`, at
+    the last iteration. `start` and `end` must be positive."""
+
+    def __init__(self, start: float, end: float) -> None:
+        if start <= 0 or end <= 0:
+            raise ValueError("`start` and `end` must be positive.")
+        self.start = start
+        self.end = end
+
+    def __call__(self, epoch: int, epochs: int, loss: Optional[float] = None) -> float:
+        return self.start * (self.end / self.start) ** (epoch / max(epochs, 1))
+
+
+class LossAdaptiveSchedule(ParameterSchedule):
+    """Start at `start` and multiply by `factor` whenever the soft loss has not
+    decreased for `patience` consecutive iterations. If not ``None``, `bound` is the
+    minimum (if `factor` < 1) or maximum (if `factor` > 1) value."""
+
+    requires_loss = True
+
+    def __init__(
+        self,
+        start: float,
+        *,
+        factor: float = 0.5,
+        patience: int = 1,
+        bound: Optional[float] = None,
+    ) -> None:
+        if factor <= 0:
+            raise ValueError("`factor` must be positive.")
+        if patience < 1:
+            raise ValueError("`patience` must be a positive integer.")
+        self.start = start
+        self.factor = factor
+        self.patience = patience
+        self.bound = bound
+        self.reset()
+
+    def reset(self) -> None:
+        self.value_ = self.start
+        self.lowest_loss_ = np.inf
+        self.n_iters_without_decrease_ = 0
+
+    def __call__(self, epoch: int, epochs: int, loss: Optional[float] = None) -> float:
+        if loss is None:
+            return self.value_
+        if loss < self.lowest_loss_:
+            self.lowest_loss_ = loss
+            self.n_iters_without_decrease_ = 0
+            return self.value_
+        self.n_iters_without_decrease_ += 1
+        if self.n_iters_without_decrease_ >= self.patience:
+            self.value_ *= self.factor
+            self.n_iters_without_decrease_ = 0
+            if self.bound is not None:
+                clip = max if self.factor < 1 else min
+                self.value_ = clip(self.value_, self.bound)
+
+        return self.value_
+
+# %% ../nbs/base.ipynb 11
 def dccn(x: torch.Tensor) -> np.ndarray:
     return x.detach().clone().cpu().numpy()
 
@@ -51,6 +146,15 @@ def make_pbar(epochs: int, show_pbar: bool) -> Any:
     return range(epochs + 1)
 
 
+@torch.compile
+def _compiled_forward(
+    model: torch.nn.Module, x: torch.Tensor, y: torch.Tensor
+) -> dict[str, Any]:
+    # Compiled graphs (and their backward) are cached by TorchDynamo and reused by
+    # models with the same group structure, fixed pairings and input shapes
+    return model(x, y)
+
+
 @dataclass
 class DiffPaSSResults:
     """Container for results of DiffPaSS fits."""
@@ -86,6 +190,57 @@ class DiffPaSSResults:
             BootstrapList[GradientDescentList[GroupByGroupList[float]]],
         ]
     ]
+    # Optionally, hard permutations refined by local search, starting from the hard
+    # permutations with the lowest hard loss
+    refined_hard_perms: Optional[GroupByGroupList[np.ndarray]] = None
+    # Optionally, hard loss of the refined hard permutations
+    refined_hard_loss: Optional[float] = None
+    # Gradient descent iteration at which each hard pass was performed, i.e. the
+    # iteration corresponding to each entry of `hard_perms` and `hard_losses`
+    hard_pass_epochs: Optional[
+        Union[
+            GradientDescentList[int],
+            BootstrapList[GradientDescentList[int]],
+        ]
+    ] = None
+    # Whether the fit was stopped early (for the DiffPaSS bootstrap, whether the
+    # bootstrap was terminated early)
+    stopped_early: Optional[bool] = None
+
+
+class Workspace:
+    """Arena of preallocated tensors, identified by name and reused across forward
+    passes. A tensor is only reallocated if it is requested with a different shape,
+    dtype or device, and is detached from any previous computational graph before
+    being handed out again, so its contents must not be needed beyond the backward
+    pass of the forward pass that wrote them."""
+
+    def __init__(self) -> None:
+        self._buffers = {}
+
+    def get(
+        self,
+        name: str,
+        shape: Sequence[int],
+        *,
+        like: torch.Tensor,
+        fill_value: Optional[float] = None,
+    ) -> torch.Tensor:
+        """Tensor called `name` with shape `shape` and the dtype and device of `like`.
+        If not ``None``, `fill_value` is used to fill it when it is allocated."""
+        buffer = self._buffers.get(name)
+        if (
+            buffer is None
+            or buffer.shape != shape
+            or buffer.dtype != like.dtype
+            or buffer.device != like.device
+        ):
+            buffer = torch.empty(shape, dtype=like.dtype, device=like.device)
+            if fill_value is not None:
+                buffer.fill_(fill_value)
+            self._buffers[name] = buffer
+
+        return buffer.detach_()
 
 
 class DiffPaSSModel(Module):
@@ -97,14 +252,24 @@ class DiffPaSSModel(Module):
         "noise",
         "noise_factor",
         "noise_std",
+        "max_size_exhaustive",
+        "n_noise_samples",
+        "warm_start_matching",
     }
+    allowed_schedule_keys = {"tau", "noise_factor", "n_iter"}
     allowed_information_measures = {"MI", "TwoBodyEntropy"}
     allowed_similarity_kinds = {"Hamming", "Blosum62"}
     allowed_similarities_cfg_keys = {
         "Hamming": {"use_dot", "p"},
         "Blosum62": {"use_dot", "p", "use_scoredist", "aa_to_int", "gaps_as_stars"},
     }
-    allowed_best_hits_cfg_keys = {"tau", "reciprocal"}
+    allowed_best_hits_cfg_keys = {
+        "tau",
+        "reciprocal",
+        "top_k",
+        "top_groups",
+        "tile_size",
+    }
 
     group_sizes: Sequence[int]
     fixed_pairings: Optional[IndexPairsInGroups]
@@ -120,6 +285,11 @@ class DiffPaSSModel(Module):
     best_hits_cfg: Optional[dict[str, Any]]
     effective_best_hits_cfg_: dict[str, Any]
     best_hits: BestHits
+    # Buffers for the large intermediate tensors of forward passes, reused during fits
+    workspace: Optional[Workspace] = None
+    # If not ``None``, number of segments in which to checkpoint activations during
+    # the current fit (see the `checkpoint_segments` argument of `fit`)
+    checkpoint_segments: Optional[int] = None
 
     single_fit_default_cfg = {
         "epochs": 1,
@@ -131,6 +301,17 @@ class DiffPaSSModel(Module):
         "record_log_alphas": False,
         "record_soft_perms": False,
         "record_soft_losses": False,
+        "hard_pass_every": 1,
+        "hard_pass_min_change": None,
+        "async_hard_pass": False,
+        "plateau_patience": None,
+        "plateau_min_delta": 0.0,
+        "unchanged_perms_patience": None,
+        "schedules": None,
+        "freeze_patience": None,
+        "unfreeze_every": None,
+        "compile_step": False,
+        "checkpoint_segments": None,
     }
 
     @staticmethod
@@ -244,9 +425,20 @@ class DiffPaSSModel(Module):
         y: torch.Tensor,
         *,
         check_same_alphabet_size: bool = True,
+        packed: bool = False,
     ) -> None:
-        """Validate input tensors representing aligned objects or (dis)similarity matrices."""
-        size_x, size_y = x.shape[0], y.shape[0]
+        """Validate input tensors representing aligned objects or (dis)similarity matrices.
+        If `packed` is ``True``, (dis)similarity matrices are expected in packed form (see
+        `pack_symmetric`)."""
+        if packed:
+            if x.ndim != 1 or y.ndim != 1:
+                raise ValueError(
+                    "Packed inputs must be 1D tensors of shape "
+                    "(n_samples * (n_samples + 1) / 2,)."
+                )
+            size_x, size_y = (packed_n_samples(z.shape[0]) for z in (x, y))
+        else:
+            size_x, size_y = x.shape[0], y.shape[0]
         if size_x != size_y:
             raise ValueError(f"Size mismatch between x ({size_x}) and y ({size_y}).")
 
@@ -259,6 +451,9 @@ class DiffPaSSModel(Module):
             _, alphabet_size_y = y.shape[1:]
             if check_same_alphabet_size and (alphabet_size_x != alphabet_size_y):
                 raise ValueError("Inputs must have the same alphabet size.")
+        elif packed:
+            # The shapes of packed inputs were validated above
+            pass
         elif x.ndim != 2 or y.ndim != 2:
             raise ValueError(
                 "Inputs must be 2D square tensors of shape (n_samples, n_samples)."
@@ -305,20 +500,88 @@ class DiffPaSSModel(Module):
                 module.hard_()
 
     def _hard_pass(
-        self, x: torch.Tensor, y: Optional[torch.Tensor], *, results: DiffPaSSResults
+        self,
+        x: torch.Tensor,
+        y: Optional[torch.Tensor],
+        *,
+        results: DiffPaSSResults,
+        epoch: int = 0,
+        log_alphas_flat: Optional[torch.Tensor] = None,
+        permutation_attrs: Optional[dict[str, Any]] = None,
     ) -> None:
+        """Compute hard permutations and loss, and record them in `results`. If not
+        ``None``, `log_alphas_flat` and the attributes in `permutation_attrs` are first loaded
+        into the permutation layer."""
         self.hard_()
+        if permutation_attrs is not None:
+            for name, value in permutation_attrs.items():
+                setattr(self.permutation, name, value)
         with torch.no_grad():
+            if log_alphas_flat is not None:
+                self.permutation.log_alphas_flat.copy_(log_alphas_flat)
             out = self(x, y)
             perms = out["perms"]
             loss = out["loss"]
+            # Fully determined hard permutations are precomputed by the permutation layer
+            static_hard_perms = self.permutation._static_hard_perms
             results.hard_perms.append(
                 [
-                    dccn(perms_this_group).argmax(axis=-1).astype(INGROUP_IDX_DTYPE)
-                    for perms_this_group in perms
+                    (
+                        static_hard_perms[idx]
+                        if idx in static_hard_perms
+                        else dccn(perms_this_group).argmax(axis=-1)
+                    ).astype(INGROUP_IDX_DTYPE)
+                    for idx, perms_this_group in enumerate(perms)
                 ]
             )
             results.hard_losses.append(loss.item())
+            results.hard_pass_epochs.append(epoch)
+
+    def _hard_pass_replica(self) -> "DiffPaSSModel":
+        """Shallow copy of the model, in hard mode, which shares precomputed buffers
+        with the model but has its own copies of all submodules with a soft/hard mode,
+        so that its hard passes can run concurrently with soft passes of the model."""
+        replica = copy(self)
+        replica._modules = {
+            name: deepcopy(module) if hasattr(module, "hard_") else module
+            for name, module in self._modules.items()
+        }
+        if self.workspace is not None:
+            replica.workspace = Workspace()
+        replica.hard_()
+
+        return replica
+
+    def _workspace_buffer(
+        self,
+        name: str,
+        shape: Sequence[int],
+        *,
+        like: torch.Tensor,
+        fill_value: Optional[float] = None,
+    ) -> Optional[torch.Tensor]:
+        """Tensor called `name` from `self.workspace` (see `Workspace.get`), or ``None``
+        if there is no workspace, i.e. outside of fits, or if activations are being
+        checkpointed, as their recomputation in the backward pass would overwrite it."""
+        if self.workspace is None or self._checkpointing:
+            return None
+
+        return self.workspace.get(name, shape, like=like, fill_value=fill_value)
+
+    @property
+    def _checkpointing(self) -> bool:
+        """Whether activations are checkpointed in the current forward pass."""
+        return self.checkpoint_segments is not None and torch.is_grad_enabled()
+
+    def _checkpointed(self, fn: callable, *args, **kwargs) -> Any:
+        """Call ``fn(*args, **kwargs)``, checkpointing it (see `torch.utils.checkpoint`)
+        if activations are being checkpointed in the current forward pass."""
+        if not self._checkpointing:
+            return fn(*args, **kwargs)
+
+        return torch.utils.checkpoint.checkpoint(
+            fn, *args, use_reentrant=False, **kwargs
+        )
 
     def _soft_pass(
         self,
@@ -328,11 +591,26 @@ class DiffPaSSModel(Module):
         results: DiffPaSSResults,
         record_soft_perms: bool = False,
         record_soft_losses: bool = False,
+        compile_step: bool = False,
     ) -> torch.Tensor:
         self.soft_()
-        out = self(x, y)
+        if compile_step:
+            # Populate the lazy cache of static permutation matrices before tracing.
+            # Compiled graphs do not use the workspace, as their memory is planned
+            # by the compiler
+            self.permutation._static_mats
+            workspace, self.workspace = self.workspace, None
+            try:
+                out = _compiled_forward(self, x, y)
+            finally:
+                self.workspace = workspace
+        else:
+            out = self(x, y)
         perms = out["perms"]
         loss = out["loss"]
+        if loss.ndim:
+            # Average over the batch of soft permutations, i.e. over Gumbel noise samples
+            loss = loss.mean()
         if record_soft_perms:
             results.soft_perms.append(
                 [dccn(perms_this_group) for perms_this_group in perms]
@@ -361,10 +639,44 @@ class DiffPaSSModel(Module):
             hard_perms=[],
             soft_losses=[] if record_soft_losses else None,
             hard_losses=[],
+            hard_pass_epochs=[],
         )
 
         return results
 
+    @staticmethod
+    def _is_converged(
+        hard_losses: GradientDescentList[float],
+        hard_perms: GradientDescentList[GroupByGroupList[np.ndarray]],
+        *,
+        plateau_patience: Optional[int] = single_fit_default_cfg["plateau_patience"],
+        plateau_min_delta: float = single_fit_default_cfg["plateau_min_delta"],
+        unchanged_perms_patience: Optional[int] = single_fit_default_cfg[
+            "unchanged_perms_patience"
+        ],
+    ) -> bool:
+        """Whether the hard passes of a fit so far meet an early stopping criterion:
+        no improvement of the lowest hard loss by more than `plateau_min_delta` in the
+        last `plateau_patience` hard passes, or identical hard permutations in the last
+        `unchanged_perms_patience` + 1 hard passes."""
+        if plateau_patience is not None and len(hard_losses) > plateau_patience:
+            lowest_loss_before = min(hard_losses[:-plateau_patience])
+            lowest_loss_since = min(hard_losses[-plateau_patience:])
+            if lowest_loss_since >= lowest_loss_before - plateau_min_delta:
+                return True
+        if (
+            unchanged_perms_patience is not None
+            and len(hard_perms) > unchanged_perms_patience
+        ):
+            latest_perms = hard_perms[-1]
+            if all(
+                all(map(np.array_equal, perms, latest_perms))
+                for perms in hard_perms[-unchanged_perms_patience - 1 : -1]
+            ):
+                return True
+
+        return False
+
     def check_can_optimize(self) -> bool:
         n_samples = sum(self.group_sizes)
         n_effectively_fixed = self.permutation._total_number_fixed_pairings
@@ -373,8 +685,37 @@ class DiffPaSSModel(Module):
 
     def mean_center_log_alphas(self) -> None:
         with torch.no_grad():
-            for log_alpha in self.permutation.log_alphas:
-                log_alpha[...] -= log_alpha.mean(dim=(-1, -2), keepdim=True)
+            for s in self.permutation._log_alphas_buckets:
+                log_alphas = self.permutation._stacked_log_alphas(s)
+                log_alphas -= log_alphas.mean(dim=(-1, -2), keepdim=True)
+
+    def refine_hard_perms(
+        self,
+        x: torch.Tensor,
+        y: torch.Tensor,
+        *,
+        hard_perms: GroupByGroupList[np.ndarray],
+        max_rounds: int = 100,
+    ) -> tuple[GroupByGroupList[np.ndarray], float]:
+        """Refine hard permutations, in the format of `DiffPaSSResults.hard_perms`, by
+        local search, performing at most `max_rounds` rounds of improving moves. Return
+        the refined hard permutations and their hard loss."""
+        raise NotImplementedError(
+            f"{type(self).__name__} does not support the refinement of hard "
+            "permutations."
+        )
+
+    def _refine_lowest_loss_hard_perms(
+        self, x: torch.Tensor, y: torch.Tensor, *, results: DiffPaSSResults
+    ) -> None:
+        """Refine the hard permutations with the lowest hard loss in `results`, whose
+        attributes must be lists indexed by hard pass."""
+        hard_perms = results.hard_perms[int(np.argmin(results.hard_losses))]
+        refined_hard_perms, refined_hard_loss = self.refine_hard_perms(
+            x, y, hard_perms=hard_perms
+        )
+        results.refined_hard_perms = refined_hard_perms
+        results.refined_hard_loss = refined_hard_loss
 
     def _fit(
         self,
@@ -393,52 +734,248 @@ class DiffPaSSModel(Module):
         record_log_alphas: bool = single_fit_default_cfg["record_log_alphas"],
         record_soft_perms: bool = single_fit_default_cfg["record_soft_perms"],
         record_soft_losses: bool = single_fit_default_cfg["record_soft_losses"],
+        hard_pass_every: int = single_fit_default_cfg["hard_pass_every"],
+        hard_pass_min_change: Optional[float] = single_fit_default_cfg[
+            "hard_pass_min_change"
+        ],
+        async_hard_pass: bool = single_fit_default_cfg["async_hard_pass"],
+        plateau_patience: Optional[int] = single_fit_default_cfg["plateau_patience"],
+        plateau_min_delta: float = single_fit_default_cfg["plateau_min_delta"],
+        unchanged_perms_patience: Optional[int] = single_fit_default_cfg[
+            "unchanged_perms_patience"
+        ],
+        schedules: Optional[dict[str, ParameterSchedule]] = single_fit_default_cfg[
+            "schedules"
+        ],
+        freeze_patience: Optional[int] = single_fit_default_cfg["freeze_patience"],
+        unfreeze_every: Optional[int] = single_fit_default_cfg["unfreeze_every"],
+        compile_step: bool = single_fit_default_cfg["compile_step"],
+        checkpoint_segments: Optional[int] = single_fit_default_cfg[
+            "checkpoint_segments"
+        ],
     ) -> bool:
+        if hard_pass_every < 1:
+            raise ValueError("`hard_pass_every` must be a positive integer.")
+        if hard_pass_min_change is not None and hard_pass_min_change < 0:
+            raise ValueError("`hard_pass_min_change` must be non-negative.")
+        for name, patience in [
+            ("plateau_patience", plateau_patience),
+            ("unchanged_perms_patience", unchanged_perms_patience),
+            ("freeze_patience", freeze_patience),
+            ("unfreeze_every", unfreeze_every),
+            ("checkpoint_segments", checkpoint_segments),
+        ]:
+            if patience is not None and patience < 1:
+                raise ValueError(f"`{name}` must be a positive integer.")
+        check_convergence = (
+            plateau_patience is not None or unchanged_perms_patience is not None
+        )
+        schedules = {} if schedules is None else schedules
+        if not set(schedules).issubset(self.allowed_schedule_keys):
+            raise ValueError(
+                f"Invalid keys in `schedules`: "
+                f"{set(schedules) - self.allowed_schedule_keys}"
+            )
+        results.stopped_early = False
+        self.checkpoint_segments = checkpoint_segments
+
         can_optimize = self.check_can_optimize()
         if can_optimize:
             # Initialize optimizer
             optimizer = self.create_optimizer(optimizer_name, optimizer_kwargs)
+            # Log-alphas at the latest hard pass, to measure how much they have moved
+            log_alphas_at_hard_pass = None
+            # Hard passes recorded in `results` before this fit
+            n_previous_hard_passes = len(results.hard_losses)
+            # Scheduled attributes of the permutation layer, restored after the fit
+            unscheduled_permutation_attrs = {
+                name: getattr(self.permutation, name) for name in schedules
+            }
+            for schedule in schedules.values():
+                schedule.reset()
+            track_soft_loss = any(s.requires_loss for s in schedules.values())
+            soft_loss = None
+            if freeze_patience is not None:
+                # Number of consecutive hard passes without changes in the hard
+                # permutation of each group, counting from the latest hard pass seen
+                n_unchanged = np.zeros(len(self.group_sizes), dtype=np.int64)
+                n_hard_passes_seen = n_previous_hard_passes
+                latest_hard_perms = None
+                group_starts = np.cumsum([0] + list(self.group_sizes[:-1]))
+                freezable_idxs = np.zeros(len(self.group_sizes), dtype=bool)
+                for idxs in self.permutation._log_alphas_buckets.values():
+                    freezable_idxs[idxs] = True
+            if async_hard_pass:
+                # Hard passes are performed, in order, by a single worker thread on a
+                # replica of the model, using snapshots of the log-alphas. Each one
+                # records its results in its own `DiffPaSSResults` object, and only the
+                # main thread appends them to `results`
+                hard_pass_replica = self._hard_pass_replica()
+                executor = ThreadPoolExecutor(max_workers=1)
+                pending_hard_passes = []
+
+                def collect_hard_passes(n_pending: int) -> None:
+                    """Wait for all but the latest `n_pending` submitted hard passes,
+                    and record their results in `results`, in epoch order."""
+                    while len(pending_hard_passes) > n_pending:
+                        hard_pass, hard_pass_results = pending_hard_passes.pop(0)
+                        hard_pass.result()
+                        for name in ["hard_perms", "hard_losses", "hard_pass_epochs"]:
+                            getattr(results, name).extend(
+                                getattr(hard_pass_results, name)
+                            )
 
             # ------------------------------------------------------------------------------------------
             ## Gradient descent
             # ------------------------------------------------------------------------------------------
             pbar = make_pbar(epochs, show_pbar)
-            for i in pbar:
-                # Record current log_alphas
-                if record_log_alphas:
-                    self._record_current_log_alphas(results)
-
-                # Hard pass
-                self._hard_pass(x, y, results=results)
-
-                # Soft pass and backward step
-                if i < epochs:
-                    loss = self._soft_pass(
-                        x,
-                        y,
-                        results=results,
-                        record_soft_perms=record_soft_perms,
-                        record_soft_losses=record_soft_losses,
-                    )
-                    loss.backward()
-                    optimizer.step()
-                    optimizer.zero_grad()
-                    if mean_centering:
-                        self.mean_center_log_alphas()
-                elif compute_final_soft:
-                    with torch.no_grad():
-                        self._soft_pass(
+            try:
+                for i in pbar:
+                    # Record current log_alphas
+                    if record_log_alphas:
+                        self._record_current_log_alphas(results)
+
+                    # Advance schedules
+                    for name, schedule in schedules.items():
+                        value = schedule(i, epochs, soft_loss)
+                        if name == "n_iter":
+                            value = max(1, round(value))
+                        setattr(self.permutation, name, value)
+
+                    # Hard pass, always performed at the first and last iterations
+                    is_hard_pass_due = i in (0, epochs) or not i % hard_pass_every
+                    if is_hard_pass_due and hard_pass_min_change is not None:
+                        log_alphas = self.permutation.log_alphas_flat.detach().clone()
+                        if i not in (0, epochs):
+                            max_change = (
+                                (log_alphas - log_alphas_at_hard_pass).abs().max()
+                            )
+                            is_hard_pass_due = max_change.item() > hard_pass_min_change
+                        if is_hard_pass_due:
+                            log_alphas_at_hard_pass = log_alphas
+                    if is_hard_pass_due and async_hard_pass:
+                        log_alphas_snapshot = (
+                            self.permutation.log_alphas_flat.detach().clone()
+                        )
+                        hard_pass_results = self._init_results()
+                        hard_pass = executor.submit(
+                            hard_pass_replica._hard_pass,
+                            x,
+                            y,
+                            results=hard_pass_results,
+                            epoch=i,
+                            log_alphas_flat=log_alphas_snapshot,
+                            permutation_attrs={
+                                name: getattr(self.permutation, name)
+                                for name in [*schedules, "frozen_hard_perms"]
+                            },
+                        )
+                        pending_hard_passes.append((hard_pass, hard_pass_results))
+                        # Decisions below only depend on the hard passes before the
+                        # latest one, which the worker runs while gradient descent
+                        # proceeds
+                        collect_hard_passes(1)
+                    elif is_hard_pass_due:
+                        self._hard_pass(x, y, results=results, epoch=i)
+
+                    # Freeze groups whose hard permutations have not changed in the
+                    # last `freeze_patience` hard passes, and periodically unfreeze all
+                    # groups
+                    if freeze_patience is not None:
+                        new_hard_perms = results.hard_perms[n_hard_passes_seen:]
+                        n_hard_passes_seen += len(new_hard_perms)
+                        for hard_perms in new_hard_perms:
+                            hard_perms = np.concatenate(hard_perms)
+                            if latest_hard_perms is not None:
+                                n_changes = np.add.reduceat(
+                                    hard_perms != latest_hard_perms, group_starts
+                                )
+                                n_unchanged = np.where(n_changes, 0, n_unchanged + 1)
+                            latest_hard_perms = hard_perms
+                        frozen_hard_perms = self.permutation.frozen_hard_perms
+                        if unfreeze_every is not None and i and not i % unfreeze_every:
+                            self.permutation.frozen_hard_perms = {}
+                            n_unchanged[:] = 0
+                        elif new_hard_perms:
+                            to_freeze = np.flatnonzero(
+                                freezable_idxs & (n_unchanged >= freeze_patience)
+                            )
+                            to_freeze = [
+                                idx
+                                for idx in to_freeze.tolist()
+                                if idx not in frozen_hard_perms
+                            ]
+                            if to_freeze:
+                                self.permutation.frozen_hard_perms = {
+                                    **frozen_hard_perms,
+                                    **{
+                                        idx: new_hard_perms[-1][idx]
+                                        for idx in to_freeze
+                                    },
+                                }
+
+                    # Early stopping, right after a hard pass so that the last iteration
+                    # has one. With asynchronous hard passes, the latest one is not
+                    # considered
+                    if check_convergence and is_hard_pass_due and i < epochs:
+                        results.stopped_early = self._is_converged(
+                            results.hard_losses[n_previous_hard_passes:],
+                            results.hard_perms[n_previous_hard_passes:],
+                            plateau_patience=plateau_patience,
+                            plateau_min_delta=plateau_min_delta,
+                            unchanged_perms_patience=unchanged_perms_patience,
+                        )
+
+                    # Soft pass and backward step
+                    if i < epochs and not results.stopped_early:
+                        loss = self._soft_pass(
                             x,
                             y,
                             results=results,
                             record_soft_perms=record_soft_perms,
                             record_soft_losses=record_soft_losses,
+                            compile_step=compile_step,
                         )
+                        if track_soft_loss:
+                            soft_loss = loss.item()
+                        # The loss is constant if all groups are frozen
+                        if loss.requires_grad:
+                            loss.backward()
+                            optimizer.step()
+                            optimizer.zero_grad()
+                            if mean_centering:
+                                self.mean_center_log_alphas()
+                            # Undo any update of frozen groups by stateful optimizers
+                            self.permutation.restore_frozen_log_alphas()
+                    elif compute_final_soft:
+                        with torch.no_grad():
+                            self._soft_pass(
+                                x,
+                                y,
+                                results=results,
+                                record_soft_perms=record_soft_perms,
+                                record_soft_losses=record_soft_losses,
+                            )
+                    if results.stopped_early:
+                        break
+                if async_hard_pass:
+                    # Wait for pending hard passes, raising any exception from the
+                    # worker
+                    collect_hard_passes(0)
+            finally:
+                for name, value in unscheduled_permutation_attrs.items():
+                    setattr(self.permutation, name, value)
+                self.permutation.frozen_hard_perms = {}
+                if async_hard_pass:
+                    # On exceptions, the hard pass being run (if any) can only write
+                    # into its own results
+                    executor.shutdown(wait=True, cancel_futures=True)
         else:
             # Just optionally record current log_alphas and do a single hard pass
             if record_log_alphas:
                 self._record_current_log_alphas(results)
             self._hard_pass(x, y, results=results)
+        self.checkpoint_segments = None
 
         return can_optimize
 
@@ -470,15 +1007,50 @@ class DiffPaSSModel(Module):
         ],  # If ``True``, record log-alphas at each gradient descent step. Default: ``False``
         record_soft_perms: bool = single_fit_default_cfg[
             "record_soft_perms"
-        ],  # If ``True``, record soft permutations at each gradient descent step. Default: ``False``
+        ],  # If ``True``, record soft permutations at each gradient descent step. If several Gumbel noise samples are drawn (see `GeneralizedPermutation`), soft permutations have a leading sample dimension. Default: ``False``
         record_soft_losses: bool = single_fit_default_cfg[
             "record_soft_losses"
         ],  # If ``True``, record soft losses at each gradient descent step. Default: ``False``
+        hard_pass_every: int = single_fit_default_cfg[
+            "hard_pass_every"
+        ],  # Compute hard permutations and losses only every `hard_pass_every` gradient descent steps. Hard passes are always performed before the first and after the last step. Default: 1
+        hard_pass_min_change: Optional[float] = single_fit_default_cfg[
+            "hard_pass_min_change"
+        ],  # If not ``None``, skip hard passes which would otherwise be performed if no log-alpha has changed by more than `hard_pass_min_change` (in absolute value) since the latest hard pass. Default: ``None``
+        async_hard_pass: bool = single_fit_default_cfg[
+            "async_hard_pass"
+        ],  # If ``True``, perform hard passes on a worker thread, using a copy of the log-alphas, while gradient descent proceeds. Results are recorded in the same order, and early stopping and freezing decisions at each hard pass only use the previous ones, so that they do not depend on the timing of the worker. Default: ``False``
+        plateau_patience: Optional[int] = single_fit_default_cfg[
+            "plateau_patience"
+        ],  # If not ``None``, stop early if the lowest hard loss has not decreased by more than `plateau_min_delta` in the last `plateau_patience` hard passes. Default: ``None``
+        plateau_min_delta: float = single_fit_default_cfg[
+            "plateau_min_delta"
+        ],  # Minimum decrease of the lowest hard loss for `plateau_patience`. Default: 0
+        unchanged_perms_patience: Optional[int] = single_fit_default_cfg[
+            "unchanged_perms_patience"
+        ],  # If not ``None``, stop early if the hard permutations have not changed in the last `unchanged_perms_patience` hard passes. Default: ``None``
+        schedules: Optional[dict[str, ParameterSchedule]] = single_fit_default_cfg[
+            "schedules"
+        ],  # If not ``None``, dictionary of `ParameterSchedule` objects for the `tau`, `noise_factor` or `n_iter` attributes of `self.permutation`, which are updated at each gradient descent iteration and restored at the end. Default: ``None``
+        freeze_patience: Optional[int] = single_fit_default_cfg[
+            "freeze_patience"
+        ],  # If not ``None``, freeze the groups whose hard permutations have not changed in the last `freeze_patience` hard passes: they keep these permutations, and are excluded from the Gumbel-Sinkhorn and Gumbel-matching operators (see `GeneralizedPermutation.frozen_hard_perms`), until the end of the fit. Their parameterization matrices are kept unchanged, also by stateful optimizers. Default: ``None``
+        unfreeze_every: Optional[int] = single_fit_default_cfg[
+            "unfreeze_every"
+        ],  # If not ``None`` (and `freeze_patience` is not ``None``), unfreeze all groups every `unfreeze_every` gradient descent iterations. Default: ``None``
+        compile_step: bool = single_fit_default_cfg[
+            "compile_step"
+        ],  # If ``True``, compile the forward and backward passes of gradient descent steps with `torch.compile`. Compiled graphs are reused by later fits with the same group structure, fixed pairings and input shapes, and recompiled otherwise (up to the TorchDynamo recompilation limit, beyond which eager mode is used). Not supported by `fit_bootstrap`, whose iterations change the fixed pairings. Default: ``False``
+        checkpoint_segments: Optional[int] = single_fit_default_cfg[
+            "checkpoint_segments"
+        ],  # If not ``None``, recompute the intermediate tensors of gradient descent steps in the backward pass instead of storing them (see `torch.utils.checkpoint`), trading compute for memory. Permuted inputs are checkpointed one bucket of equally sized groups at a time, and similarity matrices and best hits together with the loss. Information-theoretic losses are computed (and checkpointed) in `checkpoint_segments` segments of columns, also in hard passes. Default: ``None``
+        refine: bool = False,  # If ``True``, refine the hard permutations with the lowest hard loss by local search (see `refine_hard_perms`). Default: ``False``
     ) -> (
         DiffPaSSResults
-    ):  # `DiffPaSSResults` container for fit results. All attributes are lists indexed by gradient descent iteration
+    ):  # `DiffPaSSResults` container for fit results. All attributes are lists indexed by gradient descent iteration, except for the refined hard permutations and loss. Hard permutations and losses are indexed by hard pass, and the corresponding iterations are in `hard_pass_epochs`
         """Fit permutations to data using gradient descent."""
         self.prepare_fit(x, y)
+        self.workspace = Workspace()
 
         # Initialize DiffPaSSResults object
         results = self._init_results(
@@ -500,7 +1072,21 @@ class DiffPaSSModel(Module):
             record_log_alphas=record_log_alphas,
             record_soft_perms=record_soft_perms,
             record_soft_losses=record_soft_losses,
+            hard_pass_every=hard_pass_every,
+            hard_pass_min_change=hard_pass_min_change,
+            async_hard_pass=async_hard_pass,
+            plateau_patience=plateau_patience,
+            plateau_min_delta=plateau_min_delta,
+            unchanged_perms_patience=unchanged_perms_patience,
+            schedules=schedules,
+            freeze_patience=freeze_patience,
+            unfreeze_every=unfreeze_every,
+            compile_step=compile_step,
+            checkpoint_segments=checkpoint_segments,
         )
+        if refine:
+            self._refine_lowest_loss_hard_perms(x, y, results=results)
+        self.workspace = None
 
         return results
 
@@ -519,9 +1105,15 @@ class DiffPaSSModel(Module):
         single_fit_cfg: Optional[
             dict
         ] = None,  # If not ``None``, configuration dictionary for gradient optimization in each bootstrap iteration (call to `fit`). See `fit` for details
+        refine: bool = False,  # If ``True``, refine the hard permutations with the lowest hard loss across all bootstrap iterations by local search (see `refine_hard_perms`). Default: ``False``
+        warm_start: bool = False,  # If ``True``, initialize the parameterization matrices at each bootstrap iteration from those at the end of the previous one (of the run with the lowest hard loss, if `n_repeats` > 1), restricted to the rows and columns which are not fixed. Otherwise, initialize them to zero. Default: ``False``
+        warm_start_shrinkage: float = 0.0,  # Shrinkage toward zero of warm-started parameterization matrices, between 0 (no shrinkage) and 1 (equivalent to ``warm_start=False``). Default: 0
+        bootstrap_patience: Optional[
+            int
+        ] = None,  # If not ``None``, terminate the bootstrap early if the final hard permutations have not changed in the last `bootstrap_patience` bootstrap iterations. Default: ``None``
     ) -> (
         DiffPaSSResults
-    ):  # `DiffPaSSResults` container for fit results. All attributes are lists indexed by bootstrap iteration, containing lists indexed by gradient descent iteration as per `fit`
+    ):  # `DiffPaSSResults` container for fit results. All attributes are lists indexed by bootstrap iteration, containing lists indexed by gradient descent iteration as per `fit`, except for the refined hard permutations and loss
         """Fit permutations to data using the DiffPaSS bootstrap.
 
         The DiffPaSS bootstrap consists of a sequence of short gradient descent runs (default: one epoch per run).
@@ -533,31 +1125,33 @@ class DiffPaSSModel(Module):
 
         # Input validation
         self.prepare_fit(x, y)
+        if not 0.0 <= warm_start_shrinkage <= 1.0:
+            raise ValueError("`warm_start_shrinkage` must be between 0 and 1.")
+        if bootstrap_patience is not None and bootstrap_patience < 1:
+            raise ValueError("`bootstrap_patience` must be a positive integer.")
+        if single_fit_cfg is not None and single_fit_cfg.get("compile_step", False):
+            # Each bootstrap iteration changes the fixed pairings, which would trigger
+            # a recompilation costing more than the compiled steps save
+            raise ValueError("`compile_step` is not supported by `fit_bootstrap`.")
+        self.workspace = Workspace()
 
         # Prepare variables for indexing
         n_samples = len(x)
-        n_groups = len(self.group_sizes)
         cumsum_group_sizes = np.cumsum([0] + list(self.group_sizes))
         offsets = np.repeat(cumsum_group_sizes[:-1], repeats=self.group_sizes)
-        group_idxs = np.repeat(np.arange(n_groups), repeats=self.group_sizes)
 
-        # Initially fixed pairings as derived from the `fixed_pairings` attribute
-        if self.fixed_pairings is None:
-            initially_fixed_pairings = [[] for _ in self.group_sizes]
-        else:
-            initially_fixed_pairings = [list(fm) for fm in self.fixed_pairings]
+        # Initially fixed pairings as derived from the `fixed_pairings` attribute, as
+        # pairs of global indices (not relative to group)
+        initially_fixed_pairs = self.permutation._validate_fixed_pairings(
+            self.fixed_pairings
+        )
+        if initially_fixed_pairs is None:
+            initially_fixed_pairs = np.empty((2, 0), dtype=np.int64)
 
         # *Effective* initially fixed pairings as global indices (not relative to group)
         # Used to exclude these pairs from the random sampling of new fixed pairings
         # and to determine when the bootstrap will end
-        effective_initially_fixed_idxs = []
-        for s, efmz in zip(
-            cumsum_group_sizes, self.permutation._effective_fixed_pairings_zip
-        ):
-            if efmz:
-                effective_initially_fixed_idxs += [
-                    s + efmz_fixed for efmz_fixed in efmz[1]
-                ]
+        effective_initially_fixed_idxs = self.permutation._effective_fixed_pairs[1]
         non_initially_fixed_idxs = np.setdiff1d(
             np.arange(n_samples), effective_initially_fixed_idxs
         )
@@ -571,29 +1165,18 @@ class DiffPaSSModel(Module):
 
         ########## Closures ##########
 
-        def make_new_fixed_pairings(
-            mapped_idxs: np.ndarray, N: int
-        ) -> IndexPairsInGroups:
-            """Subroutine for randomly sampling new fixed pairings for the next bootstrap iteration."""
+        def make_new_fixed_pairings(mapped_idxs: np.ndarray, N: int) -> np.ndarray:
+            """Subroutine for randomly sampling new fixed pairings for the next bootstrap iteration.
+            Fixed pairings are returned as pairs of global indices, see
+            `GeneralizedPermutation.init_fixed_pairings_and_log_alphas`."""
             rand_fixed_idxs = np.random.permutation(non_initially_fixed_idxs)[:N]
             rand_fixed_idxs = np.sort(rand_fixed_idxs)
             rand_mapped_idxs = mapped_idxs[rand_fixed_idxs]
-            rand_group_idxs = group_idxs[rand_fixed_idxs]
-            rand_fixed_rel_idxs = rand_fixed_idxs - offsets[rand_fixed_idxs]
-            rand_mapped_rel_idxs = rand_mapped_idxs - offsets[rand_mapped_idxs]
-
-            # Update fixed pairings
-            fixed_pairings = [[] for _ in range(n_groups)]
-            for rand_group_idx, mapped_rel_idx, fixed_rel_idx in zip(
-                rand_group_idxs, rand_mapped_rel_idxs, rand_fixed_rel_idxs
-            ):
-                pair = (mapped_rel_idx, fixed_rel_idx)
-                fixed_pairings[rand_group_idx].append(pair)
-            fixed_pairings = [
-                initially_fixed_pairings[k] + fixed_pairings[k] for k in range(n_groups)
-            ]
 
-            return fixed_pairings
+            return np.concatenate(
+                [initially_fixed_pairs, np.stack([rand_mapped_idxs, rand_fixed_idxs])],
+                axis=1,
+            )
 
         def init_diffpassresults() -> DiffPaSSResults:
             return self._init_results(
@@ -602,34 +1185,36 @@ class DiffPaSSModel(Module):
                 record_soft_losses=single_fit_cfg["record_soft_losses"],
             )
 
+        def field_lengths(results_to_measure: DiffPaSSResults) -> dict[str, int]:
+            return {
+                field_name: len(getattr(results_to_measure, field_name))
+                for field_name in available_fields
+            }
+
         def extend_results_with_lowest_loss_repeat(
             results_this_iter: DiffPaSSResults,
             results: DiffPaSSResults,
-            can_optimize: bool,
+            start_lengths: dict[str, int],
+            stop_lengths: dict[str, int],
         ) -> None:
             """Extend the global optimization object `results` with the portion of
             `results_this_iter` (from the latest bootstrap iteration) corresponding to
-            the repeat with the lowest hard loss."""
-            if can_optimize:
-                # Select run with lowest hard loss, discard the rest
-                reshaped_hard_losses_this_repeat = np.asarray(
-                    results_this_iter.hard_losses
-                ).reshape(n_repeats, -1)
-                min_loss_idx = np.argmin(reshaped_hard_losses_this_repeat[:, -1])
-                size_each_repeat = reshaped_hard_losses_this_repeat.shape[1]
-                # Record complete results of the run with the lowest loss
-                slice_to_append = slice(
-                    min_loss_idx * size_each_repeat,
-                    (min_loss_idx + 1) * size_each_repeat,
-                )
-            else:
-                slice_to_append = slice(None)
-            [
+            the repeat with the lowest hard loss, delimited by the field lengths
+            `start_lengths` and `stop_lengths`."""
+            for field_name in available_fields:
                 getattr(results, field_name).extend(
-                    getattr(results_this_iter, field_name)[slice_to_append]
+                    getattr(results_this_iter, field_name)[
+                        start_lengths[field_name] : stop_lengths[field_name]
+                    ]
                 )
-                for field_name in available_fields
-            ]
+
+        def log_alphas_for_warm_start() -> Optional[torch.Tensor]:
+            """Current parameterization matrices, shrunk toward zero, to initialize
+            those at the next bootstrap iteration (``None`` if not warm-starting)."""
+            if not warm_start:
+                return None
+
+            return (1 - warm_start_shrinkage) * self.permutation.full_log_alphas_flat()
 
         postprocess_results_after_repeats = (
             extend_results_with_lowest_loss_repeat
@@ -652,13 +1237,18 @@ class DiffPaSSModel(Module):
             for field in fields(results)
             if getattr(results, field.name) is not None
         ]
-        field_to_length_so_far = {field_name: 0 for field_name in available_fields}
+        # Lengths of the fields of `results` at the end of each bootstrap iteration with
+        # optimization, used to reshape results by bootstrap iteration. The number of
+        # hard passes may differ between iterations (see `hard_pass_min_change`)
+        lengths_at_iter_ends = [field_lengths(results)]
 
         ########## Optimization ##########
 
         # First fit with initially fixed pairings
         can_optimize = self._fit(x, y, results=results, **single_fit_cfg)
-        n_iters_with_optimization = int(can_optimize)
+        if can_optimize:
+            lengths_at_iter_ends.append(field_lengths(results))
+        warm_start_from = log_alphas_for_warm_start()
 
         # DiffPaSSResults object for each bootstrap iteration:
         # new object if `n_repeats` > 1, else the existing `results`
@@ -666,6 +1256,11 @@ class DiffPaSSModel(Module):
             init_diffpassresults if n_repeats > 1 else lambda: results
         )
 
+        # Number of consecutive bootstrap iterations with unchanged final hard
+        # permutations
+        n_iters_unchanged = 0
+        stopped_early = False
+
         # Subsequent bootstrap fits: at a given iteration we use fixed pairings chosen uniformly at
         # random from the results of the previous iteration (excluding the effective initially
         # fixed pairings)
@@ -673,69 +1268,85 @@ class DiffPaSSModel(Module):
             latest_hard_perms = results.hard_perms[-1]
             mapped_idxs = offsets + np.concatenate(latest_hard_perms)
 
-            field_to_length_so_far = {
-                field_name: len(getattr(results, field_name))
-                for field_name in available_fields
-            }
-
             results_this_iter = (
                 get_results_to_use_in_each_bootstrap_iter()
             )  # `results` alias if `n_repeats` == 1
-            for _ in range(n_repeats):
+            # Lengths of the fields of `results_this_iter` at the start and end of each
+            # repeat
+            lengths_at_repeat_ends = [field_lengths(results_this_iter)]
+            lowest_final_hard_loss = np.inf
+            lowest_loss_repeat_idx = 0
+            for repeat_idx in range(n_repeats):
                 # Randomly sample N fixed pairings
                 fixed_pairings = make_new_fixed_pairings(mapped_idxs, N)
                 # Reinitialize permutation module with new fixed pairings
                 self.permutation.init_fixed_pairings_and_log_alphas(
-                    fixed_pairings, device=x.device
+                    fixed_pairings, device=x.device, warm_start_from=warm_start_from
                 )
                 # Fit with gradient descent
                 can_optimize = self._fit(
                     x, y, results=results_this_iter, **single_fit_cfg
                 )
+                lengths_at_repeat_ends.append(field_lengths(results_this_iter))
                 if not can_optimize:
                     # If we can't fit, we break the "repeats" loop
                     break
+                # Keep the parameterization matrices of the repeat with the lowest
+                # final hard loss, for warm-starting the next bootstrap iteration
+                if results_this_iter.hard_losses[-1] < lowest_final_hard_loss:
+                    lowest_final_hard_loss = results_this_iter.hard_losses[-1]
+                    lowest_loss_repeat_idx = repeat_idx
+                    log_alphas_lowest_loss_repeat = log_alphas_for_warm_start()
 
             postprocess_results_after_repeats(
-                results_this_iter, results, can_optimize
+                results_this_iter,
+                results,
+                lengths_at_repeat_ends[lowest_loss_repeat_idx],
+                lengths_at_repeat_ends[lowest_loss_repeat_idx + 1],
             )  # Does nothing if `n_repeats` == 1
 
             if can_optimize:
-                n_iters_with_optimization += 1
+                lengths_at_iter_ends.append(field_lengths(results))
+                warm_start_from = log_alphas_lowest_loss_repeat
             else:
                 # If we could not fit, terminate the bootstrap
                 break
 
+            if bootstrap_patience is not None:
+                is_unchanged = all(
+                    map(np.array_equal, results.hard_perms[-1], latest_hard_perms)
+                )
+                n_iters_unchanged = n_iters_unchanged + 1 if is_unchanged else 0
+                if n_iters_unchanged >= bootstrap_patience:
+                    stopped_early = True
+                    break
+
         ########## End optimization ##########
 
         ########## Post-processing ##########
 
+        # Results are not reshaped yet, so all hard passes are compared
+        if refine:
+            self._refine_lowest_loss_hard_perms(x, y, results=results)
+
         # Reshape results according to number of iterations performed
         reshaped_fields = {}
         for field_name in available_fields:
             results_this_field = getattr(results, field_name)
-            n_optimized_results_this_field = (
-                len(results_this_field)
-                if can_optimize
-                else field_to_length_so_far[field_name]
-            )
-            n_unoptimized_results_this_field = (
-                len(results_this_field) - n_optimized_results_this_field
-            )
-
-            assert not n_optimized_results_this_field % n_iters_with_optimization
-            n_in_each_optimized_iter = (
-                n_optimized_results_this_field // n_iters_with_optimization
-            )
             reshaped_fields[field_name] = [
-                results_this_field[
-                    j * n_in_each_optimized_iter : (j + 1) * n_in_each_optimized_iter
-                ]
-                for j in range(n_iters_with_optimization)
-            ] + [results_this_field[n_optimized_results_this_field:]] * bool(
-                n_unoptimized_results_this_field
-            )
-        results = replace(results, **reshaped_fields)
+                results_this_field[start[field_name] : stop[field_name]]
+                for start, stop in zip(
+                    lengths_at_iter_ends[:-1], lengths_at_iter_ends[1:]
+                )
+            ]
+            # Results of a final iteration without optimization, if any
+            n_optimized_results_this_field = lengths_at_iter_ends[-1][field_name]
+            if len(results_this_field) > n_optimized_results_this_field:
+                reshaped_fields[field_name].append(
+                    results_this_field[n_optimized_results_this_field:]
+                )
+        results = replace(results, **reshaped_fields, stopped_early=stopped_early)
+        self.workspace = None
 
         ########## End post-processing ##########
 
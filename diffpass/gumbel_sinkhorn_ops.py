@@ -2,10 +2,13 @@
 
 # %% auto 0
 __all__ = ['randperm_mat_like', 'unbias_by_randperms', 'gumbel_noise_like', 'sinkhorn_norm', 'log_sinkhorn_norm',
-           'gumbel_sinkhorn', 'np_matching', 'matching', 'gumbel_matching', 'inverse_permutation']
+           'gumbel_sinkhorn', 'np_matching', 'matching', 'unbiased_matching', 'warm_started_matching',
+           'exhaustive_matching', 'gumbel_matching', 'inverse_permutation']
 
 # %% ../nbs/gumbel_sinkhorn_ops.ipynb 4
-from typing import Union
+from functools import lru_cache
+from itertools import permutations
+from typing import Optional, Union
 
 import numpy as np
 from scipy.optimize import linear_sum_assignment
@@ -67,8 +70,7 @@ def sinkhorn_norm(alpha: torch.Tensor, n_iter: int = 20) -> torch.Tensor:
 
 
 @torch.compile
-def log_sinkhorn_norm(log_alpha: torch.Tensor, n_iter: int = 20) -> torch.Tensor:
-    """Iterative Sinkhorn normalization in log space, for numerical stability."""
+def _log_sinkhorn_iters(log_alpha: torch.Tensor, n_iter: int) -> torch.Tensor:
     for _ in range(n_iter):
         log_alpha = log_alpha - torch.logsumexp(log_alpha, -1, keepdim=True)
         log_alpha = log_alpha - torch.logsumexp(log_alpha, -2, keepdim=True)
@@ -76,6 +78,20 @@ def log_sinkhorn_norm(log_alpha: torch.Tensor, n_iter: int = 20) -> torch.Tensor
     return log_alpha
 
 
+def log_sinkhorn_norm(log_alpha: torch.Tensor, n_iter: int = 20) -> torch.Tensor:
+    """Iterative Sinkhorn normalization in log space, for numerical stability.
+    Iterations are run by compiled chunks whose lengths are powers of two, so that
+    varying `n_iter` only triggers compilation for new powers of two."""
+    chunk = 1
+    while n_iter:
+        if n_iter & chunk:
+            log_alpha = _log_sinkhorn_iters(log_alpha, chunk)
+            n_iter -= chunk
+        chunk <<= 1
+
+    return log_alpha
+
+
 def gumbel_sinkhorn(
     log_alpha: torch.Tensor,
     *,
@@ -108,18 +124,161 @@ def np_matching(cost: np.ndarray) -> np.ndarray:
     return np_matching_mat
 
 
+def _np_matching_cols(cost: np.ndarray) -> np.ndarray:
+    """Column assigned to each row by the Hungarian algorithm (maximization), for a
+    batch of square matrices of shape (*batch_size, n, n)."""
+    cols = np.empty(cost.shape[:-1], dtype=np.int64)
+    for idx in np.ndindex(cost.shape[:-2]):
+        cols[idx] = linear_sum_assignment(cost[idx], maximize=True)[1]
+
+    return cols
+
+
+def _one_hot_like(cols: torch.Tensor, log_alpha: torch.Tensor) -> torch.Tensor:
+    """Permutation matrices with ones at positions ``(..., i, cols[..., i])``."""
+    return torch.zeros_like(log_alpha, requires_grad=False).scatter_(
+        -1, cols.unsqueeze(-1), 1
+    )
+
+
 def matching(
     log_alpha: torch.Tensor,
 ) -> torch.Tensor:
-    np_log_alpha = log_alpha.detach().clone().cpu().numpy()
-    np_matching_mats = np.zeros_like(np_log_alpha)
-    for idx in np.ndindex(np_log_alpha.shape[:-2]):
-        np_matching_mats[idx] = np_matching(np_log_alpha[idx])
-    matching_mats = (
-        torch.from_numpy(np_matching_mats).to(log_alpha.device).to(log_alpha.dtype)
+    cols = _np_matching_cols(log_alpha.detach().cpu().numpy())
+
+    return _one_hot_like(torch.from_numpy(cols).to(log_alpha.device), log_alpha)
+
+
+def unbiased_matching(log_alpha: torch.Tensor) -> torch.Tensor:
+    """Same as ``unbias_by_randperms(matching)``, but with independent random row and
+    column relabelings for each matrix in the batch, applied by indexing instead of by
+    multiplication with dense permutation matrices."""
+    return _one_hot_like(_unbiased_matching_cols(log_alpha), log_alpha)
+
+
+def _unbiased_matching_cols(log_alpha: torch.Tensor) -> torch.Tensor:
+    """Column assigned to each row by `unbiased_matching`."""
+    n = log_alpha.shape[-1]
+    batch_shape = log_alpha.shape[:-2]
+    row_perms = torch.rand(*batch_shape, n, device=log_alpha.device).argsort(-1)
+    col_perms = torch.rand(*batch_shape, n, device=log_alpha.device).argsort(-1)
+    # log_alpha_conj[..., i, j] = log_alpha[..., row_perms[i], col_perms[j]]
+    log_alpha_conj = log_alpha.detach().gather(
+        -2, row_perms.unsqueeze(-1).expand(*batch_shape, n, n)
+    )
+    log_alpha_conj = log_alpha_conj.gather(
+        -1, col_perms.unsqueeze(-2).expand(*batch_shape, n, n)
     )
+    cols_conj = torch.from_numpy(_np_matching_cols(log_alpha_conj.cpu().numpy()))
+    cols_conj = cols_conj.to(log_alpha.device)
+    # Row row_perms[i] of log_alpha is assigned to column col_perms[cols_conj[i]]
+    return torch.empty_like(row_perms).scatter_(
+        -1, row_perms, col_perms.gather(-1, cols_conj)
+    )
+
+
+def _certify_matching(
+    log_alpha: torch.Tensor, cols: torch.Tensor, potentials: torch.Tensor, max_iter: int
+) -> tuple[torch.Tensor, torch.Tensor]:
+    """Raise the column potentials `potentials`, of shape (..., n), for at most
+    `max_iter` rounds, towards dual variables for which the assignments `cols` of the
+    matrices in `log_alpha` are tight. Return whether this was reached, which
+    certifies that the assignments are optimal, and the updated potentials."""
+    # An assignment is optimal iff there are potentials v such that, for all i and j,
+    # log_alpha[i, j] - v[j] <= log_alpha[i, cols[i]] - v[cols[i]]
+    reduced = log_alpha - log_alpha.gather(-1, cols.unsqueeze(-1))
+    is_certified = torch.zeros(
+        log_alpha.shape[:-2], dtype=torch.bool, device=log_alpha.device
+    )
+    for _ in range(max_iter):
+        new_potentials = torch.maximum(
+            potentials, (reduced + potentials.gather(-1, cols).unsqueeze(-1)).amax(-2)
+        )
+        is_certified = (new_potentials == potentials).all(-1)
+        potentials = new_potentials
+        if is_certified.all():
+            break
+
+    return is_certified, potentials
+
+
+def warm_started_matching(
+    log_alpha: torch.Tensor,
+    *,
+    cols: Optional[torch.Tensor] = None,
+    potentials: Optional[torch.Tensor] = None,
+    unbias_lsa: bool = False,
+    max_iter: int = 10,
+) -> tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+    """Solve the linear assignment problem (maximization) for a batch of square
+    matrices of shape (..., n, n), warm-started from previous assignments `cols` and
+    column potentials `potentials`, both of shape (..., n), as returned by a previous
+    call on similar matrices.
+
+    The previous assignment of a matrix is kept if it is still optimal, as certified
+    by at most `max_iter` rounds of O(n^2) updates of its potentials. Otherwise, the
+    problem is solved by `unbiased_matching` (if `unbias_lsa` is ``True``) or
+    `matching`. Ties between optimal assignments are only broken at random in the
+    latter case. Return the assignment matrices, the assignments and the potentials,
+    to be passed to the next call."""
+    log_alpha = log_alpha.detach()
+    if cols is None:
+        cols = torch.empty(
+            log_alpha.shape[:-1], dtype=torch.long, device=log_alpha.device
+        )
+        potentials = torch.zeros_like(log_alpha[..., 0, :])
+        is_certified = torch.zeros(
+            log_alpha.shape[:-2], dtype=torch.bool, device=log_alpha.device
+        )
+    else:
+        is_certified, new_potentials = _certify_matching(
+            log_alpha, cols, potentials, max_iter
+        )
+        potentials = torch.where(is_certified.unsqueeze(-1), new_potentials, potentials)
+    if not is_certified.all():
+        to_solve = ~is_certified
+        if unbias_lsa:
+            new_cols = _unbiased_matching_cols(log_alpha[to_solve])
+        else:
+            new_cols = torch.from_numpy(
+                _np_matching_cols(log_alpha[to_solve].cpu().numpy())
+            ).to(log_alpha.device)
+        cols = cols.clone()
+        cols[to_solve] = new_cols
+        potentials = potentials.clone()
+        # Optimal assignments are certified in at most n rounds
+        potentials[to_solve] = _certify_matching(
+            log_alpha[to_solve], new_cols, potentials[to_solve], log_alpha.shape[-1]
+        )[1]
+
+    return _one_hot_like(cols, log_alpha), cols, potentials
+
+
+@lru_cache
+def _all_permutations(n: int) -> torch.Tensor:
+    """All permutations of ``range(n)``, as a tensor of shape (n!, n)."""
+    return torch.tensor(list(permutations(range(n))), dtype=torch.long).view(-1, n)
+
+
+def exhaustive_matching(
+    log_alpha: torch.Tensor, *, unbias_ties: bool = False
+) -> torch.Tensor:
+    """Exact solution of the linear assignment problem (maximization) for batches of
+    small square matrices of shape (..., n, n), obtained by scoring all n! permutations
+    with a single batched gather. If `unbias_ties` is ``True``, ties between optimal
+    assignments are broken uniformly at random."""
+    n = log_alpha.shape[-1]
+    if n <= 1:
+        return torch.ones_like(log_alpha).detach()
+    all_perms = _all_permutations(n).to(log_alpha.device)
+    rows = torch.arange(n, device=log_alpha.device)
+    scores = log_alpha.detach()[..., rows, all_perms].sum(-1)
+    if unbias_ties:
+        is_optimal = scores == scores.amax(-1, keepdim=True)
+        scores = torch.where(is_optimal, torch.rand_like(scores), -1.0)
+    best_perms = all_perms[scores.argmax(-1)]
 
-    return matching_mats
+    return torch.nn.functional.one_hot(best_perms, n).to(log_alpha.dtype)
 
 
 def gumbel_matching(
@@ -129,19 +288,24 @@ def gumbel_matching(
     noise_factor: float = 1.0,
     noise_std: bool = False,
     unbias_lsa: bool = False,
+    exhaustive: bool = False,
 ) -> torch.Tensor:
     """Gumbel-matching operator, i.e. the solution of the linear assignment problem with
-    optional Gumbel noise."""
+    optional Gumbel noise. If `exhaustive` is ``True``, the problem is solved with
+    `exhaustive_matching` (suitable for small matrices only) and, if `unbias_lsa` is
+    ``True``, ties are broken uniformly at random."""
     if noise:
         log_alpha = log_alpha + gumbel_noise_like(
             log_alpha, noise_factor=noise_factor, noise_std=noise_std
         )
-    gumbel_matching_impl = unbias_by_randperms(matching) if unbias_lsa else matching
+    if exhaustive:
+        return exhaustive_matching(log_alpha, unbias_ties=unbias_lsa)
+    gumbel_matching_impl = unbiased_matching if unbias_lsa else matching
     assignment_mat = gumbel_matching_impl(log_alpha)
 
     return assignment_mat
 
-# %% ../nbs/gumbel_sinkhorn_ops.ipynb 9
+# %% ../nbs/gumbel_sinkhorn_ops.ipynb 14
 def inverse_permutation(x: torch.Tensor, mats: torch.Tensor) -> torch.Tensor:
     """When mats contains permutation matrices, exchange the rows of `x` using the inverse(s)
     of the permutation(s) encoded in `mats`."""
@@ -18,10 +18,16 @@ import numpy as np
 
 # PyTorch
 import torch
-from torch.nn import Module, ParameterList, Parameter
+from torch.nn import Module, Parameter
+import torch.utils.checkpoint
 
 # DiffPaSS imports
-from .gumbel_sinkhorn_ops import gumbel_sinkhorn, gumbel_matching
+from diffpass.gumbel_sinkhorn_ops import (
+    gumbel_sinkhorn,
+    gumbel_matching,
+    gumbel_noise_like,
+    warm_started_matching,
+)
 from diffpass.entropy_ops import (
     smooth_mean_one_body_entropy,
     smooth_mean_two_body_entropy,
@@ -34,6 +40,16 @@ from diffpass.sequence_similarity_ops import (
     smooth_substitution_matrix_similarities_cdist,
     soft_best_hits,
     hard_best_hits,
+    hard_best_hits_sparse,
+    streaming_best_hits,
+)
+from diffpass.symmetric_ops import (
+    packed_diag_blocks_idxs,
+    packed_diagonal_idxs,
+    packed_n_samples,
+    packed_symmetric_dot,
+    packed_symmetric_idxs,
+    permute_packed_symmetric,
 )
 
 # Type aliases
@@ -49,24 +65,262 @@ def _consecutive_slices_from_sizes(group_sizes: Optional[Sequence[int]]) -> list
 
     return [slice(start, end) for start, end in zip([0] + cumsum, cumsum)]
 
+
+def _group_idxs_by_size(group_sizes: Sequence[int]) -> dict[int, np.ndarray]:
+    """Map each distinct group size to the indices of the groups of that size."""
+    group_sizes = np.asarray(group_sizes)
+
+    return {
+        s: np.flatnonzero(group_sizes == s) for s in np.unique(group_sizes).tolist()
+    }
+
+
+def _diag_blocks_idxs(group_sizes: Sequence[int]) -> list[torch.Tensor]:
+    """Indices of the rows (equivalently, columns) in each main diagonal block of a
+    square matrix partitioned according to `group_sizes`. Blocks are bucketed by size,
+    so that each element of the output has shape (n_groups_of_size_s, s)."""
+    offsets = np.cumsum(group_sizes) - np.asarray(group_sizes)
+
+    return [
+        torch.as_tensor(offsets[group_idxs, None] + np.arange(s))
+        for s, group_idxs in _group_idxs_by_size(group_sizes).items()
+    ]
+
+
+def _register_diag_blocks_idxs(module: Module, group_sizes: Sequence[int]) -> None:
+    """Register the output of `_diag_blocks_idxs` as non-persistent buffers of `module`."""
+    diag_blocks_idxs = _diag_blocks_idxs(group_sizes)
+    module._n_diag_blocks_buckets = len(diag_blocks_idxs)
+    for idx, idxs in enumerate(diag_blocks_idxs):
+        module.register_buffer(f"_diag_blocks_idxs_{idx}", idxs, persistent=False)
+
+
+def _registered_diag_blocks_idxs(module: Module) -> list[torch.Tensor]:
+    return [
+        getattr(module, f"_diag_blocks_idxs_{idx}")
+        for idx in range(module._n_diag_blocks_buckets)
+    ]
+
+
+def _register_group_layout(module: Module, group_sizes: Sequence[int]) -> None:
+    """Register, as non-persistent buffers of `module`, the group index of each sample,
+    and the size, first sample and offset in the concatenation of flattened diagonal
+    blocks of each group."""
+    sizes = torch.as_tensor(group_sizes)
+    module.register_buffer(
+        "_sample_group_idxs",
+        torch.repeat_interleave(torch.arange(len(sizes)), sizes),
+        persistent=False,
+    )
+    module.register_buffer("_group_sizes", sizes, persistent=False)
+    module.register_buffer(
+        "_group_starts", torch.cumsum(sizes, 0) - sizes, persistent=False
+    )
+    module.register_buffer(
+        "_group_block_offsets", torch.cumsum(sizes**2, 0) - sizes**2, persistent=False
+    )
+
+
+def _block_diag_flat_idxs(
+    module: Module, rows: torch.Tensor, cols: torch.Tensor
+) -> torch.Tensor:
+    """Positions of the entries (`rows`, `cols`) of a block diagonal matrix in the
+    concatenation of its flattened diagonal blocks, using the buffers registered by
+    `_register_group_layout`. Each entry must be in a diagonal block."""
+    groups = module._sample_group_idxs[rows]
+    starts = module._group_starts[groups]
+
+    return (
+        module._group_block_offsets[groups]
+        + (rows - starts) * module._group_sizes[groups]
+        + (cols - starts)
+    )
+
+
+def _requires_grad(*tensors: torch.Tensor) -> bool:
+    """Whether operations on `tensors` are recorded by autograd, in which case results
+    cannot be written into preallocated tensors using `out` arguments."""
+    return torch.is_grad_enabled() and any(t.requires_grad for t in tensors)
+
+
+def _is_sparse(x: torch.Tensor) -> bool:
+    return x.layout in (torch.sparse_coo, torch.sparse_csr)
+
+
+def _coalesced_coo(x: torch.Tensor) -> torch.Tensor:
+    """Convert a sparse COO or CSR tensor to a coalesced sparse COO tensor."""
+    if x.layout == torch.sparse_csr:
+        x = x.to_sparse_coo()
+
+    return x.coalesce()
+
+
+def _register_bucket_order(module: Module) -> None:
+    """Register, as non-persistent buffers of `module`, the order in which rows are
+    arranged when concatenating the buckets registered by `_register_diag_blocks_idxs`,
+    and its inverse."""
+    diag_blocks_idxs = _registered_diag_blocks_idxs(module)
+    module._bucket_sizes = [idxs.numel() for idxs in diag_blocks_idxs]
+    order = torch.cat([idxs.flatten() for idxs in diag_blocks_idxs])
+    module.register_buffer("_bucket_order", order, persistent=False)
+    module.register_buffer(
+        "_bucket_order_inverse", torch.argsort(order), persistent=False
+    )
+
+
+def _sparse_dot(
+    x: torch.Tensor,
+    y: torch.Tensor,
+    *,
+    is_included: callable,
+) -> torch.Tensor:
+    """Dot product between `x` and `y`, at least one of which is a sparse COO or CSR
+    tensor, restricted to the entries (`rows`, `cols`) for which `is_included(rows,
+    cols)` is ``True``. Excluded entries of a dense matrix are never read."""
+    if _is_sparse(x) and _is_sparse(y):
+        prod = (_coalesced_coo(x) * _coalesced_coo(y)).coalesce()
+        (rows, cols), values = prod.indices(), prod.values()
+
+        return values[is_included(rows, cols)].sum(-1)
+    sparse, dense = (y, x) if _is_sparse(y) else (x, y)
+    sparse = _coalesced_coo(sparse)
+    (rows, cols), values = sparse.indices(), sparse.values()
+    mask = is_included(rows, cols)
+    rows, cols, values = rows[mask], cols[mask], values[mask]
+
+    return (dense[..., rows, cols] * values).sum(-1)
+
+
+def _diag_blocks_upper_dot(
+    x: torch.Tensor,
+    y: torch.Tensor,
+    *,
+    diag_blocks_idxs: Iterable[torch.Tensor],
+    diagonal: int,
+) -> torch.Tensor:
+    """Sum of the dot products between the entries on and above the `diagonal`-th
+    diagonal (see `torch.triu`) of corresponding main diagonal blocks of `x`, of shape
+    (..., N, N), and `y`, of shape (N, N). Only these entries are gathered."""
+    out = 0.0
+    for idxs in diag_blocks_idxs:
+        s = idxs.shape[-1]
+        triu_rows, triu_cols = torch.triu_indices(s, s, diagonal, device=idxs.device)
+        rows, cols = idxs[:, triu_rows], idxs[:, triu_cols]
+        out = out + torch.tensordot(x[..., rows, cols], y[rows, cols], dims=2)
+
+    return out
+
+
+def _group_row_tiles(
+    group_sizes: Sequence[int], tile_size: int
+) -> list[tuple[int, int]]:
+    """Start and stop of tiles of consecutive rows made of whole groups, with at most
+    `tile_size` rows unless a single group is larger."""
+    tiles, start, stop = [], 0, 0
+    for s in group_sizes:
+        if stop > start and stop + s - start > tile_size:
+            tiles.append((start, stop))
+            start = stop
+        stop += s
+    if stop > start:
+        tiles.append((start, stop))
+
+    return tiles
+
+
+def _upper_tiles_dot(
+    x: torch.Tensor,
+    y: torch.Tensor,
+    *,
+    tiles: Sequence[tuple[int, int]],
+    tile_masks: Iterable[torch.Tensor],
+) -> torch.Tensor:
+    """Dot product between `x`, of shape (..., N, N), and `y`, of shape (N, N),
+    restricted to entries above the main diagonal blocks of the row tiles in `tiles`,
+    which must partition the rows, plus the entries of those blocks selected by
+    `tile_masks`. Entries are visited tile by tile, without copying the matrices, and
+    excluded entries are replaced with zeros before any multiplication (so they can
+    be non-finite)."""
+    out = 0.0
+    x_tiles = x.split([stop - start for start, stop in tiles], dim=-2)
+    for (start, stop), mask, x_tile in zip(tiles, tile_masks, x_tiles):
+        y_tile = y[start:stop]
+        x_block, y_block = (
+            torch.where(mask, z[..., start:stop], 0.0) for z in (x_tile, y_tile)
+        )
+        out = out + (x_block * y_block).sum((-2, -1))
+        out = out + (x_tile[..., stop:] * y_tile[:, stop:]).sum((-2, -1))
+
+    return out
+
+
+def _square_blocks_entries(
+    sizes: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Block index, row and column of each entry of the concatenation of flattened
+    (row-major) square blocks with sizes `sizes`."""
+    numels = sizes**2
+    block_idxs = np.repeat(np.arange(len(sizes)), numels)
+    local_idxs = np.arange(numels.sum()) - np.repeat(np.cumsum(numels) - numels, numels)
+    block_sizes = sizes[block_idxs]
+
+    return block_idxs, local_idxs // block_sizes, local_idxs % block_sizes
+
 # %% ../nbs/model.ipynb 9
 class GeneralizedPermutation(Module):
-    """Generalized permutation layer implementing both soft and hard permutations."""
+    """Generalized permutation layer implementing both soft and hard permutations.
+
+    All parameterization matrices are flattened and stored in a single `Parameter`,
+    `log_alphas_flat`, ordered by size so that those with the same size form a
+    contiguous block. `log_alphas` gives views of it as square matrices, in group order.
+
+    Parameterization matrices with the same size are processed together: soft
+    permutations are computed by a single batched Gumbel-Sinkhorn call per size, and
+    hard permutations by a single batched exhaustive matching (see
+    `exhaustive_matching`) per size up to `max_size_exhaustive`. For larger sizes, the
+    matrices are relabeled and transferred to the CPU together (see
+    `unbiased_matching`), but linear sum assignment is still solved for each matrix in
+    turn. If `warm_start_matching` is ``True``, the assignments and dual potentials of
+    these matrices are kept between hard forward passes, and matrices whose previous
+    assignment is still optimal are not solved again (see `warm_started_matching`).
+
+    Permutations of groups which are fully determined, either by the fixed pairings or
+    because the group has size one, do not depend on the parameterization matrices.
+    They are precomputed once per call to `init_fixed_pairings_and_log_alphas` and
+    reused, unchanged, at every forward pass. Other groups can be frozen to given hard
+    permutations (see `frozen_hard_perms`), which are then served in the same way.
+
+    In soft mode with `noise`, `n_noise_samples` independent Gumbel noise samples can
+    be drawn at each forward pass. All soft permutation matrices then have a leading
+    batch dimension of that size (those which do not depend on the noise are expanded
+    to it), so that downstream operations are vectorized over samples."""
 
     def __init__(
         self,
         *,
         group_sizes: Sequence[int],
-        fixed_pairings: Optional[IndexPairsInGroups] = None,
+        fixed_pairings: Optional[Union[IndexPairsInGroups, np.ndarray]] = None,
         tau: float = 1.0,
         n_iter: int = 1,
         noise: bool = False,
         noise_factor: float = 1.0,
         noise_std: bool = False,
         mode: Literal["soft", "hard"] = "soft",
+        max_size_exhaustive: int = 6,
+        n_noise_samples: int = 1,
+        warm_start_matching: bool = False,
     ) -> None:
         super().__init__()
+        if n_noise_samples < 1:
+            raise ValueError("`n_noise_samples` must be a positive integer.")
         self.group_sizes = tuple(s for s in group_sizes)
+        # Size and start of each group, and group of each position, for the vectorized
+        # handling of fixed pairings
+        self._group_sizes_arr = np.asarray(self.group_sizes, dtype=np.int64)
+        self._group_starts = np.cumsum(self._group_sizes_arr) - self._group_sizes_arr
+        self._group_idxs = np.repeat(
+            np.arange(len(self.group_sizes)), self._group_sizes_arr
+        )
 
         self.init_fixed_pairings_and_log_alphas(fixed_pairings)
 
@@ -75,98 +329,444 @@ class GeneralizedPermutation(Module):
         self.noise = noise
         self.noise_factor = noise_factor
         self.noise_std = noise_std
+        self.max_size_exhaustive = max_size_exhaustive
+        self.n_noise_samples = n_noise_samples
+        self.warm_start_matching = warm_start_matching
         self.mode = mode
 
     def init_fixed_pairings_and_log_alphas(
         self,
-        fixed_pairings: IndexPairsInGroups,
+        fixed_pairings: Optional[Union[IndexPairsInGroups, np.ndarray]],
         device: Optional[torch.device] = None,
+        *,
+        warm_start_from: Optional[torch.Tensor] = None,
     ) -> None:
-        """Initialize fixed pairings and parameterization matrices."""
-        self._validate_fixed_pairings(fixed_pairings)
-        self.fixed_pairings = fixed_pairings
+        """Initialize fixed pairings and parameterization matrices.
+
+        Fixed pairings can be given as pairs of indices relative to each group, or as
+        an integer array of shape (2, n_fixed_pairings) whose columns are pairs of
+        global indices (i.e. offset by the start of the group). The latter is the
+        internal representation, and involves no Python loop over pairs.
+
+        Parameterization matrices are initialized to zero, unless `warm_start_from` is
+        passed. This must be the output of `full_log_alphas_flat`, possibly for
+        different fixed pairings, and its entries at the non-fixed rows and columns
+        are used instead."""
+        fixed_pairs = self._validate_fixed_pairings(fixed_pairings)
+        self._fixed_pairings = fixed_pairings
+        self._init_effective_fixed_pairings(fixed_pairs)
 
         # Initialize parameterization matrices ('log-alphas')
         # By default, initialize all parametrization matrices to zero
-        self.nonfixed_group_sizes_ = (
-            tuple(
-                s - num_efm
-                for s, num_efm in zip(
-                    self.group_sizes, self._effective_number_fixed_pairings
-                )
-            )
-            if self.fixed_pairings
-            else self.group_sizes
+        self.nonfixed_group_sizes_ = tuple(
+            (self._group_sizes_arr - self._effective_number_fixed_pairings).tolist()
         )
-        self.log_alphas = ParameterList(
-            [
-                Parameter(torch.zeros(s, s), requires_grad=bool(s))
-                for s in self.nonfixed_group_sizes_
+        # Indices of the parameterization matrices with each size, excluding those of
+        # fully determined permutations
+        self._log_alphas_buckets = {}
+        for idx, s in enumerate(self.nonfixed_group_sizes_):
+            if s > 1:
+                self._log_alphas_buckets.setdefault(s, []).append(idx)
+        self._init_log_alphas_layout()
+        if warm_start_from is None:
+            log_alphas_flat = torch.zeros(self._log_alphas_numel, device=device)
+        else:
+            log_alphas_flat = warm_start_from.detach()[
+                torch.as_tensor(
+                    self._free_entries_full_idxs(), device=warm_start_from.device
+                )
             ]
+            if device is not None:
+                log_alphas_flat = log_alphas_flat.to(device)
+        self.log_alphas_flat = Parameter(
+            log_alphas_flat, requires_grad=bool(self._log_alphas_numel)
         )
-        self.to(device=device)
+        self._init_fixed_mats(device)
+        self.frozen_hard_perms = {}
+        # Assignments and column potentials of the latest hard matchings, by group index
+        self._matching_warm_starts = {}
+
+    @property
+    def fixed_pairings(self) -> Optional[IndexPairsInGroups]:
+        """Fixed pairings, as pairs of indices relative to each group."""
+        if isinstance(self._fixed_pairings, np.ndarray):
+            i, j = (
+                self._fixed_pairings
+                - self._group_starts[self._group_idxs[self._fixed_pairings[1]]]
+            )
+            order = np.argsort(self._fixed_pairings[1], kind="stable")
+            counts = np.bincount(
+                self._group_idxs[self._fixed_pairings[1]],
+                minlength=len(self.group_sizes),
+            )
+            pairs = list(zip(i[order].tolist(), j[order].tolist()))
+            ends = np.cumsum(counts).tolist()
+            self._fixed_pairings = [
+                pairs[end - count : end] for end, count in zip(ends, counts.tolist())
+            ]
+
+        return self._fixed_pairings
 
     def _validate_fixed_pairings(
-        self, fixed_pairings: Optional[IndexPairsInGroups] = None
-    ) -> None:
-        if fixed_pairings:
-            if len(fixed_pairings) != len(self.group_sizes):
+        self, fixed_pairings: Optional[Union[IndexPairsInGroups, np.ndarray]] = None
+    ) -> Optional[np.ndarray]:
+        """Validate fixed pairings and return them as an array of pairs of global
+        indices, of shape (2, n_fixed_pairings), or ``None`` if there are none."""
+        if isinstance(fixed_pairings, np.ndarray):
+            if fixed_pairings.ndim != 2 or len(fixed_pairings) != 2:
                 raise ValueError(
-                    "If `fixed_pairings` is provided, it must have the same length as "
-                    "`group_sizes`."
+                    "If `fixed_pairings` is an array, it must have shape "
+                    "(2, n_fixed_pairings)."
                 )
-            for s, fm in zip(self.group_sizes, fixed_pairings):
-                if not fm:
-                    continue
-                if any([len(p) != 2 for p in fm]):
-                    raise ValueError(
-                        "All fixed pairings must be pairs of indices (i, j)."
-                    )
-                if any(min(i, j) < 0 or max(i, j) >= s for i, j in fm):
-                    raise ValueError(
-                        "All fixed pairings must be within the range of the corresponding "
-                        "group size."
-                    )
-            self._effective_number_fixed_pairings = []
-            self._effective_fixed_pairings_zip = []
-            for idx, (s, fm) in enumerate(zip(self.group_sizes, fixed_pairings)):
-                if fm:
-                    num_fm = len(fm)
-                    fm_zip = list(zip(*fm))
-                else:
-                    num_fm = 0
-                    fm_zip = [(), ()]
-                complement = s - num_fm  # Effectively fully fixed when complement <= 1
-                is_fully_fixed = complement <= 1
-                num_efm = s - (s - num_fm) * (not is_fully_fixed)
-                self._effective_number_fixed_pairings.append(num_efm)
-                if is_fully_fixed:
-                    mask = torch.zeros(s, s, dtype=torch.bool)
-                    if complement:
-                        possible_idxs = set(range(s))
-                        fm_zip[0] += tuple((possible_idxs - set(fm_zip[0])))
-                        fm_zip[1] += tuple((possible_idxs - set(fm_zip[1])))
-                else:
-                    mask = torch.ones(s, s, dtype=torch.bool)
-                    for i, j in fm:
-                        mask[..., j, :] = False
-                        mask[..., :, i] = False
-                self.register_buffer(f"_not_fixed_masks_{idx}", mask)
-                self._effective_fixed_pairings_zip.append(fm_zip)
-            self._total_number_fixed_pairings = sum(
-                self._effective_number_fixed_pairings
+            fixed_pairs = fixed_pairings.astype(np.int64, copy=False)
+            if fixed_pairs.size and (
+                fixed_pairs.min() < 0
+                or fixed_pairs.max() >= len(self._group_idxs)
+                or (
+                    self._group_idxs[fixed_pairs[0]] != self._group_idxs[fixed_pairs[1]]
+                ).any()
+            ):
+                raise ValueError(
+                    "All fixed pairings must be pairs of global indices in the same "
+                    "group."
+                )
+
+            return fixed_pairs
+
+        if not fixed_pairings:
+            return None
+        if len(fixed_pairings) != len(self.group_sizes):
+            raise ValueError(
+                "If `fixed_pairings` is provided, it must have the same length as "
+                "`group_sizes`."
+            )
+        fixed_pairings = [fm if fm else [] for fm in fixed_pairings]
+        if any(len(p) != 2 for fm in fixed_pairings for p in fm):
+            raise ValueError("All fixed pairings must be pairs of indices (i, j).")
+        counts = [len(fm) for fm in fixed_pairings]
+        fixed_pairs = (
+            np.array([p for fm in fixed_pairings for p in fm], dtype=np.int64)
+            .reshape(-1, 2)
+            .T
+        )
+        if fixed_pairs.size and (
+            fixed_pairs.min() < 0
+            or (fixed_pairs >= np.repeat(self._group_sizes_arr, counts)).any()
+        ):
+            raise ValueError(
+                "All fixed pairings must be within the range of the corresponding "
+                "group size."
             )
+
+        return fixed_pairs + np.repeat(self._group_starts, counts)
+
+    def _init_effective_fixed_pairings(self, fixed_pairs: Optional[np.ndarray]) -> None:
+        """Compute the effectively fixed pairings, as pairs of global indices: groups
+        with at most one non-fixed pairing are effectively fully fixed."""
+        n_groups = len(self.group_sizes)
+        if fixed_pairs is None:
+            self._effective_fixed_pairs = np.empty((2, 0), dtype=np.int64)
+            self._effective_number_fixed_pairings = np.zeros(n_groups, dtype=np.int64)
         else:
-            self._effective_fixed_pairings_zip = [[(), ()] for _ in self.group_sizes]
-            self._effective_number_fixed_pairings = [0] * len(self.group_sizes)
-            self._total_number_fixed_pairings = 0
+            fixed_group_idxs = self._group_idxs[fixed_pairs[1]]
+            num_fm = np.bincount(fixed_group_idxs, minlength=n_groups)
+            complement = self._group_sizes_arr - num_fm
+            # The non-fixed indices of groups with a single non-fixed pairing are the
+            # differences between the sums of all indices and of the fixed ones
+            sums_all = (
+                self._group_starts * self._group_sizes_arr
+                + self._group_sizes_arr * (self._group_sizes_arr - 1) // 2
+            )
+            sums_fixed = np.stack(
+                [
+                    np.bincount(fixed_group_idxs, weights=idxs, minlength=n_groups)
+                    for idxs in fixed_pairs
+                ]
+            ).astype(np.int64)
+            missing_pairs = (sums_all - sums_fixed)[:, complement == 1]
+            self._effective_fixed_pairs = np.concatenate(
+                [fixed_pairs, missing_pairs], axis=1
+            )
+            self._effective_number_fixed_pairings = np.where(
+                complement <= 1, self._group_sizes_arr, num_fm
+            )
+        self._total_number_fixed_pairings = int(
+            self._effective_number_fixed_pairings.sum()
+        )
+
+    def _init_fixed_mats(self, device: Optional[torch.device] = None) -> None:
+        """Precompute the permutation matrices of fully determined groups, and the
+        fixed parts of those of partially fixed groups, flattened and concatenated
+        in one buffer each. Also precompute the hard permutations of fully determined
+        groups, and the positions of the non-fixed entries of partially fixed groups
+        in their flat buffer."""
+        sizes = self._group_sizes_arr
+        num_efm = self._effective_number_fixed_pairings
+        is_static = sizes - num_efm <= 1
+        is_partially_fixed = ~is_static & (num_efm > 0)
+        self._static_idxs = np.flatnonzero(is_static).tolist()
+        self._partially_fixed_idxs = np.flatnonzero(is_partially_fixed).tolist()
+
+        # Fixed column of each fixed row, in global indices. mat[j, i] = 1 means that
+        # row i becomes row j under a permutation, using our conventions. Size-one
+        # groups are always fixed
+        i, j = self._effective_fixed_pairs
+        size_one_starts = self._group_starts[sizes == 1]
+        is_row_fixed = np.zeros(len(self._group_idxs), dtype=bool)
+        is_row_fixed[j] = is_row_fixed[size_one_starts] = True
+        is_col_fixed = np.zeros(len(self._group_idxs), dtype=bool)
+        is_col_fixed[i] = is_col_fixed[size_one_starts] = True
+        fixed_cols = np.zeros(len(self._group_idxs), dtype=np.int64)
+        fixed_cols[j] = i
+        fixed_cols[size_one_starts] = size_one_starts
+
+        def flat_entries(group_mask: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+            """Global rows and columns of the flattened matrices of the selected
+            groups, concatenated."""
+            entry_group_idxs, local_rows, local_cols = _square_blocks_entries(
+                np.where(group_mask, sizes, 0)
+            )
+            entry_starts = self._group_starts[entry_group_idxs]
+
+            return entry_starts + local_rows, entry_starts + local_cols
+
+        rows, cols = flat_entries(is_static)
+        static_mats_flat = fixed_cols[rows] == cols
+        rows, cols = flat_entries(is_partially_fixed)
+        partially_fixed_mats_flat = is_row_fixed[rows] & (fixed_cols[rows] == cols)
+        # Non-fixed entries, in the row-major order of the non-fixed submatrices
+        not_fixed_flat_idxs = np.flatnonzero(~is_row_fixed[rows] & ~is_col_fixed[cols])
+
+        for name, array in [
+            ("_static_mats_flat", static_mats_flat.astype(np.float32)),
+            (
+                "_partially_fixed_mats_flat",
+                partially_fixed_mats_flat.astype(np.float32),
+            ),
+            ("_not_fixed_flat_idxs", not_fixed_flat_idxs),
+        ]:
+            self.register_buffer(
+                name, torch.as_tensor(array, device=device), persistent=False
+            )
+        self._static_mats_cache = None
+
+        hard_perms_flat = fixed_cols - np.repeat(self._group_starts, sizes)
+        self._static_hard_perms = {
+            idx: hard_perms_flat[self._group_starts[idx] : self._group_starts[idx] + s]
+            for idx, s in zip(self._static_idxs, sizes[self._static_idxs].tolist())
+        }
+
+    def _init_log_alphas_layout(self) -> None:
+        """Compute the layout of the parameterization matrices in `log_alphas_flat`:
+        the matrices in each bucket of `_log_alphas_buckets` are flattened and
+        concatenated in one block, and blocks are concatenated in bucket order. The
+        unused one-by-one matrices of size-one groups come last."""
+        sizes_sq = np.asarray(self.nonfixed_group_sizes_, dtype=np.int64) ** 2
+        storage_order = np.array(
+            [idx for idxs in self._log_alphas_buckets.values() for idx in idxs]
+            + np.flatnonzero(sizes_sq == 1).tolist(),
+            dtype=np.int64,
+        )
+        # Offset of each matrix in `log_alphas_flat` (zero for empty ones)
+        self._log_alphas_offsets = np.zeros(len(self.group_sizes), dtype=np.int64)
+        self._log_alphas_offsets[storage_order] = (
+            np.cumsum(sizes_sq[storage_order]) - sizes_sq[storage_order]
+        )
+        self._log_alphas_numel = int(sizes_sq.sum())
+        # Offset of the block of each bucket, as a Python integer for cheap slicing
+        self._log_alphas_bucket_offsets = {
+            s: int(self._log_alphas_offsets[idxs[0]])
+            for s, idxs in self._log_alphas_buckets.items()
+        }
+        # Position of each entry of `log_alphas_flat` in the concatenation, in group
+        # order, of the flattened matrices
+        group_order_offsets = np.cumsum(sizes_sq) - sizes_sq
+        self._log_alphas_storage_idxs = np.arange(self._log_alphas_numel) + np.repeat(
+            group_order_offsets[storage_order]
+            - self._log_alphas_offsets[storage_order],
+            sizes_sq[storage_order],
+        )
 
     @property
-    def _not_fixed_masks(self) -> list[torch.Tensor]:
+    def log_alphas(self) -> list[torch.Tensor]:
+        """Parameterization matrices of all groups, as views of `log_alphas_flat`.
+        Groups with fully determined permutations have empty matrices."""
         return [
-            getattr(self, f"_not_fixed_masks_{idx}")
-            for idx in range(len(self.group_sizes))
+            self.log_alphas_flat[offset : offset + s * s].view(s, s)
+            for offset, s in zip(
+                self._log_alphas_offsets.tolist(), self.nonfixed_group_sizes_
+            )
+        ]
+
+    def _stacked_log_alphas(self, size: int) -> torch.Tensor:
+        """View of `log_alphas_flat`, with shape (n, `size`, `size`), containing the
+        parameterization matrices of the `n` groups in bucket `size` of
+        `_log_alphas_buckets`."""
+        offset = self._log_alphas_bucket_offsets[size]
+        numel = len(self._log_alphas_buckets[size]) * size * size
+
+        return self.log_alphas_flat[offset : offset + numel].view(-1, size, size)
+
+    def _free_entries_full_idxs(self) -> np.ndarray:
+        """Positions of the entries of `log_alphas_flat` in the concatenation of
+        flattened matrices of the full group sizes."""
+        i, j = self._effective_fixed_pairs
+        free_rows = np.setdiff1d(np.arange(len(self._group_idxs)), j)
+        free_cols = np.setdiff1d(np.arange(len(self._group_idxs)), i)
+        nonfixed_sizes = np.asarray(self.nonfixed_group_sizes_, dtype=np.int64)
+        free_starts = np.cumsum(nonfixed_sizes) - nonfixed_sizes
+        entry_group_idxs, local_rows, local_cols = _square_blocks_entries(
+            nonfixed_sizes
+        )
+        rows = free_rows[free_starts[entry_group_idxs] + local_rows]
+        cols = free_cols[free_starts[entry_group_idxs] + local_cols]
+        sizes = self._group_sizes_arr[entry_group_idxs]
+        starts = self._group_starts[entry_group_idxs]
+        full_starts = np.cumsum(self._group_sizes_arr**2) - self._group_sizes_arr**2
+        full_idxs = (
+            full_starts[entry_group_idxs] + (rows - starts) * sizes + (cols - starts)
+        )
+
+        return full_idxs[self._log_alphas_storage_idxs]
+
+    def full_log_alphas_flat(self) -> torch.Tensor:
+        """Current parameterization matrices embedded in matrices of the full group
+        sizes, with zeros at the rows and columns of fixed pairings, flattened and
+        concatenated. Can be used to warm-start `init_fixed_pairings_and_log_alphas`."""
+        log_alphas_flat = self.log_alphas_flat.detach()
+        full_log_alphas_flat = log_alphas_flat.new_zeros(
+            int((self._group_sizes_arr**2).sum())
+        )
+        full_log_alphas_flat[
+            torch.as_tensor(
+                self._free_entries_full_idxs(), device=log_alphas_flat.device
+            )
+        ] = log_alphas_flat
+
+        return full_log_alphas_flat
+
+    def _unflatten_mats(
+        self, mats_flat: torch.Tensor, idxs: Sequence[int]
+    ) -> list[torch.Tensor]:
+        """Views, as square matrices, of the flattened matrices of groups `idxs`,
+        concatenated in `mats_flat`."""
+        sizes = [self.group_sizes[idx] for idx in idxs]
+
+        return [
+            mat.unflatten(-1, (s, s))
+            for mat, s in zip(mats_flat.split([s * s for s in sizes], dim=-1), sizes)
+        ]
+
+    @property
+    def _static_mats(self) -> dict[int, torch.Tensor]:
+        """Precomputed permutation matrices of fully determined groups, as views of
+        `_static_mats_flat`, cached until the buffer is replaced (e.g. when the module
+        is moved to another device)."""
+        if (
+            self._static_mats_cache is None
+            or self._static_mats_cache[0] is not self._static_mats_flat
+        ):
+            self._static_mats_cache = (
+                self._static_mats_flat,
+                dict(
+                    zip(
+                        self._static_idxs,
+                        self._unflatten_mats(self._static_mats_flat, self._static_idxs),
+                    )
+                ),
+            )
+
+        return self._static_mats_cache[1]
+
+    @property
+    def frozen_hard_perms(self) -> dict[int, np.ndarray]:
+        """Hard permutations of frozen groups, in the format of
+        `DiffPaSSResults.hard_perms`, keyed by group index. Frozen groups are given
+        these permutations in both soft and hard mode, without evaluating the
+        Gumbel-Sinkhorn or Gumbel-matching operators, so their parameterization matrices
+        receive zero gradients. Their values when frozen are kept, and can be restored
+        with `restore_frozen_log_alphas`. To change the frozen groups, assign a new
+        dictionary instead of mutating this one. Reset by
+        `init_fixed_pairings_and_log_alphas`."""
+        return self._frozen_hard_perms
+
+    @frozen_hard_perms.setter
+    def frozen_hard_perms(self, value: dict[int, np.ndarray]) -> None:
+        if value is getattr(self, "_frozen_hard_perms", None):
+            return
+        # Restrict the permutation matrices to the non-fixed rows and columns, as for the
+        # outputs of `_bucketed_mats`
+        i, j = self._effective_fixed_pairs
+        is_row_free = np.ones(len(self._group_idxs), dtype=bool)
+        is_row_free[j] = False
+        is_col_free = np.ones(len(self._group_idxs), dtype=bool)
+        is_col_free[i] = False
+        frozen_mats = {}
+        for idx, perm in value.items():
+            if self.nonfixed_group_sizes_[idx] <= 1:
+                raise ValueError(
+                    f"Group {idx} is fully determined by the fixed pairings and cannot "
+                    "be frozen."
+                )
+            group_slice = slice(
+                self._group_starts[idx], self._group_starts[idx] + self.group_sizes[idx]
+            )
+            rows = np.flatnonzero(is_row_free[group_slice])
+            cols = np.flatnonzero(is_col_free[group_slice])
+            mat = np.asarray(perm)[rows, None] == cols
+            if not (mat.sum(-1) == 1).all():
+                raise ValueError(
+                    f"The hard permutation of group {idx} is inconsistent with the "
+                    "fixed pairings."
+                )
+            frozen_mats[idx] = torch.as_tensor(
+                mat,
+                dtype=self.log_alphas_flat.dtype,
+                device=self.log_alphas_flat.device,
+            )
+        self._frozen_hard_perms = value
+        self._frozen_mats = frozen_mats
+        # Buckets of the parameterization matrices which are not frozen, with their
+        # positions in the bucket (``None`` if no matrix in the bucket is frozen)
+        self._active_log_alphas_buckets = {}
+        for s, idxs in self._log_alphas_buckets.items():
+            positions = [pos for pos, idx in enumerate(idxs) if idx not in frozen_mats]
+            if len(positions) == len(idxs):
+                self._active_log_alphas_buckets[s] = (idxs, None)
+            elif positions:
+                self._active_log_alphas_buckets[s] = (
+                    [idxs[pos] for pos in positions],
+                    positions,
+                )
+        # Entries of `log_alphas_flat` belonging to frozen groups, with their current
+        # values
+        frozen_flat_idxs = [
+            np.arange(
+                self._log_alphas_offsets[idx],
+                self._log_alphas_offsets[idx] + self.nonfixed_group_sizes_[idx] ** 2,
+            )
+            for idx in frozen_mats
         ]
+        if frozen_flat_idxs:
+            frozen_flat_idxs = torch.as_tensor(
+                np.concatenate(frozen_flat_idxs), device=self.log_alphas_flat.device
+            )
+            self._frozen_log_alphas = (
+                frozen_flat_idxs,
+                self.log_alphas_flat.detach()[frozen_flat_idxs],
+            )
+        else:
+            self._frozen_log_alphas = None
+
+    def restore_frozen_log_alphas(self) -> None:
+        """Restore the parameterization matrices of frozen groups to their values when
+        they were frozen. Although their gradients are zero, stateful optimizers (e.g.
+        with momentum or weight decay) can still update them."""
+        if self._frozen_log_alphas is None:
+            return
+        frozen_flat_idxs, values = self._frozen_log_alphas
+        with torch.no_grad():
+            self.log_alphas_flat[frozen_flat_idxs] = values
 
     @property
     def mode(self) -> str:
@@ -178,12 +778,16 @@ class GeneralizedPermutation(Module):
         if value not in ["soft", "hard"]:
             raise ValueError("mode must be either 'soft' or 'hard'.")
         self._mode = value.lower()
-        _mats_fn_no_fixed = getattr(self, f"_{self._mode}_mats")
-        self._mats_fn = (
-            _mats_fn_no_fixed
-            if not self.fixed_pairings
-            else self._impl_fixed_pairings(_mats_fn_no_fixed)
-        )
+        self._mats_fn = self._impl_fixed_pairings(getattr(self, f"_{self._mode}_mats"))
+
+    @property
+    def _batch_shape(self) -> tuple[int, ...]:
+        """Batch shape of the permutation matrices: the number of Gumbel noise samples
+        if more than one is drawn, otherwise empty."""
+        if self.mode == "soft" and self.noise and self.n_noise_samples > 1:
+            return (self.n_noise_samples,)
+
+        return ()
 
     def soft_(self) -> None:
         self.mode = "soft"
@@ -192,56 +796,114 @@ class GeneralizedPermutation(Module):
         self.mode = "hard"
 
     def _impl_fixed_pairings(self, func: callable) -> callable:
-        """Include fixed pairings in the Gumbel-Sinkhorn or Gumbel-matching operators."""
-
-        def wrapper(gen: Iterator[torch.Tensor]) -> Iterator[torch.Tensor]:
-            for s, mat, (row_group, col_group), mask in zip(
-                self.group_sizes,
-                gen,
-                self._effective_fixed_pairings_zip,
-                self._not_fixed_masks,
-            ):
-                mat_all = torch.zeros(
-                    s,
-                    s,
-                    dtype=mat.dtype,
-                    layout=mat.layout,
-                    device=mat.device,
+        """Include fixed pairings in the Gumbel-Sinkhorn or Gumbel-matching operators.
+        `func` must yield ``None`` for fully determined groups, whose precomputed
+        permutation matrices are yielded instead."""
+
+        def wrapper(gen: Iterator[Optional[torch.Tensor]]) -> Iterator[torch.Tensor]:
+            mats = list(gen)
+            batch_shape = self._batch_shape
+            if self._partially_fixed_idxs:
+                # Scatter the non-fixed submatrices of all partially fixed groups into
+                # their fixed parts at once
+                not_fixed_flat = torch.cat(
+                    [mats[idx].flatten(-2, -1) for idx in self._partially_fixed_idxs],
+                    dim=-1,
                 )
-                # mat_all[j, i] = 1 means that row i becomes row j under a permutation,
-                # using our conventions
-                mat_all[..., col_group, row_group] = 1
-                mat_all.masked_scatter_(mask.to(torch.bool), mat)
-                yield mat_all
+                mats_flat = (
+                    self._partially_fixed_mats_flat.to(not_fixed_flat.dtype)
+                    .expand(*batch_shape, -1)
+                    .index_copy(-1, self._not_fixed_flat_idxs, not_fixed_flat)
+                )
+                for idx, mat in zip(
+                    self._partially_fixed_idxs,
+                    self._unflatten_mats(mats_flat, self._partially_fixed_idxs),
+                ):
+                    mats[idx] = mat
+            static_mats = self._static_mats
+            if batch_shape:
+                static_mats = {
+                    idx: mat.expand(*batch_shape, -1, -1)
+                    for idx, mat in static_mats.items()
+                }
+
+            return (
+                static_mats[idx] if mat is None else mat for idx, mat in enumerate(mats)
+            )
 
         return lambda: wrapper(func())
 
-    def _soft_mats(self) -> Iterator[torch.Tensor]:
+    def _bucketed_mats(self, mats_fn: callable) -> Iterator[Optional[torch.Tensor]]:
+        """Evaluate `mats_fn` on the current parameterization matrices, by size and
+        expanded to `_batch_shape`, and return the results in group order. ``None`` is
+        returned in place of fully determined permutations, and the frozen permutation
+        matrices in place of those of frozen groups."""
+        mats = [None] * len(self.group_sizes)
+        batch_shape = self._batch_shape
+        for idx, mat in self._frozen_mats.items():
+            mats[idx] = mat.expand(*batch_shape, -1, -1) if batch_shape else mat
+        for s, (idxs, positions) in self._active_log_alphas_buckets.items():
+            stacked = self._stacked_log_alphas(s)
+            if positions is not None:
+                stacked = stacked[positions]
+            if batch_shape:
+                stacked = stacked.expand(*batch_shape, *stacked.shape)
+            for idx, mat in zip(idxs, mats_fn(stacked).unbind(-3)):
+                mats[idx] = mat
+
+        return iter(mats)
+
+    def _soft_mats(self) -> Iterator[Optional[torch.Tensor]]:
         """Evaluate the Gumbel-Sinkhorn operator on the current `log_alpha` parameters."""
-        return (
-            gumbel_sinkhorn(
-                log_alpha,
+        return self._bucketed_mats(
+            partial(
+                gumbel_sinkhorn,
                 tau=self.tau,
                 n_iter=self.n_iter,
                 noise=self.noise,
                 noise_factor=self.noise_factor,
                 noise_std=self.noise_std,
             )
-            for log_alpha in self.log_alphas
         )
 
-    def _hard_mats(self) -> Iterator[torch.Tensor]:
+    def _hard_mats(self) -> Iterator[Optional[torch.Tensor]]:
         """Evaluate the Gumbel-matching operator on the current `log_alpha` parameters."""
-        return (
-            gumbel_matching(
-                log_alpha,
-                noise=self.noise,
-                noise_factor=self.noise_factor,
-                noise_std=self.noise_std,
-                unbias_lsa=True,
+
+        def mats_fn(log_alpha: torch.Tensor) -> torch.Tensor:
+            size = log_alpha.shape[-1]
+            if (
+                not self.warm_start_matching
+                or size <= self.max_size_exhaustive
+                or log_alpha.dim() > 3
+            ):
+                return gumbel_matching(
+                    log_alpha,
+                    noise=self.noise,
+                    noise_factor=self.noise_factor,
+                    noise_std=self.noise_std,
+                    unbias_lsa=True,
+                    exhaustive=size <= self.max_size_exhaustive,
+                )
+            if self.noise:
+                log_alpha = log_alpha + gumbel_noise_like(
+                    log_alpha, noise_factor=self.noise_factor, noise_std=self.noise_std
+                )
+            idxs = self._active_log_alphas_buckets[size][0]
+            warm_starts = [self._matching_warm_starts.get(idx) for idx in idxs]
+            cols, potentials = None, None
+            if all(warm_start is not None for warm_start in warm_starts):
+                cols, potentials = (
+                    torch.stack(ts).to(log_alpha.device) for ts in zip(*warm_starts)
+                )
+            mats, cols, potentials = warm_started_matching(
+                log_alpha, cols=cols, potentials=potentials, unbias_lsa=True
             )
-            for log_alpha in self.log_alphas
-        )
+            for idx, warm_start in zip(idxs, zip(cols, potentials)):
+                self._matching_warm_starts[idx] = warm_start
+
+            return mats
+
+        return self._bucketed_mats(mats_fn)
 
     def forward(self) -> list[torch.Tensor]:
         """Compute the soft/hard permutations according to ``self._mats_fn.``"""
@@ -252,46 +914,356 @@ class GeneralizedPermutation(Module):
 
 class MatrixApply(Module):
     """Apply matrices to chunks of a tensor of shape (n_samples, length, alphabet_size)
-    and collate the results."""
+    and collate the results.
+
+    Groups are bucketed by size, and the matrices for all groups in a bucket are applied
+    with a single batched matrix multiplication. The result can be written into a
+    preallocated (and contiguous) output tensor passed as `out`, which is then reused
+    instead of allocating a new one. If `checkpoint` is ``True``, the product for each
+    bucket is checkpointed, so that the rearranged rows of the input are recomputed in
+    the backward pass instead of being stored."""
 
     def __init__(self, group_sizes: Sequence[int]) -> None:
         super().__init__()
         self.group_sizes = tuple(s for s in group_sizes)
-        self._group_slices = _consecutive_slices_from_sizes(self.group_sizes)
+        self._group_idxs_by_size = [
+            group_idxs.tolist()
+            for group_idxs in _group_idxs_by_size(self.group_sizes).values()
+        ]
+        _register_diag_blocks_idxs(self, self.group_sizes)
+        _register_bucket_order(self)
+
+    @staticmethod
+    def _apply_bucket(
+        mats_this_bucket: torch.Tensor, x: torch.Tensor, rows: torch.Tensor
+    ) -> torch.Tensor:
+        """Apply the stacked matrices of a bucket to the rows `rows` of `x`."""
+        x_this_bucket = x.index_select(0, rows).reshape(
+            *mats_this_bucket.shape[-3:-1], -1
+        )
+
+        return (mats_this_bucket @ x_this_bucket).flatten(-3, -2)
 
-    def forward(self, x: torch.Tensor, *, mats: Sequence[torch.Tensor]) -> torch.Tensor:
-        out = torch.full_like(x, torch.nan)
-        for mats_this_group, sl in zip(mats, self._group_slices):
-            out[..., sl, :, :].copy_(
-                torch.tensordot(mats_this_group, x[sl, :, :], dims=1)
+    def forward(
+        self,
+        x: torch.Tensor,
+        *,
+        mats: Sequence[torch.Tensor],
+        out: Optional[torch.Tensor] = None,
+        checkpoint: bool = False,
+    ) -> torch.Tensor:
+        stacked_mats = [
+            torch.stack([mats[k] for k in group_idxs], dim=-3)
+            for group_idxs in self._group_idxs_by_size
+        ]
+        batch_shape = stacked_mats[0].shape[:-3]
+
+        if len(stacked_mats) == 1:
+            # All groups have the same size: blocks can be obtained as views
+            mats_all_groups = stacked_mats[0]
+            n_groups, s = mats_all_groups.shape[-3:-1]
+            x_blocks = x.reshape(n_groups, s, -1)
+            if out is None:
+                return (mats_all_groups @ x_blocks).view(batch_shape + x.shape)
+            out_blocks = out.view(*batch_shape, n_groups, s, -1)
+            if _requires_grad(mats_all_groups, x_blocks):
+                out_blocks.copy_(mats_all_groups @ x_blocks)
+            else:
+                torch.matmul(mats_all_groups, x_blocks, out=out_blocks)
+            return out
+
+        # Arrange rows so that each bucket is contiguous and concatenate the results.
+        # Writing each bucket in place instead would make backpropagation copy the
+        # output gradient once per bucket
+        if checkpoint:
+            out_by_bucket = [
+                torch.utils.checkpoint.checkpoint(
+                    self._apply_bucket, mats_this_bucket, x, rows, use_reentrant=False
+                )
+                for mats_this_bucket, rows in zip(
+                    stacked_mats, self._bucket_order.split(self._bucket_sizes)
+                )
+            ]
+        else:
+            x_by_bucket = x.index_select(0, self._bucket_order).split(
+                self._bucket_sizes
             )
+            out_by_bucket = [
+                (mats_this_bucket @ x_this_bucket.reshape(*idxs.shape, -1)).flatten(
+                    -3, -2
+                )
+                for idxs, mats_this_bucket, x_this_bucket in zip(
+                    _registered_diag_blocks_idxs(self), stacked_mats, x_by_bucket
+                )
+            ]
+        out_by_bucket = torch.cat(out_by_bucket, dim=-2)
+        if out is None:
+            return out_by_bucket.index_select(-2, self._bucket_order_inverse).unflatten(
+                -1, x.shape[-2:]
+            )
+        # Scatter rows back to their original order, directly into `out`
+        out.flatten(-2, -1).index_copy_(-2, self._bucket_order, out_by_bucket)
 
         return out
 
 
 class PermutationConjugate(Module):
     """Conjugate blocks of a square 2D tensor of shape (n_samples, n_samples) by
-    permutation matrices."""
+    permutation matrices. Symmetric tensors in packed form can be conjugated using
+    `conjugate_packed`, and sparse tensors using `conjugate_sparse`.
+
+    The conjugation ``P @ x @ P.T`` by the block diagonal matrix ``P`` is computed in a
+    single pass over pairs of buckets of equally sized groups, so that each (g, h) block
+    costs O(s_g * s_h * (s_g + s_h)) operations. The result can be written into a
+    preallocated (and contiguous) output tensor passed as `out`, which is then reused
+    instead of allocating a new one. If `checkpoint` is ``True``, the blocks in each
+    bucket of rows are checkpointed, so that their intermediate tensors are recomputed
+    in the backward pass instead of being stored."""
 
     def __init__(self, group_sizes: Sequence[int]) -> None:
         super().__init__()
         self.group_sizes = tuple(s for s in group_sizes)
-        self._group_slices = _consecutive_slices_from_sizes(self.group_sizes)
+        self._group_idxs_by_size = [
+            group_idxs.tolist()
+            for group_idxs in _group_idxs_by_size(self.group_sizes).values()
+        ]
+        _register_diag_blocks_idxs(self, self.group_sizes)
+        _register_bucket_order(self)
+        _register_group_layout(self, self.group_sizes)
+
+    @staticmethod
+    def _conjugate_blocks(
+        x_blocks: torch.Tensor, row_mats: torch.Tensor, col_mats: torch.Tensor
+    ) -> torch.Tensor:
+        """Conjugate blocks of shape (n_row_groups, s_row, n_col_groups, s_col) by batches
+        of row matrices of shape (..., n_row_groups, s_row, s_row) and column matrices of
+        shape (..., n_col_groups, s_col, s_col)."""
+        out = torch.einsum("...gij,gjak->...giak", row_mats, x_blocks)
+
+        return torch.einsum("...giak,...ahk->...giah", out, col_mats)
 
-    def forward(self, x: torch.Tensor, *, mats: Sequence[torch.Tensor]) -> torch.Tensor:
-        out1 = torch.full_like(x, torch.nan)
-        out2 = torch.full_like(x, torch.nan)
-        # (P * A) * P.T
-        for mats_this_group, sl in zip(mats, self._group_slices):
-            out1[..., sl, :].copy_(torch.tensordot(mats_this_group, x[sl, :], dims=1))
-        for mats_this_group, sl in zip(mats, self._group_slices):
-            out2[..., :, sl].copy_(
-                torch.tensordot(
-                    out1[..., :, sl], mats_this_group.permute((-1, -2)), dims=1
+    def _conjugate_row_bucket(
+        self,
+        row_mats: torch.Tensor,
+        stacked_mats: list[torch.Tensor],
+        x: torch.Tensor,
+        rows: torch.Tensor,
+    ) -> torch.Tensor:
+        """Conjugate the blocks of `x` in the rows `rows` of a bucket, with columns
+        arranged by bucket."""
+        x_rows = x.index_select(0, rows).index_select(1, self._bucket_order)
+        row_idxs_shape = row_mats.shape[-3:-1]
+
+        return torch.cat(
+            [
+                self._conjugate_blocks(
+                    x_block.unflatten(0, row_idxs_shape).unflatten(
+                        -1, col_mats.shape[-3:-1]
+                    ),
+                    row_mats,
+                    col_mats,
+                )
+                .flatten(-4, -3)
+                .flatten(-2, -1)
+                for col_mats, x_block in zip(
+                    stacked_mats, x_rows.split(self._bucket_sizes, dim=-1)
+                )
+            ],
+            dim=-1,
+        )
+
+    def forward(
+        self,
+        x: torch.Tensor,
+        *,
+        mats: Sequence[torch.Tensor],
+        out: Optional[torch.Tensor] = None,
+        checkpoint: bool = False,
+    ) -> torch.Tensor:
+        stacked_mats = [
+            torch.stack([mats[k] for k in group_idxs], dim=-3)
+            for group_idxs in self._group_idxs_by_size
+        ]
+        batch_shape = stacked_mats[0].shape[:-3]
+
+        if len(stacked_mats) == 1:
+            # All groups have the same size: blocks can be obtained as views
+            mats_all_groups = stacked_mats[0]
+            n_groups, s = mats_all_groups.shape[-3:-1]
+            result = self._conjugate_blocks(
+                x.view(n_groups, s, n_groups, s), mats_all_groups, mats_all_groups
+            )
+            if out is None:
+                return result.reshape(batch_shape + x.shape)
+            out.view(*batch_shape, n_groups, s, n_groups, s).copy_(result)
+            return out
+
+        # Arrange rows and columns so that each bucket is contiguous and concatenate
+        # the results. Writing each pair of buckets in place instead would make
+        # backpropagation copy the output gradient once per pair
+        order = self._bucket_order
+        out_by_row_bucket = [
+            (
+                torch.utils.checkpoint.checkpoint(
+                    self._conjugate_row_bucket,
+                    row_mats,
+                    stacked_mats,
+                    x,
+                    rows,
+                    use_reentrant=False,
                 )
+                if checkpoint
+                else self._conjugate_row_bucket(row_mats, stacked_mats, x, rows)
+            )
+            for row_mats, rows in zip(stacked_mats, order.split(self._bucket_sizes))
+        ]
+        result = torch.cat(out_by_row_bucket, dim=-2).index_select(
+            -1, self._bucket_order_inverse
+        )
+        if out is None:
+            return result.index_select(-2, self._bucket_order_inverse)
+        # Scatter rows back to their original order, directly into `out`
+        out.index_copy_(-2, order, result)
+
+        return out
+
+    def conjugate_packed(
+        self,
+        x: torch.Tensor,
+        *,
+        mats: Sequence[torch.Tensor],
+        tile_size: int = 1024,
+    ) -> torch.Tensor:
+        """Conjugate a symmetric matrix in packed form (see `pack_symmetric`), returning
+        the result in packed form. Blocks are gathered and conjugated in tiles of about
+        `tile_size` rows, so that the dense matrix is never materialized."""
+        n_samples = sum(self.group_sizes)
+        stacked_mats = [
+            torch.stack([mats[k] for k in group_idxs], dim=-3)
+            for group_idxs in self._group_idxs_by_size
+        ]
+        batch_shape = stacked_mats[0].shape[:-3]
+
+        all_positions, all_values = [], []
+        diag_blocks_idxs = _registered_diag_blocks_idxs(self)
+        for row_idxs, row_mats in zip(diag_blocks_idxs, stacked_mats):
+            n_groups_per_tile = max(1, tile_size // row_idxs.shape[-1])
+            for start in range(0, len(row_idxs), n_groups_per_tile):
+                tile = slice(start, start + n_groups_per_tile)
+                rows = row_idxs[tile, :, None, None]
+                for col_idxs, col_mats in zip(diag_blocks_idxs, stacked_mats):
+                    cols = col_idxs[None, None, :, :]
+                    positions = packed_symmetric_idxs(rows, cols, n_samples)
+                    # Only entries on or above the main diagonal are stored
+                    is_upper = rows <= cols
+                    all_positions.append(positions[is_upper])
+                    all_values.append(
+                        self._conjugate_blocks(
+                            x[positions], row_mats[..., tile, :, :], col_mats
+                        )[..., is_upper]
+                    )
+
+        # A single write, so that backpropagation does not copy the output gradient
+        # once per block
+        out = torch.empty(
+            batch_shape + x.shape[-1:], dtype=x.dtype, layout=x.layout, device=x.device
+        )
+        out[..., torch.cat(all_positions)] = torch.cat(all_values, dim=-1)
+
+        return out
+
+    @staticmethod
+    def _flat_mats(mats: Sequence[torch.Tensor]) -> torch.Tensor:
+        if any(mat.ndim != 2 for mat in mats):
+            raise ValueError(
+                "Batches of matrices are not supported for sparse tensors."
             )
+        return torch.cat([mat.flatten() for mat in mats])
 
-        return out2
+    def conjugate_sparse(
+        self, x: torch.Tensor, *, mats: Sequence[torch.Tensor]
+    ) -> torch.Tensor:
+        """Conjugate a sparse COO or CSR tensor, returning a sparse COO tensor. Each
+        nonzero entry of `x` in block (g, h) is spread over the s_g * s_h entries of the
+        conjugated block."""
+        flat_mats = self._flat_mats(mats)
+        x = _coalesced_coo(x)
+        (x_rows, x_cols), x_values = x.indices(), x.values()
+        sizes_rows = self._group_sizes[self._sample_group_idxs[x_rows]]
+        sizes_cols = self._group_sizes[self._sample_group_idxs[x_cols]]
+        counts = sizes_rows * sizes_cols
+        entry_idxs = torch.repeat_interleave(counts)
+        # Position of each output entry within the block of its input entry
+        pos = (
+            torch.arange(len(entry_idxs), device=x.device)
+            - (torch.cumsum(counts, 0) - counts)[entry_idxs]
+        )
+        x_rows, x_cols = x_rows[entry_idxs], x_cols[entry_idxs]
+        sizes_cols = sizes_cols[entry_idxs]
+        rows = self._group_starts[self._sample_group_idxs[x_rows]] + pos // sizes_cols
+        cols = self._group_starts[self._sample_group_idxs[x_cols]] + pos % sizes_cols
+        values = (
+            x_values[entry_idxs]
+            * flat_mats[_block_diag_flat_idxs(self, rows, x_rows)]
+            * flat_mats[_block_diag_flat_idxs(self, cols, x_cols)]
+        )
+
+        return torch.sparse_coo_tensor(
+            torch.stack([rows, cols]), values, x.shape, check_invariants=False
+        ).coalesce()
+
+    def conjugate_sparse_dot(
+        self,
+        x: torch.Tensor,
+        y: torch.Tensor,
+        *,
+        mats: Sequence[torch.Tensor],
+        exclude_diagonal: bool = True,
+    ) -> torch.Tensor:
+        """Dot product between the upper triangular parts of the conjugate of `x` and of
+        `y`, both sparse COO or CSR tensors, without materializing the conjugate. Each
+        nonzero entry of `y` in block (g, h) is only paired with the nonzero entries of
+        `x` in the same block. The main diagonal is excluded if `exclude_diagonal` is
+        ``True``."""
+        flat_mats = self._flat_mats(mats)
+        x, y = _coalesced_coo(x), _coalesced_coo(y)
+        (x_rows, x_cols), x_values = x.indices(), x.values()
+        (y_rows, y_cols), y_values = y.indices(), y.values()
+        is_upper = y_rows < y_cols if exclude_diagonal else y_rows <= y_cols
+        y_rows, y_cols, y_values = (
+            y_rows[is_upper],
+            y_cols[is_upper],
+            y_values[is_upper],
+        )
+
+        # Pair entries of x and y in the same block, by sorting the blocks of y
+        n_groups = len(self.group_sizes)
+        group_idxs = self._sample_group_idxs
+        x_blocks = group_idxs[x_rows] * n_groups + group_idxs[x_cols]
+        y_blocks, y_order = torch.sort(
+            group_idxs[y_rows] * n_groups + group_idxs[y_cols]
+        )
+        starts = torch.searchsorted(y_blocks, x_blocks)
+        counts = torch.searchsorted(y_blocks, x_blocks, right=True) - starts
+        x_idxs = torch.repeat_interleave(counts)
+        y_idxs = y_order[
+            starts[x_idxs]
+            + torch.arange(len(x_idxs), device=x.device)
+            - (torch.cumsum(counts, 0) - counts)[x_idxs]
+        ]
+        x_rows, x_cols, y_rows, y_cols = (
+            x_rows[x_idxs],
+            x_cols[x_idxs],
+            y_rows[y_idxs],
+            y_cols[y_idxs],
+        )
+
+        return (
+            x_values[x_idxs]
+            * y_values[y_idxs]
+            * flat_mats[_block_diag_flat_idxs(self, y_rows, x_rows)]
+            * flat_mats[_block_diag_flat_idxs(self, y_cols, x_cols)]
+        ).sum()
 
 
 def global_argmax_from_group_argmaxes(mats: Iterable[torch.Tensor]) -> torch.Tensor:
@@ -305,19 +1277,54 @@ def global_argmax_from_group_argmaxes(mats: Iterable[torch.Tensor]) -> torch.Ten
 
 
 def apply_hard_permutation_batch_to_similarity(
-    *, x: torch.Tensor, perms: list[torch.Tensor]
+    *,
+    x: torch.Tensor,
+    perms: list[torch.Tensor],
+    packed: bool = False,
+    out: Optional[torch.Tensor] = None,
 ) -> torch.Tensor:
     """
     Conjugate a single similarity matrix by a batch of hard permutations.
 
+    If `x` is a sparse COO or CSR tensor, the conjugation is performed by relabeling
+    its indices, and the result is a sparse COO tensor. If `packed` is ``True``, `x`
+    is a symmetric matrix in packed form (see `pack_symmetric`), and the result is also
+    in packed form. In both cases, batches of permutations are not supported.
+
     Args:
         perms: List of batches of permutation matrices of shape (..., D, D).
-        x: Similarity matrix of shape (D, D).
+        x: Similarity matrix of shape (D, D), or of shape (D * (D + 1) / 2,) if
+            `packed` is ``True``.
+        packed: Whether `x` is a symmetric matrix in packed form.
+        out: If not ``None``, preallocated output tensor for dense `x`. Not supported
+            if `x` requires gradients.
 
     Returns:
         Batch of conjugated matrices of shape (..., D, D).
     """
     global_argmax = global_argmax_from_group_argmaxes(perms)
+    if packed:
+        if global_argmax.ndim != 1:
+            raise ValueError(
+                "Batches of permutations are not supported for packed similarity matrices."
+            )
+        return permute_packed_symmetric(x, global_argmax)
+    if _is_sparse(x):
+        if global_argmax.ndim != 1:
+            raise ValueError(
+                "Batches of permutations are not supported for sparse similarity matrices."
+            )
+        # Entry (i, j) of x is moved to (inverse[i], inverse[j])
+        inverse = torch.empty_like(global_argmax)
+        inverse[global_argmax] = torch.arange(
+            len(global_argmax), device=global_argmax.device
+        )
+        x = _coalesced_coo(x)
+
+        return torch.sparse_coo_tensor(
+            inverse[x.indices()], x.values(), x.shape, check_invariants=False
+        )
+
     x_permuted_rows = x[global_argmax]
 
     # Permuting columns is more involved
@@ -327,30 +1334,80 @@ def apply_hard_permutation_batch_to_similarity(
     # Example of gather with 4D tensor and dim=-1:
     # out[i][j][k][l] = input[i][j][k][index[i][j][k][l]]
 
-    return torch.gather(x_permuted_rows, -1, index)
+    return torch.gather(x_permuted_rows, -1, index, out=out)
 
 # %% ../nbs/model.ipynb 13
+def _checkpointed_mean_over_column_segments(
+    fn: callable, x: torch.Tensor, y: torch.Tensor, *, segments: int
+) -> torch.Tensor:
+    """Compute ``fn(x, y)``, for a `fn` which averages over the columns (dimension -2)
+    of `x`, as a weighted sum over at most `segments` segments of columns. Each segment
+    is checkpointed, so that its intermediate tensors are recomputed in the backward
+    pass instead of being stored."""
+    length = x.shape[-2]
+
+    return sum(
+        torch.utils.checkpoint.checkpoint(fn, x_segment, y, use_reentrant=False)
+        * (x_segment.shape[-2] / length)
+        for x_segment in x.tensor_split(min(segments, length), dim=-2)
+    )
+
+
 class TwoBodyEntropyLoss(Module):
     """Differentiable extension of the mean of estimated two-body entropies between
-    all pairs of columns from two one-hot encoded tensors."""
+    all pairs of columns from two one-hot encoded tensors.
+
+    If `checkpoint_segments` is passed, the loss is computed in (at most) that many
+    checkpointed segments of columns of `x`, whose two-body frequencies are recomputed
+    in the backward pass."""
 
     def __init__(self):
         super().__init__()
 
-    def forward(self, x: torch.Tensor, y: torch.Tensor) -> torch.Tensor:
+    def forward(
+        self,
+        x: torch.Tensor,
+        y: torch.Tensor,
+        *,
+        checkpoint_segments: Optional[int] = None,
+    ) -> torch.Tensor:
+        if checkpoint_segments is not None:
+            return _checkpointed_mean_over_column_segments(
+                smooth_mean_two_body_entropy, x, y, segments=checkpoint_segments
+            )
+
         return smooth_mean_two_body_entropy(x, y)
 
 
 class MILoss(Module):
     """Differentiable extension of minus the mean of estimated mutual informations
-    between all pairs of columns from two one-hot encoded tensors."""
+    between all pairs of columns from two one-hot encoded tensors.
+
+    If `checkpoint_segments` is passed, the loss is computed in (at most) that many
+    checkpointed segments of columns of `x`, whose two-body frequencies are recomputed
+    in the backward pass."""
 
     def __init__(self):
         super().__init__()
 
-    def forward(self, x: torch.Tensor, y: torch.Tensor) -> torch.Tensor:
+    @staticmethod
+    def _loss(x: torch.Tensor, y: torch.Tensor) -> torch.Tensor:
         return smooth_mean_two_body_entropy(x, y) - smooth_mean_one_body_entropy(x)
 
+    def forward(
+        self,
+        x: torch.Tensor,
+        y: torch.Tensor,
+        *,
+        checkpoint_segments: Optional[int] = None,
+    ) -> torch.Tensor:
+        if checkpoint_segments is not None:
+            return _checkpointed_mean_over_column_segments(
+                self._loss, x, y, segments=checkpoint_segments
+            )
+
+        return self._loss(x, y)
+
 # %% ../nbs/model.ipynb 18
 class HammingSimilarities(Module):
     """Compute Hamming similarities between sequences using differentiable
@@ -388,11 +1445,17 @@ class HammingSimilarities(Module):
 
         self._group_slices = _consecutive_slices_from_sizes(self.group_sizes)
 
-    def forward(self, x: torch.Tensor) -> torch.Tensor:
-        size = x.shape[:-3] + (x.shape[-3],) * 2
-        out = torch.full(
-            size, torch.nan, dtype=x.dtype, layout=x.layout, device=x.device
-        )
+    def forward(
+        self, x: torch.Tensor, *, out: Optional[torch.Tensor] = None
+    ) -> torch.Tensor:
+        """Compute similarities within groups, with NaN entries between groups. If
+        `out` is passed, only its diagonal blocks are written, so it can be reused
+        without refilling its other entries."""
+        if out is None:
+            size = x.shape[:-3] + (x.shape[-3],) * 2
+            out = torch.full(
+                size, torch.nan, dtype=x.dtype, layout=x.layout, device=x.device
+            )
         for sl in self._group_slices:
             out[..., sl, sl].copy_(
                 self._similarities_fn(x[..., sl, :, :], **self._similarities_fn_kwargs)
@@ -400,6 +1463,11 @@ class HammingSimilarities(Module):
 
         return out
 
+    def pairwise(self, x: torch.Tensor, y: torch.Tensor) -> torch.Tensor:
+        """Compute similarities between all sequences in `x` and all sequences in `y`,
+        regardless of `group_sizes`."""
+        return self._similarities_fn(x, y=y, **self._similarities_fn_kwargs)
+
 
 class Blosum62Similarities(Module):
     """Compute Blosum62-based similarities between sequences using differentiable
@@ -433,7 +1501,8 @@ class Blosum62Similarities(Module):
         blosum62_data = get_blosum62_data(
             aa_to_int=self.aa_to_int, gaps_as_stars=self.gaps_as_stars
         )
-        self.register_buffer("subs_mat", blosum62_data.mat)
+        # Copy the memoized matrix, which is shared between callers
+        self.register_buffer("subs_mat", blosum62_data.mat.clone())
         self.expected_value = blosum62_data.expected_value
 
         self._similarities_fn_kwargs = {"subs_mat": self.subs_mat}
@@ -453,11 +1522,17 @@ class Blosum62Similarities(Module):
 
         self._group_slices = _consecutive_slices_from_sizes(self.group_sizes)
 
-    def forward(self, x: torch.Tensor) -> torch.Tensor:
-        size = x.shape[:-3] + (x.shape[-3],) * 2
-        out = torch.full(
-            size, torch.nan, dtype=x.dtype, layout=x.layout, device=x.device
-        )
+    def forward(
+        self, x: torch.Tensor, *, out: Optional[torch.Tensor] = None
+    ) -> torch.Tensor:
+        """Compute similarities within groups, with NaN entries between groups. If
+        `out` is passed, only its diagonal blocks are written, so it can be reused
+        without refilling its other entries."""
+        if out is None:
+            size = x.shape[:-3] + (x.shape[-3],) * 2
+            out = torch.full(
+                size, torch.nan, dtype=x.dtype, layout=x.layout, device=x.device
+            )
         for sl in self._group_slices:
             out[..., sl, sl].copy_(
                 self._similarities_fn(
@@ -469,6 +1544,13 @@ class Blosum62Similarities(Module):
 
         return out
 
+    def pairwise(self, x: torch.Tensor, y: torch.Tensor) -> torch.Tensor:
+        """Compute similarities between all sequences in `x` and all sequences in `y`,
+        regardless of `group_sizes`."""
+        return self._similarities_fn(
+            x, y=y, subs_mat=self.subs_mat, **self._similarities_fn_kwargs
+        )
+
 # %% ../nbs/model.ipynb 23
 class BestHits(Module):
     """Compute (reciprocal) best hits within and between groups of sequences,
@@ -477,7 +1559,14 @@ class BestHits(Module):
     Best hits can be either 'hard', in which cases they are computed using the
     argmax, or 'soft', in which case they are computed using the softmax with a
     temperature parameter `tau`. In both cases, the main diagonal in the similarity
-    matrix is excluded by setting its entries to minus infinity."""
+    matrix is excluded by setting its entries to minus infinity.
+
+    If `top_k` is not ``None``, best hits can also be computed directly from
+    sequences by `streaming`, without materializing the full similarity matrix:
+    similarities are computed in tiles of `tile_size` rows, and soft best hits are
+    restricted to the `top_k` most similar candidates in each group. If `top_groups`
+    is not ``None``, streaming best hits are also restricted to the `top_groups` groups
+    with the most similar candidates in each row (see `streaming_best_hits`)."""
 
     def __init__(
         self,
@@ -486,6 +1575,9 @@ class BestHits(Module):
         group_sizes: Optional[Sequence[int]],
         tau: float = 0.1,
         mode: Literal["soft", "hard"] = "soft",
+        top_k: Optional[int] = None,
+        top_groups: Optional[int] = None,
+        tile_size: int = 1024,
     ) -> None:
         super().__init__()
         self.reciprocal = reciprocal
@@ -495,6 +1587,9 @@ class BestHits(Module):
         self._group_slices = _consecutive_slices_from_sizes(self.group_sizes)
         self.tau = tau
         self.mode = mode
+        self.top_k = top_k
+        self.top_groups = top_groups
+        self.tile_size = tile_size
 
     @property
     def mode(self) -> str:
@@ -514,25 +1609,67 @@ class BestHits(Module):
     def hard_(self) -> None:
         self.mode = "hard"
 
-    def _soft_bh_fn(self, similarities: torch.Tensor) -> torch.Tensor:
+    def _soft_bh_fn(
+        self, similarities: torch.Tensor, out: Optional[torch.Tensor] = None
+    ) -> torch.Tensor:
         """Compute soft best hits."""
         return soft_best_hits(
             similarities,
             reciprocal=self.reciprocal,
             group_slices=self._group_slices,
             tau=self.tau,
+            out=out,
         )
 
-    def _hard_bh_fn(self, similarities: torch.Tensor) -> torch.Tensor:
+    def _hard_bh_fn(
+        self, similarities: torch.Tensor, out: Optional[torch.Tensor] = None
+    ) -> torch.Tensor:
         """Compute hard best hits."""
         return hard_best_hits(
             similarities,
             reciprocal=self.reciprocal,
             group_slices=self._group_slices,
+            out=out,
+        )
+
+    def hard_sparse(self, similarities: torch.Tensor) -> torch.Tensor:
+        """Compute hard best hits in sparse COO format, regardless of the current mode."""
+        return hard_best_hits_sparse(
+            similarities,
+            reciprocal=self.reciprocal,
+            group_slices=self._group_slices,
         )
 
-    def forward(self, similarities: torch.Tensor) -> torch.Tensor:
-        return self._bh_fn(similarities)
+    def streaming(
+        self,
+        x: torch.Tensor,
+        *,
+        similarities_fn: callable,
+        mode: Optional[Literal["soft", "hard"]] = None,
+    ) -> torch.Tensor:
+        """Compute best hits in sparse COO format from the sequences in `x`, using
+        `similarities_fn(x_tile, x)` to compute similarities between tiles of
+        sequences and all sequences. If `mode` is ``None``, the current mode is used."""
+        if self.top_k is None:
+            raise ValueError("`top_k` must be set to compute streaming best hits.")
+        return streaming_best_hits(
+            x,
+            similarities_fn=similarities_fn,
+            group_slices=self._group_slices,
+            mode=self.mode if mode is None else mode.lower(),
+            top_k=self.top_k,
+            top_groups=self.top_groups,
+            reciprocal=self.reciprocal,
+            tau=self.tau,
+            tile_size=self.tile_size,
+        )
+
+    def forward(
+        self, similarities: torch.Tensor, *, out: Optional[torch.Tensor] = None
+    ) -> torch.Tensor:
+        """Compute best hits in the current mode. If not ``None``, `out` is used to
+        store the non-reciprocal best hits."""
+        return self._bh_fn(similarities, out=out)
 
 # %% ../nbs/model.ipynb 26
 class InterGroupSimilarityLoss(Module):
@@ -541,7 +1678,13 @@ class InterGroupSimilarityLoss(Module):
 
     Similarity matrices are expected to be square and symmetric. The loss is computed
     by comparing the (flattened and concatenated) blocks containing inter-group
-    similarities."""
+    similarities.
+    With the default dot product score, the comparison is performed without
+    materializing the inter-group blocks: rows are visited in tiles of about
+    `tile_size` rows made of whole groups, and only the inter-group entries above the
+    main diagonal are multiplied. In this case, either similarity matrix can also be a
+    sparse COO or CSR tensor (e.g. hard best hits), and only its nonzero entries are
+    visited."""
 
     def __init__(
         self,
@@ -553,18 +1696,39 @@ class InterGroupSimilarityLoss(Module):
         # the flattened and concatenated inter-group blocks of the similarity matrices.
         # Default: dot product
         score_fn: Union[callable, None] = None,
+        # Approximate number of rows in each tile with the default dot product score
+        tile_size: int = 256,
     ) -> None:
         super().__init__()
         self.group_sizes = tuple(s for s in group_sizes)
-        self.score_fn = (
-            partial(torch.tensordot, dims=1) if score_fn is None else score_fn
-        )
+        self.score_fn = score_fn
+        self.tile_size = tile_size
+
+        if self.score_fn is None:
+            _register_group_layout(self, self.group_sizes)
+            # Masks for the inter-group entries above the main diagonal in the blocks
+            # of the tiles on the main diagonal
+            self._row_tiles = _group_row_tiles(self.group_sizes, self.tile_size)
+            for idx, (start, stop) in enumerate(self._row_tiles):
+                group_idxs = self._sample_group_idxs[start:stop]
+                self.register_buffer(
+                    f"_tile_mask_{idx}",
+                    torch.triu(group_idxs[:, None] != group_idxs, diagonal=1),
+                    persistent=False,
+                )
+        else:
+            diag_blocks_mask = torch.block_diag(
+                *[torch.ones((s, s), dtype=torch.bool) for s in self.group_sizes]
+            )
+            self.register_buffer(
+                "_upper_no_diag_blocks_mask", torch.triu(~diag_blocks_mask)
+            )
 
-        diag_blocks_mask = torch.block_diag(
-            *[torch.ones((s, s), dtype=torch.bool) for s in self.group_sizes]
-        )
-        self.register_buffer(
-            "_upper_no_diag_blocks_mask", torch.triu(~diag_blocks_mask)
+    def _is_included(self, rows: torch.Tensor, cols: torch.Tensor) -> torch.Tensor:
+        """Whether the entries (`rows`, `cols`) are upper triangular inter-group
+        entries."""
+        return (rows < cols) & (
+            self._sample_group_idxs[rows] != self._sample_group_idxs[cols]
         )
 
     def forward(
@@ -577,10 +1741,30 @@ class InterGroupSimilarityLoss(Module):
         # Input validation
         assert similarities_x.ndim >= 2 and similarities_y.ndim >= 2
 
-        scores = self.score_fn(
-            similarities_x[..., self._upper_no_diag_blocks_mask],
-            similarities_y[..., self._upper_no_diag_blocks_mask],
-        )
+        if self.score_fn is None:
+            if _is_sparse(similarities_x) or _is_sparse(similarities_y):
+                scores = _sparse_dot(
+                    similarities_x, similarities_y, is_included=self._is_included
+                )
+            else:
+                scores = _upper_tiles_dot(
+                    similarities_x,
+                    similarities_y,
+                    tiles=self._row_tiles,
+                    tile_masks=(
+                        getattr(self, f"_tile_mask_{idx}")
+                        for idx in range(len(self._row_tiles))
+                    ),
+                )
+        else:
+            similarities_x, similarities_y = (
+                s.to_dense() if _is_sparse(s) else s
+                for s in (similarities_x, similarities_y)
+            )
+            scores = self.score_fn(
+                similarities_x[..., self._upper_no_diag_blocks_mask],
+                similarities_y[..., self._upper_no_diag_blocks_mask],
+            )
         loss = -scores
 
         return loss
@@ -595,7 +1779,18 @@ class IntraGroupSimilarityLoss(Module):
     If `group_sizes` is provided, the loss is computed by comparing the flattened
     and concatenated upper triangular blocks containing intra-group similarities.
     Otherwise, the loss is computed by comparing the upper triangular part of the
-    full similarity matrices."""
+    full similarity matrices.
+    With the default dot product score, the comparison is performed without
+    materializing the upper triangular parts: only the upper triangular entries of
+    (the main diagonal blocks of) the similarity matrices are multiplied, and, without
+    `group_sizes`, rows are visited in tiles of `tile_size` rows.
+    With a custom `score_fn` and no `group_sizes`, the upper triangular mask is built
+    once and reused while the size of the similarity matrices does not change.
+    If `packed` is ``True``, similarity matrices are expected in packed form (see
+    `pack_symmetric`), and their upper triangular parts are compared directly.
+    With the default dot product score, either similarity matrix can also be a sparse
+    COO or CSR tensor (e.g. the adjacency matrix of a sparse graph), and only its
+    nonzero entries are visited."""
 
     def __init__(
         self,
@@ -609,28 +1804,128 @@ class IntraGroupSimilarityLoss(Module):
         score_fn: Union[callable, None] = None,
         # If ``True``, exclude the diagonal elements from the computation
         exclude_diagonal: bool = True,
+        # If ``True``, similarity matrices are passed in packed form
+        packed: bool = False,
+        # Number of rows in each tile with the default dot product score
+        tile_size: int = 256,
     ) -> None:
         super().__init__()
         self.group_sizes = (
             tuple(s for s in group_sizes) if group_sizes is not None else None
         )
-        self.score_fn = (
-            partial(torch.tensordot, dims=1) if score_fn is None else score_fn
-        )
+        self.score_fn = score_fn
         self.exclude_diagonal = exclude_diagonal
+        self.packed = packed
+        self.tile_size = tile_size
 
+        if self.group_sizes is None or self.score_fn is None or self.packed:
+            # Without `group_sizes`, holds the upper triangular mask of the last size
+            self.register_buffer("_upper_diag_blocks_mask", None, persistent=False)
         if self.group_sizes is not None:
-            # Boolean mask for the main diagonal blocks corresponding to groups
-            diag_blocks_mask = torch.block_diag(
-                *[torch.ones((s, s), dtype=torch.bool) for s in self.group_sizes]
+            if self.packed:
+                self.register_buffer(
+                    "_diag_blocks_packed_idxs",
+                    packed_diag_blocks_idxs(
+                        self.group_sizes, exclude_diagonal=self.exclude_diagonal
+                    ),
+                    persistent=False,
+                )
+            elif self.score_fn is None:
+                _register_diag_blocks_idxs(self, self.group_sizes)
+                _register_group_layout(self, self.group_sizes)
+            else:
+                # Boolean mask for the main diagonal blocks corresponding to groups
+                diag_blocks_mask = torch.block_diag(
+                    *[torch.ones((s, s), dtype=torch.bool) for s in self.group_sizes]
+                )
+                # Extract the upper triangular part
+                self.register_buffer(
+                    "_upper_diag_blocks_mask",
+                    torch.triu(diag_blocks_mask, diagonal=int(self.exclude_diagonal)),
+                )
+
+    def _upper_mask(self, size: int, device: torch.device) -> torch.Tensor:
+        """Upper triangular mask of shape (`size`, `size`), rebuilt only when `size`
+        or `device` changes."""
+        mask = self._upper_diag_blocks_mask
+        if mask is None or mask.shape[-1] != size or mask.device != device:
+            mask = torch.triu(
+                torch.ones((size, size), dtype=torch.bool, device=device),
+                diagonal=int(self.exclude_diagonal),
             )
-            # Extract the upper triangular part
-            self.register_buffer(
-                "_upper_diag_blocks_mask",
-                torch.triu(diag_blocks_mask, diagonal=int(self.exclude_diagonal)),
+            self._upper_diag_blocks_mask = mask
+
+        return mask
+
+    def _is_included(self, rows: torch.Tensor, cols: torch.Tensor) -> torch.Tensor:
+        """Whether the entries (`rows`, `cols`) are upper triangular (intra-group)
+        entries."""
+        is_included = rows < cols if self.exclude_diagonal else rows <= cols
+        if self.group_sizes is not None:
+            is_included &= (
+                self._sample_group_idxs[rows] == self._sample_group_idxs[cols]
             )
-        else:
-            self._upper_diag_blocks_mask = None
+
+        return is_included
+
+    def _dot_score(
+        self, similarities_x: torch.Tensor, similarities_y: torch.Tensor
+    ) -> torch.Tensor:
+        if _is_sparse(similarities_x) or _is_sparse(similarities_y):
+            return _sparse_dot(
+                similarities_x, similarities_y, is_included=self._is_included
+            )
+        if self.group_sizes is not None:
+            return _diag_blocks_upper_dot(
+                similarities_x,
+                similarities_y,
+                diag_blocks_idxs=_registered_diag_blocks_idxs(self),
+                diagonal=int(self.exclude_diagonal),
+            )
+        n_samples = similarities_x.shape[-1]
+        tiles = [
+            (start, min(start + self.tile_size, n_samples))
+            for start in range(0, n_samples, self.tile_size)
+        ]
+        mask = self._upper_mask(tiles[0][1], similarities_x.device)
+
+        return _upper_tiles_dot(
+            similarities_x,
+            similarities_y,
+            tiles=tiles,
+            tile_masks=(mask[: stop - start, : stop - start] for start, stop in tiles),
+        )
+
+    def _packed_score(
+        self, similarities_x: torch.Tensor, similarities_y: torch.Tensor
+    ) -> torch.Tensor:
+        if self.group_sizes is not None:
+            idxs = self._diag_blocks_packed_idxs
+            similarities_x, similarities_y = (
+                similarities_x[..., idxs],
+                similarities_y[..., idxs],
+            )
+        elif self.score_fn is None:
+            return packed_symmetric_dot(
+                similarities_x, similarities_y, exclude_diagonal=self.exclude_diagonal
+            )
+        elif self.exclude_diagonal:
+            mask = torch.ones(
+                similarities_x.shape[-1], dtype=torch.bool, device=similarities_x.device
+            )
+            mask[
+                packed_diagonal_idxs(
+                    packed_n_samples(similarities_x.shape[-1]), similarities_x.device
+                )
+            ] = False
+            similarities_x, similarities_y = (
+                similarities_x[..., mask],
+                similarities_y[..., mask],
+            )
+
+        if self.score_fn is None:
+            return torch.einsum("...k,...k->...", similarities_x, similarities_y)
+        return self.score_fn(similarities_x, similarities_y)
 
     def forward(
         self,
@@ -639,23 +1934,27 @@ class IntraGroupSimilarityLoss(Module):
         *,
         mats: Optional[Sequence[torch.Tensor]] = None,
     ) -> torch.Tensor:
+        if self.packed:
+            assert similarities_x.shape[-1] == similarities_y.shape[-1]
+            loss = -self._packed_score(similarities_x, similarities_y)
+
+            return loss
+
         assert similarities_x.ndim >= 2 and similarities_y.ndim >= 2
         assert similarities_x.shape[-2:] == similarities_x.shape[-2:]
 
-        if self._upper_diag_blocks_mask is None:
-            mask = torch.triu(
-                torch.ones(
-                    similarities_x.shape[-2:],
-                    dtype=torch.bool,
-                    layout=similarities_x.layout,
-                    device=similarities_x.device,
-                ),
-                diagonal=int(self.exclude_diagonal),
-            )
+        if self.score_fn is None:
+            scores = self._dot_score(similarities_x, similarities_y)
         else:
-            mask = self._upper_diag_blocks_mask
-
-        scores = self.score_fn(similarities_x[..., mask], similarities_y[..., mask])
+            similarities_x, similarities_y = (
+                s.to_dense() if _is_sparse(s) else s
+                for s in (similarities_x, similarities_y)
+            )
+            if self.group_sizes is None:
+                mask = self._upper_mask(similarities_x.shape[-1], similarities_x.device)
+            else:
+                mask = self._upper_diag_blocks_mask
+            scores = self.score_fn(similarities_x[..., mask], similarities_y[..., mask])
         loss = -scores
 
         return loss
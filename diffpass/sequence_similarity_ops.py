@@ -3,43 +3,61 @@
 # %% auto 0
 __all__ = ['smooth_hamming_similarities_cdist', 'smooth_hamming_similarities_dot',
            'smooth_substitution_matrix_similarities_cdist', 'smooth_substitution_matrix_similarities_dot',
-           'soft_best_hits', 'hard_best_hits']
+           'soft_best_hits', 'hard_best_hits', 'hard_best_hits_sparse', 'streaming_best_hits']
 
 # %% ../nbs/sequence_similarity_ops.ipynb 3
 # Stdlib imports
 from collections.abc import Sequence
-from typing import Optional, Union
+from typing import Literal, Optional, Union
 
 # PyTorch
 import torch
 from torch.nn.functional import softmax
 
 
-def smooth_hamming_similarities_cdist(x: torch.Tensor, p: float = 1.0) -> torch.Tensor:
+def smooth_hamming_similarities_cdist(
+    x: torch.Tensor, p: float = 1.0, *, y: Optional[torch.Tensor] = None
+) -> torch.Tensor:
     """Smooth extension of the normalized Hamming similarity between all pairs of sequences in `x`.
-    `x` must have shape (..., N, L, R), and the result has shape (..., N, N)."""
+    `x` must have shape (..., N, L, R), and the result has shape (..., N, N).
+    If `y` of shape (..., M, L, R) is passed, similarities are computed between the
+    sequences in `x` and those in `y` instead, and the result has shape (..., N, M)."""
     length = x.shape[-2]
     x = x.flatten(start_dim=-2)
-    norm_similarities = 1 - (torch.cdist(x, x, p=p) ** p) / (2 * length)
+    y = x if y is None else y.flatten(start_dim=-2)
+    norm_similarities = 1 - (torch.cdist(x, y, p=p) ** p) / (2 * length)
 
     return norm_similarities
 
 
-def smooth_hamming_similarities_dot(x: torch.Tensor) -> torch.Tensor:
+def smooth_hamming_similarities_dot(
+    x: torch.Tensor, *, y: Optional[torch.Tensor] = None
+) -> torch.Tensor:
     """Smooth extension of the normalized Hamming similarity between all pairs of sequences in `x`.
-    `x` must have shape (..., N, L, R), and the result has shape (..., N, N)."""
+    `x` must have shape (..., N, L, R), and the result has shape (..., N, N).
+    If `y` of shape (..., M, L, R) is passed, similarities are computed between the
+    sequences in `x` and those in `y` instead, and the result has shape (..., N, M)."""
     length = x.shape[-2]
-    norm_similarities = torch.einsum("...mia,...nia->...mn", x, x) / length
+    y = x if y is None else y
+    norm_similarities = torch.einsum("...mia,...nia->...mn", x, y) / length
 
     return norm_similarities
 
 
 def smooth_substitution_matrix_similarities_cdist(
-    x: torch.Tensor, subs_mat: torch.Tensor, p: float = 1.0
+    x: torch.Tensor,
+    subs_mat: torch.Tensor,
+    p: float = 1.0,
+    *,
+    y: Optional[torch.Tensor] = None,
 ) -> torch.Tensor:
     """TODO."""
     x = torch.einsum("ab,...nib->...nia", subs_mat, x).flatten(start_dim=-2)
-    scores = -torch.cdist(x, x, p=p) ** p
+    if y is None:
+        y = x
+    else:
+        y = torch.einsum("ab,...nib->...nia", subs_mat, y).flatten(start_dim=-2)
+    scores = -torch.cdist(x, y, p=p) ** p
 
     return scores
 
@@ -49,17 +67,24 @@ def smooth_substitution_matrix_similarities_dot(
     subs_mat: torch.Tensor,
     use_scoredist: bool = False,
     expected_value: Optional[float] = None,
+    *,
+    y: Optional[torch.Tensor] = None,
 ) -> torch.Tensor:
     """TODO."""
     length = x.shape[-2]
-    scores = torch.einsum("...mia,ab,...nib->...mn", x, subs_mat, x)
+    scores = torch.einsum("...mia,ab,...nib->...mn", x, subs_mat, x if y is None else y)
     if use_scoredist:
         # ScoreDist: https://bmcbioinformatics.biomedcentral.com/articles/10.1186/1471-2105-6-108
         expected_scores_null = expected_value * length
         scores_norm = torch.clamp(scores - expected_scores_null, min=1e-8)
-        diagonal_scores = scores.diagonal(dim1=-2, dim2=-1)
+        if y is None:
+            diagonal_scores_x = diagonal_scores_y = scores.diagonal(dim1=-2, dim2=-1)
+        else:
+            diagonal_scores_x, diagonal_scores_y = (
+                torch.einsum("...mia,ab,...mib->...m", z, subs_mat, z) for z in (x, y)
+            )
         score_upper_bounds = (
-            diagonal_scores.unsqueeze(-1) + diagonal_scores.unsqueeze(-2)
+            diagonal_scores_x.unsqueeze(-1) + diagonal_scores_y.unsqueeze(-2)
         ) / 2
         score_upper_bounds_norm = score_upper_bounds - expected_scores_null
 
@@ -80,11 +105,13 @@ def soft_best_hits(
     reciprocal: bool = False,
     group_slices: Sequence[slice],
     tau: Union[float, torch.Tensor] = 0.1,
+    out: Optional[torch.Tensor] = None,
 ) -> torch.Tensor:
     """Soft reciprocal best hits graphs from pairwise similarities.
     `similarities` must have shape (..., N, N). The main diagonal is
-    excluded by setting its entries to minus infinity before softmax."""
-    best_hits = torch.empty_like(similarities)
+    excluded by setting its entries to minus infinity before softmax. If not
+    ``None``, `out` is used to store the non-reciprocal best hits."""
+    best_hits = torch.empty_like(similarities) if out is None else out
     inf_diag = torch.zeros(
         similarities.shape[-2:],
         device=similarities.device,
@@ -107,11 +134,16 @@ def hard_best_hits(
     *,
     reciprocal: bool = False,
     group_slices: Sequence[slice],
+    out: Optional[torch.Tensor] = None,
 ) -> torch.Tensor:
     """Hard reciprocal best hits graphs from pairwise similarities.
     `similarities` must have shape (..., N, N). The main diagonal is
-    excluded by setting its entries to minus infinity before argmax."""
-    best_hits = torch.zeros_like(similarities, requires_grad=False)
+    excluded by setting its entries to minus infinity before argmax. If not
+    ``None``, `out` is used to store the non-reciprocal best hits."""
+    if out is None:
+        best_hits = torch.zeros_like(similarities, requires_grad=False)
+    else:
+        best_hits = out.zero_()
     inf_diag = torch.zeros(
         similarities.shape[-2:],
         device=similarities.device,
@@ -128,3 +160,175 @@ def hard_best_hits(
         best_hits = _reciprocate_best_hits(best_hits)
 
     return best_hits
+
+
+def hard_best_hits_sparse(
+    similarities: torch.Tensor,
+    *,
+    reciprocal: bool = False,
+    group_slices: Sequence[slice],
+) -> torch.Tensor:
+    """Hard reciprocal best hits graphs from pairwise similarities, as in `hard_best_hits`,
+    but returned in sparse COO format with at most one nonzero entry per row and group.
+    `similarities` must have shape (N, N)."""
+    n_samples = similarities.shape[-1]
+    similarities = similarities.clone()
+    similarities.diagonal().fill_(-torch.inf)
+    # Global column index of the best hit of each row in each group
+    best_hits_cols = torch.stack(
+        [
+            torch.argmax(similarities[:, sl], dim=-1) + (sl.start or 0)
+            for sl in group_slices
+        ],
+        dim=-1,
+    )
+    rows = torch.arange(n_samples, device=similarities.device)
+    rows = rows[:, None].expand_as(best_hits_cols)
+    if reciprocal:
+        # Group index of each row (equivalently, column)
+        group_idxs = torch.empty_like(rows[:, 0])
+        for group_idx, sl in enumerate(group_slices):
+            group_idxs[sl] = group_idx
+        is_reciprocal = best_hits_cols[best_hits_cols, group_idxs[:, None]] == rows
+        rows, best_hits_cols = rows[is_reciprocal], best_hits_cols[is_reciprocal]
+    indices = torch.stack([rows.flatten(), best_hits_cols.flatten()])
+    values = torch.ones(
+        indices.shape[-1], dtype=similarities.dtype, device=similarities.device
+    )
+
+    return torch.sparse_coo_tensor(
+        indices, values, (n_samples, n_samples), check_invariants=False
+    ).coalesce()
+
+
+def _reciprocate_sparse_best_hits(best_hits: torch.Tensor) -> torch.Tensor:
+    """Point-wise multiply a coalesced sparse COO best hits graph of shape (N, N)
+    with its transpose to obtain a reciprocal best hits graph."""
+    n_samples = best_hits.shape[-1]
+    (rows, cols), values = best_hits.indices(), best_hits.values()
+    # Linear indices of the nonzero entries are sorted, as `best_hits` is coalesced
+    keys = rows * n_samples + cols
+    transposed_keys = cols * n_samples + rows
+    pos = torch.searchsorted(keys, transposed_keys).clamp_(max=len(keys) - 1)
+    is_reciprocal = keys[pos] == transposed_keys
+
+    return torch.sparse_coo_tensor(
+        best_hits.indices()[:, is_reciprocal],
+        values[is_reciprocal] * values[pos[is_reciprocal]],
+        best_hits.shape,
+        check_invariants=False,
+    ).coalesce()
+
+
+def streaming_best_hits(
+    x: torch.Tensor,
+    *,
+    similarities_fn: callable,
+    group_slices: Sequence[slice],
+    mode: Literal["soft", "hard"] = "soft",
+    top_k: int = 1,
+    top_groups: Optional[int] = None,
+    reciprocal: bool = False,
+    tau: Union[float, torch.Tensor] = 0.1,
+    tile_size: int = 1024,
+) -> torch.Tensor:
+    """Soft or hard reciprocal best hits graphs from the sequences in `x`, without
+    materializing the full matrix of pairwise similarities.
+    `x` must have shape (N, ...), and `similarities_fn(x_tile, x)` must return the
+    similarities, of shape (T, N), between the T sequences in `x_tile` and those in
+    `x`. Similarities are computed in tiles of `tile_size` rows, and only the
+    `top_k` most similar candidates per row and group are kept. If `top_groups` is
+    not ``None``, only the `top_groups` groups with the most similar candidates are
+    kept in each row. Soft best hits use the softmax over the kept candidates of
+    each group. The main diagonal is excluded, except in groups of size one, whose
+    only candidate is then the sequence itself (where `soft_best_hits` gives NaN).
+    Otherwise, when `top_groups` is ``None``, soft best hits coincide with
+    `soft_best_hits` if `top_k` is at least the size of the largest group, and hard
+    best hits coincide with `hard_best_hits`. The result is a sparse COO tensor of
+    shape (N, N), with at most `top_k` (one, for hard best hits) nonzero entries
+    per row and kept group, so that memory is O(N * `top_k` * `top_groups`)."""
+    n_samples = x.shape[0]
+    device = x.device
+    # Group index of each row (equivalently, column), and global column indices of
+    # the groups, stacked by group size
+    group_idxs = torch.empty(n_samples, dtype=torch.long, device=device)
+    cols_by_size = {}
+    for group_idx, sl in enumerate(group_slices):
+        start, stop, _ = sl.indices(n_samples)
+        group_idxs[start:stop] = group_idx
+        cols_by_size.setdefault(stop - start, []).append(
+            torch.arange(start, stop, device=device)
+        )
+    cols_by_size = {size: torch.stack(cols) for size, cols in cols_by_size.items()}
+    # In groups of size one, the entry itself is the only candidate
+    is_diag_excluded = (torch.bincount(group_idxs) > 1)[group_idxs]
+
+    rows_all, cols_all, values_all = [], [], []
+    with torch.set_grad_enabled(torch.is_grad_enabled() and mode == "soft"):
+        for start in range(0, n_samples, tile_size):
+            stop = min(start + tile_size, n_samples)
+            rows = torch.arange(start, stop, device=device)
+            similarities = similarities_fn(x[start:stop], x)
+            diag_rows = rows[is_diag_excluded[start:stop]]
+            similarities = similarities.index_put(
+                (diag_rows - start, diag_rows),
+                torch.tensor(-torch.inf, dtype=similarities.dtype, device=device),
+            )
+            tile_hits = []
+            for size, cols in cols_by_size.items():
+                # Shape (T, n_groups_of_this_size, size)
+                candidates = similarities[:, cols]
+                if mode == "hard":
+                    candidates, idxs = torch.max(candidates, dim=-1, keepdim=True)
+                    values = torch.ones(
+                        idxs.shape, dtype=similarities.dtype, device=device
+                    )
+                else:
+                    candidates, idxs = torch.topk(
+                        candidates, min(top_k, size), dim=-1, sorted=False
+                    )
+                    values = softmax(candidates / tau, dim=-1)
+                tile_hits.append(
+                    (
+                        candidates.amax(-1),
+                        cols.expand(len(rows), -1, -1).gather(-1, idxs),
+                        values,
+                    )
+                )
+            is_kept = [None] * len(tile_hits)
+            if top_groups is not None:
+                # Keep only the groups with the most similar candidates in each row
+                best_similarities = torch.cat([hits[0] for hits in tile_hits], dim=-1)
+                is_kept = torch.zeros_like(best_similarities, dtype=torch.bool)
+                is_kept.scatter_(
+                    -1,
+                    torch.topk(
+                        best_similarities.detach(),
+                        min(top_groups, best_similarities.shape[-1]),
+                        dim=-1,
+                        sorted=False,
+                    ).indices,
+                    True,
+                )
+                is_kept = is_kept.split([hits[0].shape[-1] for hits in tile_hits], -1)
+            for (_, cols, values), is_kept_this_size in zip(tile_hits, is_kept):
+                rows_tile = rows[:, None, None].expand_as(cols)
+                if is_kept_this_size is not None:
+                    rows_tile, cols, values = (
+                        t[is_kept_this_size] for t in (rows_tile, cols, values)
+                    )
+                rows_all.append(rows_tile)
+                cols_all.append(cols)
+                values_all.append(values)
+
+    indices = torch.stack(
+        [torch.cat([t.flatten() for t in ts]) for ts in (rows_all, cols_all)]
+    )
+    values = torch.cat([v.flatten() for v in values_all])
+    best_hits = torch.sparse_coo_tensor(
+        indices, values, (n_samples, n_samples), check_invariants=False
+    ).coalesce()
+    if reciprocal:
+        best_hits = _reciprocate_sparse_best_hits(best_hits)
+
+    return best_hits
@@ -0,0 +1,149 @@
+# AUTOGENERATED! DO NOT EDIT! File to edit: ../nbs/symmetric_ops.ipynb.
+
+# %% auto 0
+__all__ = ['packed_size', 'packed_n_samples', 'packed_symmetric_idxs', 'packed_diagonal_idxs', 'packed_diag_blocks_idxs',
+           'pack_symmetric_rows', 'pack_symmetric', 'unpack_symmetric', 'packed_symmetric_from_pairwise',
+           'permute_packed_symmetric', 'packed_symmetric_dot']
+
+# %% ../nbs/symmetric_ops.ipynb 3
+# Stdlib imports
+from collections.abc import Sequence
+from math import isqrt
+
+# PyTorch
+import torch
+
+
+def packed_size(n_samples: int) -> int:
+    """Number of entries in the packed form of a symmetric matrix of shape
+    (n_samples, n_samples), i.e. in its upper triangular part including the main
+    diagonal."""
+    return n_samples * (n_samples + 1) // 2
+
+
+def packed_n_samples(size: int) -> int:
+    """Number of rows of a symmetric matrix whose packed form has `size` entries."""
+    n_samples = (isqrt(8 * size + 1) - 1) // 2
+    if packed_size(n_samples) != size:
+        raise ValueError(f"{size} is not the size of a packed symmetric matrix.")
+
+    return n_samples
+
+
+def packed_symmetric_idxs(
+    rows: torch.Tensor, cols: torch.Tensor, n_samples: int
+) -> torch.Tensor:
+    """Positions of the entries (`rows`, `cols`) of a symmetric matrix of shape
+    (n_samples, n_samples) in its packed form. `rows` and `cols` are broadcast
+    against each other."""
+    i, j = torch.minimum(rows, cols), torch.maximum(rows, cols)
+
+    return i * (2 * n_samples - i + 1) // 2 + (j - i)
+
+
+def packed_diagonal_idxs(n_samples: int, device=None) -> torch.Tensor:
+    """Positions of the main diagonal of a symmetric matrix of shape
+    (n_samples, n_samples) in its packed form."""
+    i = torch.arange(n_samples, device=device)
+
+    return packed_symmetric_idxs(i, i, n_samples)
+
+
+def packed_diag_blocks_idxs(
+    group_sizes: Sequence[int], *, exclude_diagonal: bool = False
+) -> torch.Tensor:
+    """Positions, in the packed form of a symmetric matrix, of the upper triangular
+    parts of its main diagonal blocks with sizes `group_sizes`. The main diagonal is
+    excluded if `exclude_diagonal` is ``True``."""
+    n_samples = sum(group_sizes)
+    idxs = []
+    start = 0
+    for s in group_sizes:
+        rows, cols = torch.triu_indices(s, s, offset=int(exclude_diagonal)) + start
+        idxs.append(packed_symmetric_idxs(rows, cols, n_samples))
+        start += s
+
+    return torch.cat(idxs)
+
+
+def _upper_mask(start: int, stop: int, n_samples: int, device=None) -> torch.Tensor:
+    """Boolean mask of shape (stop - start, n_samples) for the entries on or above the
+    main diagonal in rows `start` to `stop` of a square matrix."""
+    rows = torch.arange(start, stop, device=device)
+
+    return torch.arange(n_samples, device=device) >= rows[:, None]
+
+
+def pack_symmetric_rows(x_rows: torch.Tensor, start: int = 0) -> torch.Tensor:
+    """Pack the entries on or above the main diagonal in a tile of consecutive rows of
+    a symmetric matrix of shape (N, N). `x_rows` must have shape (..., T, N) and contain
+    rows `start` to `start + T`. The result is the corresponding contiguous segment of
+    the packed form."""
+    n_rows, n_samples = x_rows.shape[-2:]
+
+    return x_rows[..., _upper_mask(start, start + n_rows, n_samples, x_rows.device)]
+
+
+def pack_symmetric(x: torch.Tensor) -> torch.Tensor:
+    """Pack symmetric matrices of shape (..., N, N) into tensors of shape
+    (..., N * (N + 1) / 2) containing their upper triangular parts (including the main
+    diagonal) in row-major order."""
+    return pack_symmetric_rows(x)
+
+
+def unpack_symmetric(packed: torch.Tensor) -> torch.Tensor:
+    """Inverse of `pack_symmetric`."""
+    n_samples = packed_n_samples(packed.shape[-1])
+    i = torch.arange(n_samples, device=packed.device)
+
+    return packed[..., packed_symmetric_idxs(i[:, None], i, n_samples)]
+
+
+def packed_symmetric_from_pairwise(
+    x: torch.Tensor, *, pairwise_fn: callable, tile_size: int = 1024
+) -> torch.Tensor:
+    """Packed form of the symmetric matrix of pairwise quantities (e.g. similarities)
+    between the N entries of `x`, of shape (N, ...). `pairwise_fn(x_tile, x)` must return
+    the tensor of shape (T, N) of pairwise quantities between the entries in `x_tile`
+    and those in `x`. It is called on tiles of `tile_size` rows, so that the full
+    (N, N) matrix is never materialized."""
+    n_samples = x.shape[0]
+
+    return torch.cat(
+        [
+            pack_symmetric_rows(pairwise_fn(x[start : start + tile_size], x), start)
+            for start in range(0, n_samples, tile_size)
+        ],
+        dim=-1,
+    )
+
+
+def permute_packed_symmetric(
+    packed: torch.Tensor, perm: torch.Tensor, *, tile_size: int = 1024
+) -> torch.Tensor:
+    """Packed form of ``x[perm][:, perm]``, where ``x`` is the symmetric matrix with
+    packed form `packed` and `perm` is a permutation of shape (N,). Rows are gathered in
+    tiles of `tile_size` rows."""
+    n_samples = perm.shape[-1]
+    permuted = []
+    for start in range(0, n_samples, tile_size):
+        stop = min(start + tile_size, n_samples)
+        idxs = packed_symmetric_idxs(perm[start:stop, None], perm, n_samples)
+        permuted.append(
+            packed[..., idxs[_upper_mask(start, stop, n_samples, perm.device)]]
+        )
+
+    return torch.cat(permuted, dim=-1)
+
+
+def packed_symmetric_dot(
+    x: torch.Tensor, y: torch.Tensor, *, exclude_diagonal: bool = True
+) -> torch.Tensor:
+    """Dot product between the upper triangular parts of symmetric matrices in packed
+    form. The main diagonal is excluded if `exclude_diagonal` is ``True``."""
+    dot = torch.einsum("...k,...k->...", x, y)
+    if exclude_diagonal:
+        diag_idxs = packed_diagonal_idxs(packed_n_samples(x.shape[-1]), x.device)
+        dot = dot - torch.einsum("...k,...k->...", x[..., diag_idxs], y[..., diag_idxs])
+
+    return dot
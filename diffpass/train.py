@@ -9,11 +9,14 @@ __all__ = ['IndexPair', 'IndexPairsInGroup', 'IndexPairsInGroups', 'InformationP
 from collections.abc import Sequence
 from typing import Optional, Any, Literal
 
+# NumPy
+import numpy as np
+
 # PyTorch
 import torch
 
 # DiffPaSS imports
-from .base import DiffPaSSModel
+from .base import DiffPaSSModel, INGROUP_IDX_DTYPE
 from diffpass.model import (
     MatrixApply,
     PermutationConjugate,
@@ -23,6 +26,12 @@ from diffpass.model import (
     InterGroupSimilarityLoss,
     IntraGroupSimilarityLoss,
 )
+from .entropy_ops import pointwise_shannon
+from diffpass.symmetric_ops import (
+    packed_n_samples,
+    packed_symmetric_from_pairwise,
+    packed_symmetric_idxs,
+)
 
 # Type aliases
 IndexPair = tuple[int, int]  # Pair of indices
@@ -30,8 +39,86 @@ IndexPairsInGroup = list[IndexPair]  # Pairs of indices in a group of sequences
 IndexPairsInGroups = list[IndexPairsInGroup]  # Pairs of indices in groups of sequences
 
 # %% ../nbs/train.ipynb 7
+def _global_perm(
+    hard_perms: Sequence[np.ndarray], group_sizes: Sequence[int], device=None
+) -> torch.Tensor:
+    """Global permutation, of shape (N,), from hard permutations in the format of
+    `DiffPaSSResults.hard_perms`. Position i is paired with entry ``perm[i]`` of the
+    object to be permuted."""
+    starts = np.cumsum([0] + list(group_sizes[:-1]))
+
+    return torch.cat(
+        [
+            start + torch.as_tensor(perm_this_group, dtype=torch.long)
+            for start, perm_this_group in zip(starts, hard_perms)
+        ]
+    ).to(device)
+
+
+def _group_perms(perm: torch.Tensor, group_sizes: Sequence[int]) -> list[torch.Tensor]:
+    """Inverse of `_global_perm`, returning tensors."""
+    starts = np.cumsum([0] + list(group_sizes[:-1]))
+
+    return [perm[start : start + s] - start for start, s in zip(starts, group_sizes)]
+
+
+def _fixed_positions_mask(
+    fixed_pairings: Optional[IndexPairsInGroups],
+    group_sizes: Sequence[int],
+    device=None,
+) -> torch.Tensor:
+    """Boolean mask, of shape (N,), of the positions fixed by `fixed_pairings`."""
+    is_fixed = torch.zeros(sum(group_sizes), dtype=torch.bool, device=device)
+    if fixed_pairings:
+        starts = np.cumsum([0] + list(group_sizes[:-1]))
+        for start, fm in zip(starts, fixed_pairings):
+            is_fixed[[start + j for _, j in fm]] = True
+
+    return is_fixed
+
+
+def _swap_buckets(group_sizes: Sequence[int], device=None) -> list[torch.Tensor]:
+    """Positions in groups with at least two entries, bucketed by group size. Each
+    bucket has shape (n_groups_with_this_size, size)."""
+    starts = np.cumsum([0] + list(group_sizes[:-1]))
+    buckets = {}
+    for start, s in zip(starts, group_sizes):
+        if s > 1:
+            buckets.setdefault(s, []).append(range(start, start + s))
+
+    return [torch.tensor(b, device=device) for b in buckets.values()]
+
+
+def _mutual_best_swaps(
+    gains: torch.Tensor, *, idxs: torch.Tensor, is_fixed: torch.Tensor
+) -> tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+    """Improving swaps between positions that are each other's best swap partner,
+    given the gains from all within-group swaps, of shape (n_groups, s, s), in the
+    groups of positions `idxs`, of shape (n_groups, s). Positions in `is_fixed` are
+    never swapped. The selected swaps are disjoint and include the best swap in each
+    group, if improving. Return their two positions and their gains."""
+    s = idxs.shape[-1]
+    excluded = is_fixed[idxs][..., :, None] | is_fixed[idxs][..., None, :]
+    excluded |= torch.eye(s, dtype=torch.bool, device=idxs.device)
+    gains = gains.masked_fill(excluded, -torch.inf)
+    best_gains, best = gains.max(-1)
+    local_idxs = torch.arange(s, device=idxs.device)
+    is_selected = (
+        (best.gather(-1, best) == local_idxs) & (local_idxs < best) & (best_gains > 0)
+    )
+
+    return (
+        idxs[is_selected],
+        idxs.gather(-1, best)[is_selected],
+        best_gains[is_selected],
+    )
+
+# %% ../nbs/train.ipynb 8
 class InformationPairing(DiffPaSSModel):
-    """DiffPaSS model for information-theoretic pairing of multiple sequence alignments (MSAs)."""
+    """DiffPaSS model for information-theoretic pairing of multiple sequence alignments (MSAs).
+
+    Hard permutations can be refined by swap-based local search on the two-body entropy (see `refine_hard_perms`).
+    """
 
     are_inputs_msas = True
 
@@ -72,10 +159,17 @@ class InformationPairing(DiffPaSSModel):
     ) -> dict[str, torch.Tensor]:
         # Soft or hard permutations (list)
         perms = self.permutation()
-        x_perm = self.matrix_apply(x, mats=perms)
+        x_perm = self.matrix_apply(
+            x,
+            mats=perms,
+            out=self._workspace_buffer("x_perm", perms[0].shape[:-2] + x.shape, like=x),
+            checkpoint=self._checkpointing,
+        )
 
         # Two-body entropy portion of the loss
-        loss = self.information_loss(x_perm, y)
+        loss = self.information_loss(
+            x_perm, y, checkpoint_segments=self.checkpoint_segments
+        )
 
         return {"perms": perms, "x_perm": x_perm, "loss": loss}
 
@@ -94,7 +188,164 @@ class InformationPairing(DiffPaSSModel):
 
         return {"hard": hard_loss_identity_perm, "soft": soft_loss_identity_perm}
 
-# %% ../nbs/train.ipynb 10
+    @staticmethod
+    def _two_body_counts_idxs(
+        x_tokens: torch.Tensor,
+        y_tokens: torch.Tensor,
+        *,
+        alphabet_size_x: int,
+        alphabet_size_y: int,
+    ) -> torch.Tensor:
+        """Positions, in the flattened two-body counts of shape (L_x, R_x, L_y, R_y), of
+        the counts for the pairs of sequences with tokens `x_tokens`, of shape (K, L_x),
+        and `y_tokens`, of shape (K, L_y). Output shape: (K, L_x, L_y)."""
+        length_x, length_y = x_tokens.shape[-1], y_tokens.shape[-1]
+        col_idxs_x = torch.arange(length_x, device=x_tokens.device)
+        col_idxs_y = torch.arange(length_y, device=y_tokens.device)
+        idxs_x = (col_idxs_x * alphabet_size_x + x_tokens) * length_y * alphabet_size_y
+        idxs_y = col_idxs_y * alphabet_size_y + y_tokens
+
+        return idxs_x[:, :, None] + idxs_y[:, None, :]
+
+    def refine_hard_perms(
+        self,
+        x: torch.Tensor,
+        y: torch.Tensor,
+        *,
+        hard_perms: Sequence[np.ndarray],
+        max_rounds: int = 100,
+        tile_size: int = 1024,
+    ) -> tuple[list[np.ndarray], float]:
+        """Refine hard permutations by swap-based local search on the two-body entropy,
+        which is also the only part of the mutual information that depends on the
+        pairing. `x` and `y` must be one-hot encoded.
+
+        Two-body counts are cached, and the entropy change from each within-group swap
+        of partners is computed from the (at most four) changed counts in each pair of
+        columns only, in O(L_x * L_y), for tiles of `tile_size` swaps. At each round,
+        among the improving swaps, those whose two positions are each other's best swap
+        partner (which do not overlap) are sorted by gain and applied as a batch. If
+        the batch does not decrease the entropy, only its first half is tried, and so
+        on. Positions fixed by `fixed_pairings` are never swapped. The search stops
+        when no improving swap remains, or after `max_rounds` rounds."""
+        device = y.device
+        n_samples, length_x, alphabet_size_x = x.shape
+        _, length_y, alphabet_size_y = y.shape
+        perm = _global_perm(hard_perms, self.group_sizes, device)
+        is_fixed = _fixed_positions_mask(self.fixed_pairings, self.group_sizes, device)
+        bucket_idxs = _swap_buckets(self.group_sizes, device)
+
+        def counts_idxs(positions, partners):
+            return self._two_body_counts_idxs(
+                x_tokens[perm[partners]],
+                y_tokens[positions],
+                alphabet_size_x=alphabet_size_x,
+                alphabet_size_y=alphabet_size_y,
+            )
+
+        def mean_entropy(counts):
+            # As in `smooth_mean_two_body_entropy`
+            return (
+                shannon[counts]
+                .view(length_x, alphabet_size_x, length_y, alphabet_size_y)
+                .sum((-3, -1))
+                .mean((-2, -1))
+            )
+
+        with torch.no_grad():
+            x_tokens, y_tokens = x.argmax(-1), y.argmax(-1)
+            # Entropy terms for all possible integer counts, and their changes when
+            # counts are decreased or increased by one
+            shannon = pointwise_shannon(
+                torch.arange(n_samples + 2, dtype=y.dtype, device=device) / n_samples
+            )
+            shannon_increase = shannon[1:] - shannon[:-1]
+            shannon_decrease = torch.cat([shannon.new_zeros(1), -shannon_increase])
+            counts = torch.zeros(
+                length_x * alphabet_size_x * length_y * alphabet_size_y,
+                dtype=torch.long,
+                device=device,
+            )
+            all_idxs = torch.arange(n_samples, device=device)
+            initial_idxs = counts_idxs(all_idxs, all_idxs).flatten()
+            counts.index_add_(
+                0,
+                initial_idxs,
+                torch.ones(len(initial_idxs), dtype=torch.long, device=device),
+            )
+            entropy = mean_entropy(counts)
+            for _ in range(max_rounds):
+                # Entropy changes when each count is decreased or increased by one
+                decreases = shannon_decrease[counts]
+                increases = shannon_increase[counts]
+                swaps_a, swaps_b, swap_gains = [], [], []
+                for idxs in bucket_idxs:
+                    s = idxs.shape[-1]
+                    rows, cols = torch.triu_indices(s, s, offset=1, device=device)
+                    upper_gains = []
+                    for a, b in zip(
+                        idxs[:, rows].flatten().split(tile_size),
+                        idxs[:, cols].flatten().split(tile_size),
+                    ):
+                        # Entropy changes from removing the current pairs and adding
+                        # the swapped ones, in each pair of columns
+                        entropy_changes = (
+                            decreases[counts_idxs(a, a)]
+                            + decreases[counts_idxs(b, b)]
+                            + increases[counts_idxs(a, b)]
+                            + increases[counts_idxs(b, a)]
+                        )
+                        # Counts only change where both tokens differ
+                        is_changed_x = x_tokens[perm[a]] != x_tokens[perm[b]]
+                        is_changed_y = y_tokens[a] != y_tokens[b]
+                        is_changed = is_changed_x[:, :, None] & is_changed_y[:, None, :]
+                        upper_gains.append(
+                            -(entropy_changes * is_changed).mean((-2, -1))
+                        )
+                    upper_gains = torch.cat(upper_gains).view(len(idxs), -1)
+                    gains = upper_gains.new_zeros((len(idxs), s, s))
+                    gains[:, rows, cols] = upper_gains
+                    gains[:, cols, rows] = upper_gains
+                    a, b, gains = _mutual_best_swaps(
+                        gains, idxs=idxs, is_fixed=is_fixed
+                    )
+                    swaps_a.append(a)
+                    swaps_b.append(b)
+                    swap_gains.append(gains)
+                swap_gains, order = torch.sort(torch.cat(swap_gains), descending=True)
+                if not len(swap_gains):
+                    break
+                swaps_a, swaps_b = torch.cat(swaps_a)[order], torch.cat(swaps_b)[order]
+
+                # Gains are not additive across swaps: accept the largest prefix of the
+                # batch, halving it until the entropy decreases. A single swap always
+                # decreases it, up to rounding errors
+                n_accepted = len(swap_gains)
+                while True:
+                    a, b = swaps_a[:n_accepted], swaps_b[:n_accepted]
+                    removed = torch.cat([counts_idxs(a, a), counts_idxs(b, b)])
+                    added = torch.cat([counts_idxs(a, b), counts_idxs(b, a)])
+                    ones = torch.ones(removed.numel(), dtype=torch.long, device=device)
+                    new_counts = counts.index_add(0, removed.flatten(), -ones)
+                    new_counts.index_add_(0, added.flatten(), ones)
+                    new_entropy = mean_entropy(new_counts)
+                    if new_entropy < entropy or n_accepted == 1:
+                        break
+                    n_accepted //= 2
+                if not new_entropy < entropy:
+                    break
+                counts, entropy = new_counts, new_entropy
+                perm[torch.cat([a, b])] = perm[torch.cat([b, a])]
+
+            loss = self.information_loss(x[perm], y).item()
+        refined_hard_perms = [
+            perm_this_group.cpu().numpy().astype(INGROUP_IDX_DTYPE)
+            for perm_this_group in _group_perms(perm, self.group_sizes)
+        ]
+
+        return refined_hard_perms, loss
+
+# %% ../nbs/train.ipynb 12
 class BestHitsPairing(DiffPaSSModel):
     """DiffPaSS model for pairing of multiple sequence alignments (MSAs) by aligning their orthology networks, constructed using (reciprocal) best hits ."""
 
@@ -154,30 +405,89 @@ class BestHitsPairing(DiffPaSSModel):
                 self.similarities_comparison_loss
             )
 
-    def _precompute_bh(self, x: torch.Tensor, y: torch.Tensor) -> None:
+    def _soft_bh(self, similarities: torch.Tensor) -> torch.Tensor:
         mode = self.best_hits.mode
 
-        # Temporarily switch to hard BH
-        self.best_hits.hard_()
-        similarities_x = self.similarities(x)
-        self.register_buffer("_bh_hard_x", self.best_hits(similarities_x))
-        similarities_y = self.similarities(y)
-        self.register_buffer("_bh_hard_y", self.best_hits(similarities_y))
-
-        # Switch to soft BH
+        # Temporarily switch to soft BH
         self.best_hits.soft_()
-        self.register_buffer("_bh_soft_x", self.best_hits(similarities_x))
-        self.register_buffer("_bh_soft_y", self.best_hits(similarities_y))
+        bh = self.best_hits(similarities)
 
         # Restore initial mode
         self.best_hits.mode = mode
 
+        return bh
+
+    def _streaming_bh(self, x: torch.Tensor, *, mode: str) -> torch.Tensor:
+        # Sparse BH restricted to the top-k candidates per row and group, without
+        # materializing the full similarity matrix
+        return self.best_hits.streaming(
+            x, similarities_fn=self.similarities.pairwise, mode=mode
+        )
+
+    def _precompute_bh(self, x: torch.Tensor, y: torch.Tensor) -> None:
+        if self.best_hits.top_k is not None:
+            self.register_buffer("_bh_hard_x", self._streaming_bh(x, mode="hard"))
+            self.register_buffer("_bh_hard_y", self._streaming_bh(y, mode="hard"))
+            if not self.compare_soft_best_hits_to_hard:
+                self.register_buffer("_bh_soft_y", self._streaming_bh(y, mode="soft"))
+            return
+
+        # Hard BH have at most one nonzero entry per row and group: store them as
+        # sparse tensors
+        similarities_x = self.similarities(x)
+        self.register_buffer("_bh_hard_x", self.best_hits.hard_sparse(similarities_x))
+        similarities_y = self.similarities(y)
+        self.register_buffer("_bh_hard_y", self.best_hits.hard_sparse(similarities_y))
+
+        # Soft BH for y are only needed if compared against soft BH for x
+        if not self.compare_soft_best_hits_to_hard:
+            self.register_buffer("_bh_soft_y", self._soft_bh(similarities_y))
+
     @property
     def _bh_y_for_soft_x(self):
         if self.compare_soft_best_hits_to_hard:
             return self._bh_hard_y
         return self._bh_soft_y
 
+    def _similarities_comparison_loss(
+        self, bh_x: torch.Tensor, bh_y: torch.Tensor
+    ) -> torch.Tensor:
+        # Custom losses are passed dense best hits matrices
+        if self.similarities_comparison_loss is not None:
+            bh_x, bh_y = (bh.to_dense() if bh.is_sparse else bh for bh in (bh_x, bh_y))
+
+        return self.effective_similarities_comparison_loss_(bh_x, bh_y)
+
+    def _soft_loss(self, x_perm: torch.Tensor) -> torch.Tensor:
+        if self.best_hits.top_k is not None:
+            if x_perm.ndim > 3:
+                raise ValueError(
+                    "Batches of soft permutations (e.g. several Gumbel noise samples) "
+                    "are not supported with streaming best hits."
+                )
+            bh_x = self._streaming_bh(x_perm, mode="soft")
+        else:
+            # The buffer is filled with NaN when allocated. If `self.similarities` has
+            # `group_sizes`, entries between groups are never written and stay NaN
+            similarities_x = self.similarities(
+                x_perm,
+                out=self._workspace_buffer(
+                    "similarities_x",
+                    x_perm.shape[:-3] + (x_perm.shape[-3],) * 2,
+                    like=x_perm,
+                    fill_value=torch.nan,
+                ),
+            )
+            bh_x = self.best_hits(
+                similarities_x,
+                out=self._workspace_buffer(
+                    "bh_x", similarities_x.shape, like=similarities_x
+                ),
+            )
+        # Ensure comparisons are soft_x-{soft,hard}_y, depending on
+        # self.compare_soft_best_hits_to_hard
+        return self._similarities_comparison_loss(bh_x, self._bh_y_for_soft_x)
+
     def forward(
         self, x: torch.Tensor, y: Optional[torch.Tensor] = None
     ) -> dict[str, torch.Tensor]:
@@ -188,22 +498,21 @@ class BestHitsPairing(DiffPaSSModel):
 
         # Soft or hard permutations
         perms = self.permutation()
-        x_perm = self.matrix_apply(x, mats=perms)
+        x_perm = self.matrix_apply(
+            x,
+            mats=perms,
+            out=self._workspace_buffer("x_perm", perms[0].shape[:-2] + x.shape, like=x),
+            checkpoint=self._checkpointing,
+        )
 
         # Best hits loss, with shortcut for hard permutations
         if mode == "soft":
-            similarities_x = self.similarities(x_perm)
-            bh_x = self.best_hits(similarities_x)
-            # Ensure comparisons are soft_x-{soft,hard}_y, depending on
-            # self.compare_soft_best_hits_to_hard
-            loss = self.effective_similarities_comparison_loss_(
-                bh_x, self._bh_y_for_soft_x
-            )
+            loss = self._checkpointed(self._soft_loss, x_perm)
         else:
             bh_x = apply_hard_permutation_batch_to_similarity(
                 x=self._bh_hard_x, perms=perms
             )
-            loss = self.effective_similarities_comparison_loss_(bh_x, self._bh_hard_y)
+            loss = self._similarities_comparison_loss(bh_x, self._bh_hard_y)
 
         return {
             "perms": perms,
@@ -226,16 +535,20 @@ class BestHitsPairing(DiffPaSSModel):
 
         # Compute hard/soft losses when using identity permutation
         with torch.no_grad():
-            hard_loss_identity_perm = self.effective_similarities_comparison_loss_(
+            hard_loss_identity_perm = self._similarities_comparison_loss(
                 self._bh_hard_x, self._bh_hard_y
             ).item()
-            soft_loss_identity_perm = self.effective_similarities_comparison_loss_(
-                self._bh_soft_x, self._bh_y_for_soft_x
+            if self.best_hits.top_k is not None:
+                bh_soft_x = self._streaming_bh(x, mode="soft")
+            else:
+                bh_soft_x = self._soft_bh(self.similarities(x))
+            soft_loss_identity_perm = self._similarities_comparison_loss(
+                bh_soft_x, self._bh_y_for_soft_x
             ).item()
 
         return {"hard": hard_loss_identity_perm, "soft": soft_loss_identity_perm}
 
-# %% ../nbs/train.ipynb 13
+# %% ../nbs/train.ipynb 15
 class MirrortreePairing(DiffPaSSModel):
     """DiffPaSS model for pairing of multiple sequence alignments (MSAs) by aligning their sequence distance networks as in the Mirrortree method."""
 
@@ -255,6 +568,8 @@ class MirrortreePairing(DiffPaSSModel):
         similarities_cfg: Optional[dict[str, Any]] = None,
         # If not ``None``, custom callable to compute the differentiable loss between the similarity matrix of the two MSAs. Default: `IntraGroupSimilarityLoss`
         similarities_comparison_loss: Optional[callable] = None,
+        # Whether to store and compare similarity matrices in packed form (see `pack_symmetric`), computing them in tiles of rows. If ``True``, a custom `similarities_comparison_loss` is passed packed similarity matrices
+        packed_similarities: bool = False,
     ):
         super().__init__()
 
@@ -272,20 +587,52 @@ class MirrortreePairing(DiffPaSSModel):
             similarity_kind=similarity_kind, similarities_cfg=similarities_cfg
         )
 
+        self.packed_similarities = packed_similarities
+
         #  Similarities comparison loss
         self.similarities_comparison_loss = similarities_comparison_loss
         if self.similarities_comparison_loss is None:
             self.effective_similarities_comparison_loss_ = IntraGroupSimilarityLoss(
-                group_sizes=self.group_sizes
+                group_sizes=self.group_sizes, packed=self.packed_similarities
             )
         else:
             self.effective_similarities_comparison_loss_ = (
                 self.similarities_comparison_loss
             )
 
+    def _similarities(
+        self, x: torch.Tensor, *, out: Optional[torch.Tensor] = None
+    ) -> torch.Tensor:
+        if self.packed_similarities:
+            return packed_symmetric_from_pairwise(
+                x, pairwise_fn=self.similarities.pairwise
+            )
+        return self.similarities(x, out=out)
+
     def _precompute_similarities(self, x: torch.Tensor, y: torch.Tensor) -> None:
-        self.register_buffer("_similarities_hard_x", self.similarities(x))
-        self.register_buffer("_similarities_hard_y", self.similarities(y))
+        self.register_buffer("_similarities_hard_x", self._similarities(x))
+        self.register_buffer("_similarities_hard_y", self._similarities(y))
+
+    def _soft_loss(self, x_perm: torch.Tensor) -> torch.Tensor:
+        # The buffer is filled with NaN when allocated. If `self.similarities` has
+        # `group_sizes`, entries between groups are never written and stay NaN
+        similarities_x = self._similarities(
+            x_perm,
+            out=(
+                None
+                if self.packed_similarities
+                else self._workspace_buffer(
+                    "similarities_x_soft",
+                    x_perm.shape[:-3] + self._similarities_hard_x.shape,
+                    like=x_perm,
+                    fill_value=torch.nan,
+                )
+            ),
+        )
+
+        return self.effective_similarities_comparison_loss_(
+            similarities_x, self._similarities_hard_y
+        )
 
     def forward(
         self, x: torch.Tensor, y: Optional[torch.Tensor] = None
@@ -294,19 +641,34 @@ class MirrortreePairing(DiffPaSSModel):
 
         # Soft or hard permutations (list)
         perms = self.permutation()
-        x_perm = self.matrix_apply(x, mats=perms)
+        x_perm = self.matrix_apply(
+            x,
+            mats=perms,
+            out=self._workspace_buffer("x_perm", perms[0].shape[:-2] + x.shape, like=x),
+            checkpoint=self._checkpointing,
+        )
 
-        # Compute similarity matrix of soft- or hard-permuted x
+        # Loss from the similarity matrix of soft- or hard-permuted x
         if mode == "soft":
-            similarities_x = self.similarities(x_perm)
+            loss = self._checkpointed(self._soft_loss, x_perm)
         else:
             similarities_x = apply_hard_permutation_batch_to_similarity(
-                x=self._similarities_hard_x, perms=perms
+                x=self._similarities_hard_x,
+                perms=perms,
+                packed=self.packed_similarities,
+                out=(
+                    None
+                    if self.packed_similarities
+                    else self._workspace_buffer(
+                        "similarities_x_hard",
+                        perms[0].shape[:-2] + self._similarities_hard_x.shape,
+                        like=self._similarities_hard_x,
+                    )
+                ),
+            )
+            loss = self.effective_similarities_comparison_loss_(
+                similarities_x, self._similarities_hard_y
             )
-
-        loss = self.effective_similarities_comparison_loss_(
-            similarities_x, self._similarities_hard_y
-        )
 
         return {
             "perms": perms,
@@ -336,9 +698,14 @@ class MirrortreePairing(DiffPaSSModel):
 
         return {"hard": hard_loss_identity_perm, "soft": soft_loss_identity_perm}
 
-# %% ../nbs/train.ipynb 16
+# %% ../nbs/train.ipynb 18
 class GraphAlignment(DiffPaSSModel):
-    """DiffPaSS model for general graph alignment starting from the weighted adjacency matrices of two graphs."""
+    """DiffPaSS model for general graph alignment starting from the weighted adjacency matrices of two graphs.
+
+    Adjacency matrices can be passed as sparse COO or CSR tensors. If both are sparse and the default comparison loss is used, the soft loss is computed directly from their nonzero entries, without materializing the soft-permuted adjacency matrix of ``x``.
+
+    With the default comparison loss, hard permutations can be refined by 2-opt local search (see `refine_hard_perms`).
+    """
 
     are_inputs_msas = False
 
@@ -352,6 +719,8 @@ class GraphAlignment(DiffPaSSModel):
         permutation_cfg: Optional[dict[str, Any]] = None,
         # If not ``None``, custom callable to compute the differentiable loss between the soft/hard-permuted adjacency matrix of graph ``x`` and the adjacency matrix of graph ``y``. Defaults to dot product between all upper triangular elements
         comparison_loss: Optional[callable] = None,
+        # Whether the (symmetric) adjacency matrices ``x`` and ``y`` are passed in packed form (see `pack_symmetric`). If ``True``, a custom `comparison_loss` is passed packed adjacency matrices
+        packed_inputs: bool = False,
     ):
         super().__init__()
 
@@ -363,12 +732,15 @@ class GraphAlignment(DiffPaSSModel):
             permutation_cfg=permutation_cfg,
         )
         self.permutation_conjugate = PermutationConjugate(group_sizes=self.group_sizes)
+        self.packed_inputs = packed_inputs
 
         #  Comparison loss
         self.comparison_loss = comparison_loss
         if self.comparison_loss is None:
             # Default: dot product between all upper triangular elements
-            self.effective_comparison_loss_ = IntraGroupSimilarityLoss(group_sizes=None)
+            self.effective_comparison_loss_ = IntraGroupSimilarityLoss(
+                group_sizes=None, packed=self.packed_inputs
+            )
         else:
             self.effective_comparison_loss_ = self.comparison_loss
 
@@ -380,9 +752,51 @@ class GraphAlignment(DiffPaSSModel):
 
         # Conjugate adjacency matrix x by soft/hard permutation P: P @ x @ P.T
         if mode == "soft":
-            x_perm = self.permutation_conjugate(x, mats=perms)
+            if (
+                x.layout != torch.strided
+                and y.layout != torch.strided
+                and self.comparison_loss is None
+            ):
+                # The soft-permuted x is typically much denser than x and y, so only
+                # the loss is computed
+                loss = -self._checkpointed(
+                    self.permutation_conjugate.conjugate_sparse_dot,
+                    x,
+                    y,
+                    mats=perms,
+                    exclude_diagonal=self.effective_comparison_loss_.exclude_diagonal,
+                )
+                return {"perms": perms, "x_perm": None, "loss": loss}
+            if self.packed_inputs:
+                x_perm = self._checkpointed(
+                    self.permutation_conjugate.conjugate_packed, x, mats=perms
+                )
+            elif x.layout != torch.strided:
+                x_perm = self._checkpointed(
+                    self.permutation_conjugate.conjugate_sparse, x, mats=perms
+                )
+            else:
+                x_perm = self.permutation_conjugate(
+                    x,
+                    mats=perms,
+                    out=self._workspace_buffer(
+                        "x_perm_soft", perms[0].shape[:-2] + x.shape, like=x
+                    ),
+                    checkpoint=self._checkpointing,
+                )
         else:
-            x_perm = apply_hard_permutation_batch_to_similarity(x=x, perms=perms)
+            x_perm = apply_hard_permutation_batch_to_similarity(
+                x=x,
+                perms=perms,
+                packed=self.packed_inputs,
+                out=(
+                    self._workspace_buffer(
+                        "x_perm_hard", perms[0].shape[:-2] + x.shape, like=x
+                    )
+                    if x.layout == torch.strided and not self.packed_inputs
+                    else None
+                ),
+            )
         loss = self.effective_comparison_loss_(x_perm, y, mats=perms)
 
         return {
@@ -393,7 +807,7 @@ class GraphAlignment(DiffPaSSModel):
 
     def prepare_fit(self, x: torch.Tensor, y: torch.Tensor) -> None:
         # Validate inputs
-        self.validate_inputs(x, y)
+        self.validate_inputs(x, y, packed=self.packed_inputs)
 
     def compute_losses_identity_perm(
         self, x: torch.Tensor, y: torch.Tensor
@@ -406,3 +820,153 @@ class GraphAlignment(DiffPaSSModel):
             soft_loss_identity_perm = hard_loss_identity_perm
 
         return {"hard": hard_loss_identity_perm, "soft": soft_loss_identity_perm}
+
+    def _adjacency_rows(
+        self, z: torch.Tensor, rows: torch.Tensor, cols: torch.Tensor
+    ) -> torch.Tensor:
+        """Dense entries ``z[rows[..., None], cols]`` of an adjacency matrix `z`, which
+        can be dense, sparse or packed."""
+        if self.packed_inputs:
+            n_samples = packed_n_samples(z.shape[-1])
+            return z[packed_symmetric_idxs(rows[..., None], cols, n_samples)]
+        if z.layout != torch.strided:
+            if z.layout == torch.sparse_csr:
+                z = z.to_sparse_coo()
+            z_rows = z.index_select(0, rows.flatten()).to_dense()
+            return z_rows[:, cols].reshape(*rows.shape, -1)
+
+        return z[rows[..., None], cols]
+
+    def _swap_gains(
+        self,
+        x: torch.Tensor,
+        y_rows: torch.Tensor,
+        *,
+        idxs: torch.Tensor,
+        perm: torch.Tensor,
+    ) -> torch.Tensor:
+        """Exact gains in the (negative) comparison loss from swapping each pair of
+        positions in the groups of positions `idxs`, of shape (n_groups, s), given the
+        global permutation `perm` and the rows ``y[idxs]`` of the target adjacency
+        matrix. Output shape: (n_groups, s, s)."""
+        x_rows = self._adjacency_rows(x, perm[idxs], perm)
+        # Swapping positions a and b changes the upper triangular entries in rows and
+        # columns a and b: the gain is sum_j (x_perm[b, j] - x_perm[a, j]) *
+        # (y[a, j] - y[b, j]), over j not in {a, b}
+        m = x_rows @ y_rows.transpose(-1, -2)
+        m_diag = m.diagonal(dim1=-2, dim2=-1)
+        gains = m + m.transpose(-1, -2) - m_diag[..., :, None] - m_diag[..., None, :]
+        block_idxs = idxs[:, None, :].expand_as(m)
+        x_block, y_block = x_rows.gather(-1, block_idxs), y_rows.gather(-1, block_idxs)
+        x_diag = x_block.diagonal(dim1=-2, dim2=-1)
+        y_diag = y_block.diagonal(dim1=-2, dim2=-1)
+        # Remove the terms with j = a and j = b
+        gains -= (x_block.transpose(-1, -2) - x_diag[..., :, None]) * (
+            y_diag[..., :, None] - y_block.transpose(-1, -2)
+        )
+        gains -= (x_diag[..., None, :] - x_block) * (y_block - y_diag[..., None, :])
+        if not self.effective_comparison_loss_.exclude_diagonal:
+            gains += (x_diag[..., None, :] - x_diag[..., :, None]) * (
+                y_diag[..., :, None] - y_diag[..., None, :]
+            )
+
+        return gains
+
+    def refine_hard_perms(
+        self,
+        x: torch.Tensor,
+        y: torch.Tensor,
+        *,
+        hard_perms: Sequence[np.ndarray],
+        max_rounds: int = 100,
+        tile_size: int = 1024,
+    ) -> tuple[list[np.ndarray], float]:
+        """Refine hard permutations by 2-opt local search on the default comparison
+        loss.
+
+        At each round, the exact loss changes from all within-group swaps are computed
+        from the rows of the adjacency matrices. Among the improving swaps, those whose
+        two positions are each other's best swap partner (which do not overlap) are
+        sorted by gain, and the prefix with the largest total gain (accounting exactly
+        for the interactions between swaps) is applied. Rows are gathered in tiles of
+        about `tile_size` rows, for both the gains and the interactions, so that
+        neither adjacency matrix is densified. Positions fixed by
+        `fixed_pairings` are never swapped. The search stops when no improving swap
+        remains, or after `max_rounds` rounds."""
+        if self.comparison_loss is not None:
+            raise ValueError(
+                "Swap refinement is only available with the default comparison loss."
+            )
+        device = y.device
+        perm = _global_perm(hard_perms, self.group_sizes, device)
+        is_fixed = _fixed_positions_mask(self.fixed_pairings, self.group_sizes, device)
+        bucket_idxs = _swap_buckets(self.group_sizes, device)
+        all_idxs = torch.arange(len(perm), device=device)
+
+        with torch.no_grad():
+            tiles_idxs = []
+            for idxs in bucket_idxs:
+                n_groups_per_tile = max(1, tile_size // idxs.shape[-1])
+                tiles_idxs.extend(idxs.split(n_groups_per_tile))
+            for _ in range(max_rounds):
+                swaps_a, swaps_b, swap_gains = [], [], []
+                for idxs in tiles_idxs:
+                    y_rows = self._adjacency_rows(y, idxs, all_idxs)
+                    gains = self._swap_gains(x, y_rows, idxs=idxs, perm=perm)
+                    a, b, gains = _mutual_best_swaps(
+                        gains, idxs=idxs, is_fixed=is_fixed
+                    )
+                    swaps_a.append(a)
+                    swaps_b.append(b)
+                    swap_gains.append(gains)
+                swap_gains, order = torch.sort(torch.cat(swap_gains), descending=True)
+                if not len(swap_gains):
+                    break
+                swaps_a, swaps_b = torch.cat(swaps_a)[order], torch.cat(swaps_b)[order]
+
+                # Interactions between pairs of swaps, from the entries between them,
+                # gathered in tiles of swaps
+                n_swaps = len(swap_gains)
+                swaps_ab = torch.cat([swaps_a, swaps_b])
+                perm_ab = perm[swaps_ab]
+                interactions = torch.zeros_like(swap_gains)
+                n_swaps_per_tile = max(1, tile_size // 2)
+                for start in range(0, n_swaps, n_swaps_per_tile):
+                    stop = min(start + n_swaps_per_tile, n_swaps)
+                    n = stop - start
+                    rows = torch.cat([swaps_a[start:stop], swaps_b[start:stop]])
+                    cross_x, cross_y = (
+                        z[:n, :n_swaps]
+                        - z[:n, n_swaps:]
+                        - z[n:, :n_swaps]
+                        + z[n:, n_swaps:]
+                        for z in (
+                            self._adjacency_rows(x, perm[rows], perm_ab),
+                            self._adjacency_rows(y, rows, swaps_ab),
+                        )
+                    )
+                    # Each pair of swaps contributes to the gain of the later one
+                    interactions += torch.triu(
+                        cross_x * cross_y, diagonal=start + 1
+                    ).sum(0)
+                cumulative_gains = torch.cumsum(swap_gains + interactions, 0)
+                n_accepted = int(cumulative_gains.argmax()) + 1
+                swaps_a, swaps_b = swaps_a[:n_accepted], swaps_b[:n_accepted]
+                swapped = torch.cat([swaps_a, swaps_b])
+                perm[swapped] = perm[torch.cat([swaps_b, swaps_a])]
+
+            perms = _group_perms(perm, self.group_sizes)
+            mats = [
+                torch.eye(s, dtype=y.dtype, device=device)[perm_this_group]
+                for s, perm_this_group in zip(self.group_sizes, perms)
+            ]
+            x_perm = apply_hard_permutation_batch_to_similarity(
+                x=x, perms=mats, packed=self.packed_inputs
+            )
+            loss = self.effective_comparison_loss_(x_perm, y, mats=mats).item()
+        refined_hard_perms = [
+            perm_this_group.cpu().numpy().astype(INGROUP_IDX_DTYPE)
+            for perm_this_group in perms
+        ]
+
+        return refined_hard_perms, loss